@@ -0,0 +1,140 @@
+# agendador_prioridade.py
+import asyncio
+import heapq
+import itertools
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from cache_analises import remover_acentos
+from metricas import Histograma, metricas
+
+# Palavras que pedem atenção imediata (disputa, risco jurídico) e as que podem esperar
+_RE_CRITICAS = re.compile(
+    r"nao reconhec|contest|indevid|fraude|golpe|procon|advogad|processo|errad|absurd|nunca contratei"
+)
+_RE_DIFICULDADE = re.compile(r"desempregad|dificuldade|negociar|parcela|desconto|nao consigo|prazo")
+_RE_PAGO = re.compile(r"\bja pagu?ei\b|\bpaguei\b|\bpago\b|comprovante")
+
+# Pontuação mínima de cada classe (da mais urgente para a menos)
+CLASSES = (("alta", 4.0), ("media", 2.0), ("baixa", float("-inf")))
+
+# Tempo máximo aceitável entre receber a resposta e agir, por classe
+SLO_SEGUNDOS = {"alta": 2.0, "media": 10.0, "baixa": 60.0}
+
+def _dias_para_vencimento(vencimento, hoje: date) -> int:
+    if isinstance(vencimento, datetime):
+        vencimento = vencimento.date()
+    return (vencimento - hoje).days
+
+def pre_pontuar(texto: str, cliente: Mapping[str, Any], hoje: Optional[date] = None) -> float:
+    """
+    Nota barata antes da IA: palavras-chave, tamanho da mensagem e
+    proximidade do vencimento. Maior = atender antes.
+    """
+    normalizado = remover_acentos(texto.lower())
+    pontuacao = 1.0
+
+    if _RE_CRITICAS.search(normalizado):
+        pontuacao += 3.0
+    elif _RE_DIFICULDADE.search(normalizado):
+        pontuacao += 1.0
+    if _RE_PAGO.search(normalizado):
+        pontuacao -= 1.0
+
+    # Mensagens longas costumam ser reclamações detalhadas
+    pontuacao += min(len(normalizado) / 200, 1.0)
+
+    vencimento = cliente.get("vencimento")
+    if vencimento:
+        dias = _dias_para_vencimento(vencimento, hoje or date.today())
+        pontuacao += max(0.0, 2.0 - abs(dias) * 0.25)
+        if dias < 0:
+            pontuacao += 0.5
+
+    return pontuacao
+
+def refinar_pontuacao(pontuacao_previa: float, analise: Mapping[str, Any]) -> float:
+    """Ajusta a nota com o resultado da IA (urgência, sentimento e intenção)"""
+    pontuacao = pontuacao_previa
+    pontuacao += {"alta": 2.0, "media": 0.5}.get(analise.get("urgencia"), 0.0)
+    if analise.get("sentimento") == "negativo":
+        pontuacao += 1.0
+    if analise.get("intencao") in ("contestacao", "nao_reconhece"):
+        pontuacao += 2.0
+    elif analise.get("intencao") == "pagamento_realizado":
+        pontuacao -= 1.0
+    return pontuacao
+
+def classe_prioridade(pontuacao: float) -> str:
+    for classe, minimo in CLASSES:
+        if pontuacao >= minimo:
+            return classe
+    return "baixa"
+
+class AgendadorPrioridade:
+    """
+    Fila de prioridade para o bot assíncrono, com limite de itens em
+    andamento (backpressure para quem chama `colocar` com novo=True).
+
+    Um item pode voltar para a fila com nova nota (ex.: depois da análise)
+    sem contar de novo no limite. Maior pontuação sai primeiro; empates
+    saem em ordem de chegada.
+    """
+
+    def __init__(self, tamanho_maximo: int = 1000, slos: Dict[str, float] = SLO_SEGUNDOS):
+        self.tamanho_maximo = tamanho_maximo
+        self.slos = slos
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._sequencia = itertools.count()
+        self._condicao = asyncio.Condition()
+        self._em_andamento = 0
+        self._latencias = {classe: Histograma() for classe in slos}
+        self._violacoes = {classe: 0 for classe in slos}
+
+    async def colocar(self, pontuacao: float, item: Any, novo: bool = True):
+        async with self._condicao:
+            if novo:
+                await self._condicao.wait_for(lambda: self._em_andamento < self.tamanho_maximo)
+                self._em_andamento += 1
+            heapq.heappush(self._heap, (-pontuacao, next(self._sequencia), item))
+            self._condicao.notify_all()
+
+    async def retirar(self) -> Tuple[float, Any]:
+        async with self._condicao:
+            await self._condicao.wait_for(lambda: bool(self._heap))
+            pontuacao, _, item = heapq.heappop(self._heap)
+            return -pontuacao, item
+
+    async def concluir(self, classe: Optional[str] = None, latencia: Optional[float] = None):
+        """Marca um item como terminado e registra a latência na classe dele"""
+        if classe is not None and latencia is not None:
+            self._latencias[classe].observar(latencia)
+            metricas.observar("bot_resposta_segundos", latencia, prioridade=classe)
+            if latencia > self.slos[classe]:
+                self._violacoes[classe] += 1
+                metricas.incrementar("bot_slo_violacoes_total", prioridade=classe)
+
+        async with self._condicao:
+            self._em_andamento -= 1
+            self._condicao.notify_all()
+
+    async def aguardar(self):
+        """Espera todos os itens colocados terminarem"""
+        async with self._condicao:
+            await self._condicao.wait_for(lambda: self._em_andamento == 0)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def estatisticas(self) -> Dict[str, Dict[str, Any]]:
+        """Latência e cumprimento do SLO por classe de prioridade"""
+        relatorio = {}
+        for classe, histograma in self._latencias.items():
+            relatorio[classe] = {
+                **histograma.resumo(),
+                "slo_segundos": self.slos[classe],
+                "violacoes": self._violacoes[classe],
+                "dentro_slo": 1 - self._violacoes[classe] / histograma.total if histograma.total else 1.0
+            }
+        return relatorio
@@ -0,0 +1,359 @@
+# benchmark_cobranca.py
+"""
+Benchmark offline do pipeline de análise.
+
+Sobe um servidor HTTP local que imita o chat completions da OpenAI (com
+latência, jitter e taxa de falha configuráveis), aponta o
+mcp_server_openai.py para ele via OPENAI_BASE_URL e dispara respostas
+sintéticas de devedores pelos clientes MCP.
+
+Exemplo:
+    python benchmark_cobranca.py --mensagens 500 --concorrencia 50 --modo lote
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Respostas sintéticas e a análise que o backend falso devolve para cada uma
+RESPOSTAS_SINTETICAS = [
+    ("Oi, já paguei ontem via PIX", "pagamento_realizado", "agradecer_confirmar"),
+    ("Quero negociar um desconto", "negociacao", "enviar_opcoes_negociacao"),
+    ("Não recebi o boleto, pode enviar?", "solicitar_boleto", "reenviar_boleto"),
+    ("Estou desempregado, podem aguardar uns dias?", "dificuldade_financeira", "oferecer_parcelamento"),
+    ("Não reconheço essa dívida", "nao_reconhece", "encaminhar_suporte"),
+    ("O valor está errado, fui cobrado duas vezes", "contestacao", "encaminhar_suporte"),
+    ("Consigo pagar só semana que vem", "prazo_adicional", "oferecer_parcelamento"),
+    ("Qual o valor total que devo?", "informacao", "explicar_divida"),
+]
+
+NOMES = ["João Silva", "Maria Oliveira", "Ana Souza", "Carlos Lima", "Beatriz Costa", "Pedro Alves"]
+TIPOS = ["mensalidade", "renegociacao"]
+
+def gerar_itens(quantidade: int, semente: int = 42) -> List[Dict[str, Any]]:
+    """Respostas de devedores com pequenas variações para não serem todas idênticas"""
+    aleatorio = random.Random(semente)
+    sufixos = ["", "!", " obrigado", " por favor", "?", " hoje"]
+    itens = []
+    for i in range(quantidade):
+        texto, _, _ = aleatorio.choice(RESPOSTAS_SINTETICAS)
+        itens.append({
+            "texto": texto + aleatorio.choice(sufixos) + f" #{i}",
+            "nome_cliente": aleatorio.choice(NOMES),
+            "tipo_cobranca": aleatorio.choice(TIPOS),
+            "historico": ""
+        })
+    return itens
+
+def _analise_falsa(conteudo_usuario: str) -> Dict[str, Any]:
+    """Escolhe a análise pela resposta sintética contida no prompt"""
+    for texto, intencao, acao in RESPOSTAS_SINTETICAS:
+        if texto in conteudo_usuario:
+            break
+    else:
+        intencao, acao = "nao_identificada", "resposta_generica"
+    return {
+        "intencao": intencao,
+        "sentimento": "neutro",
+        "urgencia": "media",
+        "acao": acao,
+        "confianca": 0.9,
+        "explicacao": "resposta do backend falso",
+        "mensagem_sugerida": "Olá, recebemos sua mensagem."
+    }
+
+def _campos_do_esquema(esquema: Optional[Dict[str, Any]]) -> Optional[set]:
+    """Campos pedidos pela saída estruturada (None = sem schema, devolve tudo)"""
+    if not esquema:
+        return None
+    propriedades = esquema.get("properties", {})
+    if "resultados" in propriedades:
+        propriedades = propriedades["resultados"].get("items", {}).get("properties", {})
+    return set(propriedades)
+
+def _filtrar_campos(analise: Dict[str, Any], campos: Optional[set]) -> Dict[str, Any]:
+    if campos is None:
+        return analise
+    return {chave: valor for chave, valor in analise.items() if chave in campos}
+
+class ServidorOpenAIFalso:
+    """Imita POST /v1/chat/completions em uma thread, sem acesso à rede"""
+
+    def __init__(self, latencia_ms: float = 300, jitter_ms: float = 100, taxa_falha: float = 0.0, semente: int = 7):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.taxa_falha = taxa_falha
+        self.aleatorio = random.Random(semente)
+        self.requisicoes = 0
+        self.falhas = 0
+        self.tokens_prompt = 0
+        self.tokens_completion = 0
+        self._trava = threading.Lock()
+        self._http: Optional[ThreadingHTTPServer] = None
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+                with servidor._trava:
+                    servidor.requisicoes += 1
+                    atraso = max(0.0, servidor.latencia_ms + servidor.aleatorio.uniform(-1, 1) * servidor.jitter_ms)
+                    falhar = servidor.aleatorio.random() < servidor.taxa_falha
+                    if falhar:
+                        servidor.falhas += 1
+                time.sleep(atraso / 1000)
+
+                if falhar:
+                    self._responder(500, {"error": {"message": "falha simulada", "type": "server_error"}})
+                    return
+
+                mensagens = corpo.get("messages", [])
+                conteudo_usuario = mensagens[-1].get("content", "") if mensagens else ""
+                prompt_tokens = sum(len(str(m.get("content", ""))) for m in mensagens) // 4
+                formato = corpo.get("response_format") or {}
+                esquema = formato.get("json_schema", {})
+                campos = _campos_do_esquema(esquema.get("schema"))
+                if formato.get("type") == "json_object" or esquema.get("name") == "analise_cobranca_lote":
+                    # Prompt da ferramenta de lote: um bloco "[i] ..." por mensagem
+                    blocos = conteudo_usuario.split("\n\n")
+                    resultados = [
+                        {"indice": i, **_filtrar_campos(_analise_falsa(bloco), campos)}
+                        for i, bloco in enumerate(b for b in blocos if b.startswith("["))
+                    ]
+                    conteudo = json.dumps({"resultados": resultados}, ensure_ascii=False)
+                else:
+                    conteudo = json.dumps(_filtrar_campos(_analise_falsa(conteudo_usuario), campos), ensure_ascii=False)
+
+                with servidor._trava:
+                    servidor.tokens_prompt += prompt_tokens
+                    servidor.tokens_completion += len(conteudo) // 4
+
+                self._responder(200, {
+                    "id": f"chatcmpl-falso-{servidor.requisicoes}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": corpo.get("model", "gpt-4o-mini"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": conteudo},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(conteudo) // 4,
+                        "total_tokens": prompt_tokens + len(conteudo) // 4
+                    }
+                })
+
+            def _responder(self, status: int, corpo: Dict[str, Any]):
+                dados = json.dumps(corpo).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+        return Handler
+
+    def iniciar(self) -> str:
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), self._criar_handler())
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._http.server_address[1]}/v1"
+
+    def parar(self):
+        if self._http:
+            self._http.shutdown()
+            self._http.server_close()
+
+def eh_fallback(resultado: Optional[Dict[str, Any]]) -> bool:
+    """Fallbacks do cliente e do servidor usam intenção não identificada e confiança baixa"""
+    if not resultado:
+        return True
+    return resultado.get("intencao") == "nao_identificada" and float(resultado.get("confianca", 0)) <= 0.3
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+async def _medir_async(cliente, itens: List[Dict[str, Any]], concorrencia: int, modo: str, tamanho_lote: int = 0):
+    """
+    Mede latência por chamada (modos async/pool) ou por lote (modo lote:
+    uma chamada da ferramenta de lote por grupo de `tamanho_lote` itens,
+    ou um lote só com 0) - as latências de lote não são por mensagem
+    """
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    if modo == "lote":
+        tamanho = tamanho_lote or len(itens) or 1
+        lotes = [itens[i:i + tamanho] for i in range(0, len(itens), tamanho)]
+
+        async def analisar_lote(lote: List[Dict[str, Any]]):
+            async with semaforo:
+                inicio = time.perf_counter()
+                resultados_lote = await cliente.analisar_mensagens_lote(lote, concorrencia, tamanho_lote)
+                return resultados_lote, time.perf_counter() - inicio
+
+        medidos = await asyncio.gather(*(analisar_lote(lote) for lote in lotes))
+        return [r for resultados_lote, _ in medidos for r in resultados_lote], [d for _, d in medidos]
+
+    latencias: List[float] = [0.0] * len(itens)
+
+    async def analisar(indice: int, item: Dict[str, Any]):
+        async with semaforo:
+            inicio = time.perf_counter()
+            resultado = await cliente.analisar_mensagem(
+                item["texto"], item["nome_cliente"], item["tipo_cobranca"], item["historico"]
+            )
+            latencias[indice] = time.perf_counter() - inicio
+            return resultado
+
+    resultados = await asyncio.gather(*(analisar(i, item) for i, item in enumerate(itens)))
+    return list(resultados), latencias
+
+async def _rodar_async(args, itens):
+    from mcp_client_oficial import MCPClientCobranca
+    from mcp_pool import MCPServerPool
+
+    cliente = MCPServerPool(args.servidores) if args.modo == "pool" else MCPClientCobranca()
+    if not await cliente.conectar(args.servidor):
+        raise SystemExit("❌ Não foi possível conectar ao servidor MCP")
+    try:
+        # Aquecimento: primeira chamada paga imports e conexão HTTP
+        await cliente.analisar_mensagem("aquecimento", "Teste", "mensalidade")
+        inicio = time.perf_counter()
+        resultados, latencias = await _medir_async(
+            cliente, itens, args.concorrencia, args.modo, args.tamanho_lote
+        )
+        return resultados, latencias, time.perf_counter() - inicio
+    finally:
+        await cliente.desconectar()
+
+def _rodar_sync(args, itens):
+    from mcp_client_oficial import MCPClientSync
+
+    cliente = MCPClientSync(args.servidor)
+    if not cliente.conectar():
+        raise SystemExit("❌ Não foi possível conectar ao servidor MCP")
+    try:
+        cliente.analisar_mensagem("aquecimento", "Teste", "mensalidade")
+        resultados, latencias = [], []
+        inicio = time.perf_counter()
+        for item in itens:
+            t0 = time.perf_counter()
+            resultados.append(cliente.analisar_mensagem(
+                item["texto"], item["nome_cliente"], item["tipo_cobranca"], item["historico"]
+            ))
+            latencias.append(time.perf_counter() - t0)
+        return resultados, latencias, time.perf_counter() - inicio
+    finally:
+        cliente.desconectar()
+
+def executar_benchmark(args) -> Dict[str, Any]:
+    falso = ServidorOpenAIFalso(args.latencia_ms, args.jitter_ms, args.taxa_falha)
+    url = falso.iniciar()
+
+    # O subprocesso do servidor herda este ambiente
+    os.environ["OPENAI_BASE_URL"] = url
+    os.environ["OPENAI_API_KEY"] = os.environ.get("OPENAI_API_KEY") or "sk-benchmark-offline"
+    os.environ["MCP_CACHE_DESABILITADO"] = "0" if args.com_cache else "1"
+    os.environ["MCP_CLASSIFICADOR_LOCAL"] = "1" if args.com_classificador else "0"
+    os.environ["MCP_PROMPT_COMPACTO"] = "0" if args.prompt_completo else "1"
+    os.environ["MCP_MENSAGEM_IA"] = "0" if args.sem_mensagem_ia else "1"
+    os.environ["MCP_COALESCER_MS"] = str(args.coalescer_ms)
+
+    itens = gerar_itens(args.mensagens, args.semente)
+    try:
+        if args.modo == "sync":
+            resultados, latencias, duracao = _rodar_sync(args, itens)
+        else:
+            resultados, latencias, duracao = asyncio.run(_rodar_async(args, itens))
+    finally:
+        falso.parar()
+
+    fallbacks = sum(1 for r in resultados if eh_fallback(r))
+
+    # No modo lote cada latência é de um lote inteiro: rótulo próprio, não comparável
+    # por mensagem (itens por segundo continua em throughput_msg_s)
+    if args.modo == "lote":
+        prefixo = "latencia_lote"
+        extra = {
+            "lotes": len(latencias),
+            "itens_por_lote": round(len(itens) / max(1, len(latencias)), 1)
+        }
+    else:
+        prefixo, extra = "latencia", {}
+
+    return {
+        "modo": args.modo,
+        "mensagens": len(itens),
+        "concorrencia": args.concorrencia,
+        "duracao_segundos": round(duracao, 3),
+        "throughput_msg_s": round(len(itens) / duracao, 2) if duracao else 0.0,
+        **extra,
+        f"{prefixo}_p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        f"{prefixo}_p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        f"{prefixo}_p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "taxa_fallback": round(fallbacks / len(itens), 4) if itens else 0.0,
+        "requisicoes_openai": falso.requisicoes,
+        "falhas_simuladas": falso.falhas,
+        "tokens_prompt_por_requisicao": round(falso.tokens_prompt / max(1, falso.requisicoes - falso.falhas), 1),
+        "tokens_completion_por_requisicao": round(falso.tokens_completion / max(1, falso.requisicoes - falso.falhas), 1),
+        # ru_maxrss vem em KB no Linux
+        "memoria_cliente_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "memoria_servidor_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Benchmark offline do bot de cobrança")
+    parser.add_argument("--modo", choices=["async", "lote", "pool", "sync"], default="async")
+    parser.add_argument("--mensagens", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=20)
+    parser.add_argument("--servidores", type=int, default=2, help="Processos no modo pool")
+    parser.add_argument("--tamanho-lote", type=int, default=0, help="Itens por chamada da ferramenta de lote (modo lote)")
+    parser.add_argument("--latencia-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--taxa-falha", type=float, default=0.0)
+    parser.add_argument("--com-cache", action="store_true", help="Mantém o cache de análises ligado")
+    parser.add_argument("--com-classificador", action="store_true", help="Mantém o classificador local ligado")
+    parser.add_argument("--prompt-completo", action="store_true", help="Usa o prompt original em vez do compacto")
+    parser.add_argument("--sem-mensagem-ia", action="store_true", help="A IA não redige mensagem_sugerida (template local)")
+    parser.add_argument("--coalescer-ms", type=float, default=0, help="Janela do coalescedor de análises (0 desliga)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--servidor", default="mcp_server_openai.py")
+    parser.add_argument("--saida", help="Grava o relatório em JSON neste arquivo")
+    return parser
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+
+    print("🏁 BENCHMARK OFFLINE - BOT DE COBRANÇA")
+    print("=" * 50)
+    relatorio = executar_benchmark(args)
+
+    for chave, valor in relatorio.items():
+        print(f"   {chave}: {valor}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        print(f"💾 Relatório salvo em {args.saida}")
+
+    return relatorio
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# bot_async.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from agendador_prioridade import (
+    AgendadorPrioridade, classe_prioridade, pre_pontuar, refinar_pontuacao
+)
+from bot_cobranca import clientes, imprimir_analise, montar_resposta
+from envio_mensagens import criar_despachante
+from gravacao_analises import anotar_cliente, envolver_cliente
+from historico_conversas import HistoricoConversas
+from mcp_client_oficial import (
+    GRAVAR_ANALISES, REPRODUZIR_ANALISES, MCPClientCobranca, criar_resposta_fallback
+)
+from metricas import metricas
+
+# Vantagem na fila para respostas que só faltam executar a ação
+BONUS_ANALISADA = 1.0
+
+class BotCobrancaAsync:
+    """
+    Núcleo assíncrono do bot de cobrança.
+
+    Respostas recebidas entram numa fila de prioridade limitada (quem chama
+    `receber` espera quando ela enche) e são processadas por um número fixo
+    de workers, então análise e envio de várias conversas se sobrepõem.
+    A ordem da análise vem de uma nota prévia (palavras-chave, vencimento);
+    depois da IA a resposta volta à fila com a nota refinada para a ação.
+    """
+
+    def __init__(
+        self,
+        cliente_mcp,
+        max_concorrencia: int = 20,
+        tamanho_fila: int = 1000,
+        enviar: Optional[Callable[[str, str], Awaitable[None]]] = None,
+        historico: Optional[HistoricoConversas] = None
+    ):
+        self.cliente_mcp = cliente_mcp
+        self.historico = historico or HistoricoConversas()
+        self.max_concorrencia = max_concorrencia
+        self.agendador = AgendadorPrioridade(tamanho_fila)
+        self._enviar = enviar
+        self._workers: List[asyncio.Task] = []
+        self.processadas = 0
+        self.erros = 0
+
+    async def analisar_mensagem_com_ia(self, texto: str, cliente) -> Dict[str, Any]:
+        """Analisa via MCP; nunca devolve vazio - usa fallback se a IA falhar"""
+        historico = self.historico.resumo(cliente["telefone"])
+        self.historico.registrar(cliente["telefone"], "cliente", texto)
+
+        anotar_cliente(cliente)
+        analise = await self.cliente_mcp.analisar_mensagem(
+            texto, cliente["nome"], cliente["tipo_cobranca"], historico, cliente.get("carteira")
+        )
+        return analise or criar_resposta_fallback(cliente["nome"], "resposta_vazia")
+
+    async def enviar_resposta(self, telefone: str, mensagem: str):
+        """Envia mensagem WhatsApp (simulada por padrão)"""
+        self.historico.registrar(telefone, "bot", mensagem)
+        if self._enviar:
+            await self._enviar(telefone, mensagem)
+            return
+        print(f"📤 ENVIADO para {telefone}:")
+        print(f"   {mensagem}")
+
+    async def executar_acao(self, analise: Dict[str, Any], cliente):
+        """Executa ação baseada na análise da IA"""
+        if not analise:
+            print('❌ Sem análise para executar')
+            return
+
+        imprimir_analise(analise)
+        mensagem, log = montar_resposta(analise, cliente)
+        await self.enviar_resposta(cliente["telefone"], mensagem)
+        print(log)
+
+    async def simular_resposta_cliente(self, cliente, resposta: str):
+        """Processa uma resposta do cliente: análise com IA e ação"""
+        print(f"\n📨 RESPOSTA RECEBIDA de {cliente['nome']} ({cliente['telefone']}):")
+        print(f"   '{resposta}'")
+
+        analise = await self.analisar_mensagem_com_ia(resposta, cliente)
+        await self.executar_acao(analise, cliente)
+
+    async def receber(self, cliente, resposta: str):
+        """Coloca a resposta na fila - espera se a fila estiver cheia (backpressure)"""
+        await self.agendador.colocar(
+            pre_pontuar(resposta, cliente),
+            (time.perf_counter(), cliente, resposta, None, None)
+        )
+
+    async def _worker(self):
+        while True:
+            pontuacao, (recebido_em, cliente, resposta, analise, classe) = await self.agendador.retirar()
+            try:
+                if analise is None:
+                    print(f"\n📨 RESPOSTA RECEBIDA de {cliente['nome']} ({cliente['telefone']}):")
+                    print(f"   '{resposta}'")
+                    analise = await self.analisar_mensagem_com_ia(resposta, cliente)
+                    # Volta para a fila com a nota refinada; a vaga continua ocupada.
+                    # O bônus faz respostas já analisadas terminarem antes de
+                    # novas análises da mesma classe (a IA já foi paga)
+                    pontuacao = refinar_pontuacao(pontuacao, analise)
+                    await self.agendador.colocar(
+                        pontuacao + BONUS_ANALISADA,
+                        (recebido_em, cliente, resposta, analise, classe_prioridade(pontuacao)),
+                        novo=False
+                    )
+                    continue
+
+                await self.executar_acao(analise, cliente)
+                self.processadas += 1
+                await self.agendador.concluir(classe, time.perf_counter() - recebido_em)
+            except Exception as e:
+                self.erros += 1
+                print(f"❌ Erro ao processar resposta de {cliente['telefone']}: {e}")
+                await self.agendador.concluir()
+
+    def iniciar(self):
+        """Sobe os workers (chamar dentro do loop em execução)"""
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker()) for _ in range(self.max_concorrencia)
+            ]
+
+    async def aguardar(self):
+        """Espera a fila esvaziar"""
+        await self.agendador.aguardar()
+
+    async def parar(self):
+        """Esvazia a fila e encerra os workers"""
+        await self.aguardar()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def processar_respostas(self, respostas: List[Tuple[Any, str]]):
+        """Processa várias respostas (cliente, texto) e espera todas terminarem"""
+        self.iniciar()
+        for cliente, resposta in respostas:
+            await self.receber(cliente, resposta)
+        await self.aguardar()
+
+async def main_async(server_path: str = "mcp_server_openai.py", max_concorrencia: int = 20):
+    """
+    Demonstração do bot assíncrono com as mesmas simulações do bot síncrono
+    """
+    print("🤖 BOT DE COBRANÇA ASSÍNCRONO - INTEGRAÇÃO MCP")
+    print("=" * 50)
+
+    cliente_mcp = MCPClientCobranca()
+    if GRAVAR_ANALISES or REPRODUZIR_ANALISES:
+        cliente_mcp = envolver_cliente(cliente_mcp, GRAVAR_ANALISES, REPRODUZIR_ANALISES)
+    if not await cliente_mcp.conectar(server_path):
+        print("❌ Falha ao conectar com MCP Server")
+        return
+
+    # Com WHATSAPP_API_URL as respostas saem pela fila do despachante, em lotes
+    despachante = criar_despachante()
+    parar_envio = asyncio.Event()
+    tarefa_envio = asyncio.create_task(despachante.executar(parar=parar_envio)) if despachante else None
+
+    bot = BotCobrancaAsync(
+        cliente_mcp,
+        max_concorrencia=max_concorrencia,
+        enviar=despachante.enviar if despachante else None
+    )
+    try:
+        await bot.processar_respostas([
+            (clientes[0], "Oi, já paguei ontem via PIX"),
+            (clientes[1], "Quero negociar um desconto"),
+            (clientes[0], "Não recebi o boleto, pode enviar?"),
+            (clientes[1], "Estou desempregado, podem aguardar uns dias?"),
+        ])
+        print(f"\n✅ {bot.processadas} respostas processadas, {bot.erros} erros")
+        for classe, resumo in bot.agendador.estatisticas().items():
+            if resumo["total"]:
+                print(f"   ⏱️ prioridade {classe}: p95 {resumo['p95']:.2f}s "
+                      f"(SLO {resumo['slo_segundos']:.0f}s, {resumo['dentro_slo']:.0%} dentro)")
+    finally:
+        await bot.parar()
+        if tarefa_envio:
+            parar_envio.set()
+            await tarefa_envio
+            await despachante.transporte.fechar()
+        await cliente_mcp.desconectar()
+        metricas.descarregar()
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
@@ -1,25 +1,55 @@
-from datetime import datetime, timedelta
+import time
+_inicio_importacao = time.perf_counter()
+
+from datetime import date, datetime
+import argparse
 import json
-from mcp_client_oficial import MCPClientSync
+import os
+import sys
+from motor_disparos import MotorDisparos, IndiceVencimentos
+from motor_acoes import MotorAcoes
 
-hoje = datetime.now()
+# Cliente MCP, OpenAI, fila de envio, ledger e carregadores de carteira são
+# importados só quando usados: uma execução só de disparos não carrega o
+# stack MCP nem sobe o servidor.
 
-clientes = [
-    {
-        "nome": "João Silva",
-        "telefone": "5599999999999",  # formato internacional
-        "vencimento": datetime(2025, 8, 6),
-        "tipo_cobranca": "mensalidade",
-        "link_boleto": "https://exemplo.com/boleto/joao"
-    },
-    {
-        "nome": "Maria Oliveira",
-        "telefone": "5598888888888",
-        "vencimento": datetime(2025, 8, 4),
-        "tipo_cobranca": "renegociacao",
-        "link_boleto": "https://exemplo.com/boleto/maria"
-    }
-]
+def _criar_clientes_exemplo():
+    return [
+        {
+            "nome": "João Silva",
+            "telefone": "5599999999999",  # formato internacional
+            "vencimento": datetime(2025, 8, 6),
+            "tipo_cobranca": "mensalidade",
+            "link_boleto": "https://exemplo.com/boleto/joao"
+        },
+        {
+            "nome": "Maria Oliveira",
+            "telefone": "5598888888888",
+            "vencimento": datetime(2025, 8, 4),
+            "tipo_cobranca": "renegociacao",
+            "link_boleto": "https://exemplo.com/boleto/maria"
+        }
+    ]
+
+def __getattr__(nome):
+    """
+    `hoje` e `clientes` só são montados no primeiro acesso (bot_cobranca.clientes
+    ou from bot_cobranca import clientes) e ficam guardados no módulo
+    """
+    if nome == "hoje":
+        globals()["hoje"] = datetime.now()
+        return globals()["hoje"]
+    if nome == "clientes":
+        return obter_clientes_exemplo()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+def obter_clientes_exemplo():
+    """
+    Lista de exemplo para uso dentro do módulo (o __getattr__ só vale para acesso externo)
+    """
+    if "clientes" not in globals():
+        globals()["clientes"] = _criar_clientes_exemplo()
+    return globals()["clientes"]
 
 mensagens = {
     "mensalidade": {
@@ -35,7 +65,61 @@ mensagens = {
 # Cliente MCP global - inicializado no main()
 mcp_client = None
 
-def analisar_mensagem_com_ia(texto_resposta, telefone, nome_cliente, tipo_cobranca):
+# Fonte de devedores (lista acima, CSV ou SQLite) - definida no main()
+fonte_clientes = None
+
+# Motor de disparos com índice por vencimento - montado sob demanda
+motor_disparos = None
+
+# Histórico por telefone para dar contexto à IA (BOT_HISTORICO_ARQUIVO persiste em disco) - carregado sob demanda
+historico_conversas = None
+
+# Ledger de disparos já feitos (BOT_LEDGER_DISPAROS ou --ledger) - evita reenvio se o cron rodar de novo
+ledger_disparos = None
+
+# Registro de ações da IA (handler + log) com contadores por ação
+motor_acoes = MotorAcoes()
+
+# Fila de saída para o gateway WhatsApp (WHATSAPP_API_URL) - sem ela, envio simulado no console
+despachante = None
+
+def obter_historico():
+    """
+    Histórico de conversas, lido do disco só quando a primeira resposta chega
+    """
+    global historico_conversas
+
+    if historico_conversas is None:
+        from historico_conversas import HistoricoConversas
+        historico_conversas = HistoricoConversas(caminho=os.getenv("BOT_HISTORICO_ARQUIVO"))
+    return historico_conversas
+
+def criar_despachante(url=None, sufixo_fila=""):
+    """
+    Fila de envio WhatsApp só quando há gateway configurado (sem importar o módulo à toa)
+    """
+    if not (url or os.getenv("WHATSAPP_API_URL")):
+        return None
+    from envio_mensagens import criar_despachante as criar
+    return criar(url, sufixo_fila=sufixo_fila)
+
+def abrir_fonte(caminho):
+    """
+    Carteira em CSV ou SQLite (carregador importado só quando usado)
+    """
+    from carregador_clientes import abrir_fonte as abrir
+    return abrir(caminho)
+
+def abrir_ledger(caminho):
+    """
+    Ledger de disparos em SQLite, ou None sem caminho
+    """
+    if not caminho:
+        return None
+    from ledger_disparos import LedgerDisparos
+    return LedgerDisparos(caminho)
+
+def analisar_mensagem_com_ia(texto_resposta, telefone, nome_cliente, tipo_cobranca, carteira=None):
     """
     Substitui a função chamar_mcp_server() usando MCP Client oficial
     """
@@ -48,12 +132,17 @@ def analisar_mensagem_com_ia(texto_resposta, telefone, nome_cliente, tipo_cobran
     try:
         print('🧠 Analisando mensagem com IA via MCP...')
         
+        # Resumo do histórico antes de registrar a mensagem atual
+        historico = obter_historico().resumo(telefone)
+        obter_historico().registrar(telefone, "cliente", texto_resposta)
+        
         # Usar MCP Client para análise
         resultado = mcp_client.analisar_mensagem(
             texto=texto_resposta,
             nome_cliente=nome_cliente, 
             tipo_cobranca=tipo_cobranca,
-            historico=""  # Por enquanto vazio, depois podemos adicionar histórico
+            historico=historico,
+            carteira=carteira
         )
         
         if resultado:
@@ -67,6 +156,22 @@ def analisar_mensagem_com_ia(texto_resposta, telefone, nome_cliente, tipo_cobran
         print(f'❌ Erro ao conectar com MCP: {e}')
         return None
 
+def montar_resposta(analise, cliente):
+    """
+    Decide a mensagem final e o log da ação da IA, sem enviar nada
+    Compartilhado pelo bot síncrono e pelo bot assíncrono
+    """
+    return motor_acoes.executar(analise, cliente)
+
+def imprimir_analise(analise):
+    """
+    Mostra o resumo da análise da IA
+    """
+    print(f'\n📊 ANÁLISE IA:')
+    print(f'   Intenção: {analise.get("intencao")}')
+    print(f'   Confiança: {analise.get("confianca", 0):.1%}')
+    print(f'   Ação: {analise.get("acao")}')
+
 def executar_acao(analise, cliente):
     """
     Executa ação baseada na análise da IA
@@ -76,56 +181,20 @@ def executar_acao(analise, cliente):
         print('❌ Sem análise para executar')
         return
     
-    acao = analise.get('acao')
-    intencao = analise.get('intencao') 
-    confianca = analise.get('confianca', 0)
-    mensagem_sugerida = analise.get('mensagem_sugerida', '')
+    imprimir_analise(analise)
 
-    print(f'\n📊 ANÁLISE IA:')
-    print(f'   Intenção: {intencao}')
-    print(f'   Confiança: {confianca:.1%}')
-    print(f'   Ação: {acao}')
-
-    # Mapear ações da IA para ações do bot
-    if acao == 'agradecer_confirmar':
-        enviar_resposta(cliente['telefone'], mensagem_sugerida)
-        print("✅ Agradecimento enviado - aguardando confirmação de pagamento")
-    
-    elif acao == 'enviar_opcoes_negociacao':
-        enviar_resposta(cliente['telefone'], mensagem_sugerida)
-        print("💰 Opções de negociação enviadas")
-        
-    elif acao == "reenviar_boleto":
-        # Adicionar link do boleto à mensagem
-        mensagem_completa = f"{mensagem_sugerida}\n\nSeu boleto: {cliente['link_boleto']}"
-        enviar_resposta(cliente["telefone"], mensagem_completa)
-        print("📄 Boleto reenviado")
-        
-    elif acao == "encaminhar_suporte":
-        enviar_resposta(cliente["telefone"], mensagem_sugerida)
-        print("👤 Caso encaminhado para suporte humano")
-        
-    elif acao == "oferecer_parcelamento":
-        enviar_resposta(cliente["telefone"], mensagem_sugerida)
-        print("💳 Opções de parcelamento oferecidas")
-        
-    elif acao == "solicitar_comprovante":
-        enviar_resposta(cliente["telefone"], mensagem_sugerida)
-        print("📋 Comprovante de pagamento solicitado")
-        
-    elif acao == "explicar_divida":
-        mensagem_completa = f"{mensagem_sugerida}\n\nDetalhes: {cliente['tipo_cobranca']} - Venc: {cliente['vencimento'].strftime('%d/%m/%Y')}"
-        enviar_resposta(cliente["telefone"], mensagem_completa)
-        print("📝 Explicação da dívida enviada")
-        
-    else:  # resposta_generica ou ação não mapeada
-        enviar_resposta(cliente["telefone"], mensagem_sugerida)
-        print("🤖 Resposta genérica enviada - pode precisar de humano")
+    mensagem, log = montar_resposta(analise, cliente)
+    enviar_resposta(cliente["telefone"], mensagem)
+    print(log)
 
 def enviar_resposta(telefone, mensagem):
     """
-    Simula envio de mensagem WhatsApp
+    Envia mensagem WhatsApp - enfileira no despachante ou simula no console
     """
+    obter_historico().registrar(telefone, "bot", mensagem)
+    if despachante:
+        despachante.enfileirar(telefone, mensagem)
+        return
     print(f"📤 ENVIADO para {telefone}:")
     print(f"   {mensagem}")
 
@@ -136,51 +205,304 @@ def simular_resposta_cliente(cliente, resposta_simulada):
     print(f"\n📨 RESPOSTA RECEBIDA de {cliente['nome']} ({cliente['telefone']}):")
     print(f"   '{resposta_simulada}'")
     
+    # Cadastro do devedor para a gravação das análises (MCP_GRAVAR_ANALISES)
+    from gravacao_analises import anotar_cliente
+    anotar_cliente(cliente)
+    
     # Analisar com IA via MCP
     analise = analisar_mensagem_com_ia(
         resposta_simulada, 
         cliente["telefone"], 
         cliente["nome"], 
-        cliente["tipo_cobranca"]
+        cliente["tipo_cobranca"],
+        cliente.get("carteira")
     )
     
     # Executar ação baseada na análise
     executar_acao(analise, cliente)
 
-def executar_disparos():
+def receber_resposta(telefone, texto):
+    """
+    Processa resposta recebida buscando o devedor na fonte pelo telefone
+    """
+    cliente = obter_fonte_clientes().buscar_por_telefone(telefone)
+    if cliente is None:
+        print(f"⚠️ Telefone {telefone} não encontrado na carteira")
+        return
+
+    simular_resposta_cliente(cliente, texto)
+
+def obter_fonte_clientes():
+    """
+    Fonte configurada no main() ou índice em memória da lista de exemplo
+    """
+    global fonte_clientes
+
+    if fonte_clientes is None:
+        fonte_clientes = IndiceVencimentos(obter_clientes_exemplo())
+    return fonte_clientes
+
+def obter_motor_disparos():
+    """
+    Monta o motor de disparos uma vez - índice e templates ficam prontos entre execuções
+    """
+    global motor_disparos
+
+    if motor_disparos is None:
+        motor_disparos = MotorDisparos(obter_fonte_clientes(), mensagens)
+    return motor_disparos
+
+def executar_disparos(hoje_data=None, tamanho_lote=500, shard=None):
     """
-    Função original de disparo automático
+    Disparo automático D-1/D+1 usando o índice por vencimento
+    Com shard=(indice, total) só processa os telefones daquela partição
     """
-    hoje_data = datetime.now().date()
-    print(f"🗓️  Verificando disparos para {hoje_data.strftime('%d/%m/%Y')}")
+    hoje_data = hoje_data or datetime.now().date()
+    rotulo_shard = f" (shard {shard[0] + 1}/{shard[1]})" if shard else ""
+    print(f"🗓️  Verificando disparos para {hoje_data.strftime('%d/%m/%Y')}{rotulo_shard}")
     print("=" * 50)
 
-    for cliente in clientes:
-        venc = cliente['vencimento'].date()
-        tipo = cliente['tipo_cobranca']
-        nome = cliente['nome']  
-        link = cliente['link_boleto']
-
-        if venc == hoje_data + timedelta(days=1):  # D-1
-            msg = mensagens[tipo]['D-1'].format(nome=nome, link_boleto=link)
-            print(f'📤 [D-1] ENVIADO para {cliente["telefone"]}: {msg}')
-        elif venc == hoje_data - timedelta(days=1):  # D+1
-            msg = mensagens[tipo]['D+1'].format(nome=nome, link_boleto=link)
-            print(f'📤 [D+1] ENVIADO para {cliente["telefone"]}: {msg}')
-        else:
-            print(f'⏸️  Nenhum disparo para {nome} hoje')
+    lotes = obter_motor_disparos().disparos_em_lotes(hoje_data, tamanho_lote, shard)
+
+    if despachante:
+        import asyncio
+        total = asyncio.run(enviar_disparos(lotes))
+    else:
+        total = 0
+        for lote in lotes:
+            if ledger_disparos:
+                lote = ledger_disparos.reservar(lote)
+
+            # Um único write por lote em vez de um print por mensagem
+            sys.stdout.write("".join(
+                f'📤 [{rotulo}] ENVIADO para {cliente["telefone"]}: {msg}\n'
+                for rotulo, cliente, msg in lote
+            ))
+            if ledger_disparos:
+                ledger_disparos.confirmar(lote)
+            total += len(lote)
+
+    if ledger_disparos and ledger_disparos.ignorados:
+        print(f'⏭️  {ledger_disparos.ignorados} disparos já feitos anteriormente - ignorados')
+    if ledger_disparos and ledger_disparos.retomados:
+        print(f'🔁 {ledger_disparos.retomados} disparos retomados de uma execução interrompida')
+
+    if total == 0:
+        print('⏸️  Nenhum disparo para hoje')
+    else:
+        print(f'✅ {total} disparos realizados')
+
+    return total
+
+async def enviar_disparos(lotes):
+    """
+    Envia cada lote pelo despachante assim que ele é gerado: nada se acumula
+    em memória além do lote atual, e o primeiro envio não espera o último
+    template ser renderizado
+
+    O ledger só marca o lote como enviado depois que ele está na fila
+    durável ou, sem ela, depois de um envio sem falhas; senão a reserva
+    fica pendente e a próxima execução retoma o disparo
+    """
+    duravel = despachante.fila_retentativas is not None
+    total = 0
+    try:
+        for lote in lotes:
+            if ledger_disparos:
+                lote = ledger_disparos.reservar(lote)
+            despachante.enfileirar_lote([(cliente["telefone"], msg) for _, cliente, msg in lote])
+            total += len(lote)
+            if ledger_disparos and duravel:
+                ledger_disparos.confirmar(lote)
+
+            falhas_antes = despachante.reagendadas + despachante.perdidas
+            await despachante.descarregar()
+            if ledger_disparos and not duravel and despachante.reagendadas + despachante.perdidas == falhas_antes:
+                ledger_disparos.confirmar(lote)
+    finally:
+        await despachante.transporte.fechar()
+    return total
+
+def executar_shard(indice, total_shards, caminho_clientes=None, whatsapp_url=None,
+                   caminho_ledger=None, hoje_iso=None, tamanho_lote=500):
+    """
+    Onda de disparos de um shard - roda isolado, com fonte, fila de envio e
+    conexão ao ledger próprias (ponto de entrada de cada processo do pool)
+
+    A fila durável de cada shard fica em <WHATSAPP_FILA_RETENTATIVAS>.shard<i>:
+    só uma execução com o mesmo número de shards volta a drená-la
+    """
+    global fonte_clientes, motor_disparos, despachante, ledger_disparos
+
+    if caminho_clientes:
+        fonte_clientes = abrir_fonte(caminho_clientes)
+        motor_disparos = None
+    despachante = criar_despachante(whatsapp_url, sufixo_fila=f".shard{indice}")
+    ledger_disparos = abrir_ledger(caminho_ledger)
+
+    hoje_data = date.fromisoformat(hoje_iso) if hoje_iso else None
+    total = executar_disparos(hoje_data, tamanho_lote, shard=(indice, total_shards))
+
+    return {
+        "shard": indice,
+        "disparos": total,
+        "ignorados": ledger_disparos.ignorados if ledger_disparos else 0,
+        "envio": despachante.estatisticas() if despachante else {}
+    }
+
+def mesclar_resultados_shards(resultados):
+    """
+    Soma os contadores de cada shard num resumo único
+    """
+    resumo = {"shards": len(resultados), "disparos": 0, "ignorados": 0, "envio": {}}
+    for resultado in resultados:
+        resumo["disparos"] += resultado["disparos"]
+        resumo["ignorados"] += resultado["ignorados"]
+        for chave, valor in resultado["envio"].items():
+            resumo["envio"][chave] = resumo["envio"].get(chave, 0) + valor
+    return resumo
+
+def executar_disparos_paralelos(processos, caminho_clientes=None, whatsapp_url=None,
+                                caminho_ledger=None, hoje_data=None, tamanho_lote=500):
+    """
+    Divide a carteira por hash do telefone e roda um shard por processo
+    """
+    hoje_iso = (hoje_data or datetime.now().date()).isoformat()
+    print(f"🧩 Disparos em {processos} processos")
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        futuros = [
+            pool.submit(executar_shard, indice, processos, caminho_clientes,
+                        whatsapp_url, caminho_ledger, hoje_iso, tamanho_lote)
+            for indice in range(processos)
+        ]
+        resultados = [futuro.result() for futuro in futuros]
 
-def main():
+    resumo = mesclar_resultados_shards(resultados)
+    print(f"✅ {resumo['disparos']} disparos realizados em {processos} shards "
+          f"({resumo['ignorados']} já feitos anteriormente)")
+    return resumo
+
+def criar_parser():
+    """
+    Argumentos de linha de comando do bot
+    """
+    parser = argparse.ArgumentParser(description="Bot de cobrança com análise por IA via MCP")
+    parser.add_argument(
+        "--clientes",
+        help="Carteira de devedores em .csv (streaming) ou .db (SQLite indexado)"
+    )
+    parser.add_argument(
+        "--whatsapp-url",
+        help="Gateway WhatsApp para envio real (padrão: WHATSAPP_API_URL; sem ele, só console)"
+    )
+    parser.add_argument(
+        "--ledger",
+        default=os.getenv("BOT_LEDGER_DISPAROS"),
+        help="Arquivo SQLite com os disparos já feitos (padrão: BOT_LEDGER_DISPAROS)"
+    )
+    parser.add_argument(
+        "--data",
+        type=date.fromisoformat,
+        help="Data de referência dos disparos (AAAA-MM-DD, padrão: hoje)"
+    )
+    parser.add_argument(
+        "--disparos-only",
+        action="store_true",
+        help="Só a onda de disparos D-1/D+1, sem cliente MCP nem IA (para cron)"
+    )
+    parser.add_argument(
+        "--medir-inicializacao",
+        action="store_true",
+        help="Mostra o tempo de importação e de cada etapa (fim dos disparos; com MCP, conexão "
+             "e primeira análise) e se o stack MCP/OpenAI foi carregado, em todos os modos"
+    )
+    parser.add_argument(
+        "--processos",
+        type=int,
+        default=1,
+        help="Roda só os disparos, divididos em N processos por hash do telefone"
+    )
+    parser.add_argument(
+        "--shard-indice",
+        type=int,
+        default=0,
+        help="Índice deste shard (0 a --shard-total - 1), para distribuir entre máquinas"
+    )
+    parser.add_argument(
+        "--shard-total",
+        type=int,
+        default=1,
+        help="Número total de shards; com mais de 1, roda só os disparos deste shard "
+             "(cada shard tem sua fila de envio em <fila>.shard<i>, drenada por execuções "
+             "com o mesmo número de shards)"
+    )
+    return parser
+
+def medir_inicializacao(args, etapa):
+    """
+    Tempo desde o início da importação deste módulo (o próprio interpretador
+    não entra - use python -X importtime para o detalhe por módulo)
+    """
+    if not args.medir_inicializacao:
+        return
+    decorrido = (time.perf_counter() - _inicio_importacao) * 1000
+    carregados = [nome for nome in ("mcp", "openai", "asyncio", "sqlite3") if nome in sys.modules]
+    print(f"⏱️  {etapa}: {decorrido:.1f} ms desde a importação "
+          f"(importação: {_duracao_importacao * 1000:.1f} ms; "
+          f"módulos pesados carregados: {', '.join(carregados) or 'nenhum'})")
+
+def main(argv=None):
     """
     Função principal com integração MCP
     """
-    global mcp_client
+    global mcp_client, fonte_clientes, despachante, ledger_disparos
+    
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.shard_total < 1 or not 0 <= args.shard_indice < args.shard_total:
+        parser.error(f"--shard-indice deve estar entre 0 e {max(args.shard_total, 1) - 1}")
+    if args.processos < 1:
+        parser.error("--processos deve ser pelo menos 1")
+
+    # Modos de disparo em lote: só a onda D-1/D+1, sem cliente MCP
+    if args.processos > 1:
+        executar_disparos_paralelos(
+            args.processos, args.clientes, args.whatsapp_url, args.ledger, args.data
+        )
+        medir_inicializacao(args, "disparos paralelos concluídos")
+        return
+    if args.shard_total > 1:
+        resultado = executar_shard(
+            args.shard_indice, args.shard_total, args.clientes, args.whatsapp_url,
+            args.ledger, args.data.isoformat() if args.data else None
+        )
+        print(f"📊 Shard {args.shard_indice}: {resultado}")
+        medir_inicializacao(args, f"disparos do shard {args.shard_indice} concluídos")
+        return
+
+    despachante = criar_despachante(args.whatsapp_url)
+    ledger_disparos = abrir_ledger(args.ledger)
+    if args.clientes:
+        print(f"📂 Carteira de devedores: {args.clientes}")
+        fonte_clientes = abrir_fonte(args.clientes)
+
+    # Execução de cron só com os disparos: não importa nem sobe o MCP
+    if args.disparos_only:
+        executar_disparos(args.data)
+        if despachante:
+            print(f"📬 Envio WhatsApp: {despachante.estatisticas()}")
+        medir_inicializacao(args, "disparos concluídos")
+        return
     
     print("🤖 BOT DE COBRANÇA - INTEGRAÇÃO MCP OFICIAL")
     print("=" * 50)
     
     # 1. Inicializar cliente MCP
     print("🔄 Inicializando cliente MCP...")
+    from mcp_client_oficial import MCPClientSync
     mcp_client = MCPClientSync("mcp_server_openai.py")
     
     # 2. Conectar com MCP Server
@@ -189,44 +511,55 @@ def main():
         print("   Verifique se o arquivo mcp_server_openai.py existe")
         print("   Verifique se OPENAI_API_KEY está configurada no .env")
         return
+    medir_inicializacao(args, "MCP conectado")
     
     try:
         # 3. Executar disparos normais
         print("\n1️⃣ DISPAROS AUTOMÁTICOS:")
-        executar_disparos()
+        executar_disparos(args.data)
         
         print("\n2️⃣ SIMULANDO RESPOSTAS DOS CLIENTES COM IA:")
         print("=" * 50)
         
         # 4. Simulação 1: Cliente disse que pagou
         print("\n🧪 TESTE 1 - Confirmação de Pagamento:")
-        simular_resposta_cliente(clientes[0], "Oi, já paguei ontem via PIX")
+        simular_resposta_cliente(obter_clientes_exemplo()[0], "Oi, já paguei ontem via PIX")
+        medir_inicializacao(args, "primeira análise")
         
         print("\n" + "-" * 30)
         
         # 5. Simulação 2: Cliente quer negociar  
         print("\n🧪 TESTE 2 - Solicitação de Negociação:")
-        simular_resposta_cliente(clientes[1], "Quero negociar um desconto")
+        simular_resposta_cliente(obter_clientes_exemplo()[1], "Quero negociar um desconto")
         
         print("\n" + "-" * 30)
         
         # 6. Simulação 3: Cliente não recebeu boleto
         print("\n🧪 TESTE 3 - Solicitação de Reenvio:")
-        simular_resposta_cliente(clientes[0], "Não recebi o boleto, pode enviar?")
+        simular_resposta_cliente(obter_clientes_exemplo()[0], "Não recebi o boleto, pode enviar?")
         
         print("\n" + "-" * 30)
         
         # 7. Simulação 4: Cliente com dificuldades
         print("\n🧪 TESTE 4 - Dificuldade Financeira:")
-        simular_resposta_cliente(clientes[1], "Estou desempregado, podem aguardar uns dias?")
+        simular_resposta_cliente(obter_clientes_exemplo()[1], "Estou desempregado, podem aguardar uns dias?")
         
     finally:
         # 8. Desconectar MCP Client
         print(f"\n🔌 Desconectando cliente MCP...")
         if mcp_client:
             mcp_client.desconectar()
+
+        if despachante:
+            despachante.drenar_sync()
+            print(f"📬 Envio WhatsApp: {despachante.estatisticas()}")
+
+        print(f"📊 Ações executadas: {motor_acoes.estatisticas()}")
         
         print("✅ Bot finalizado com sucesso!")
+        medir_inicializacao(args, "execução concluída")
+
+_duracao_importacao = time.perf_counter() - _inicio_importacao
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
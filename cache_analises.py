@@ -0,0 +1,149 @@
+# cache_analises.py
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Campos de classificação guardados no cache (a mensagem é tratada à parte)
+CAMPOS_CLASSIFICACAO = ["intencao", "sentimento", "urgencia", "acao", "confianca", "explicacao"]
+
+# Marcadores usados para guardar a mensagem sugerida sem o nome do cliente
+MARCADOR_NOME = "\x00nome\x00"
+MARCADOR_PRIMEIRO_NOME = "\x00primeiro_nome\x00"
+
+_RE_PONTUACAO = re.compile(r"[^\w\s]")
+_RE_ESPACOS = re.compile(r"\s+")
+
+def remover_acentos(texto: str) -> str:
+    """Remove acentos mantendo as letras base (não -> nao)"""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+def normalizar_texto(texto: str, nome_cliente: str = "") -> str:
+    """
+    Normaliza mensagem para comparação: minúsculas, sem acentos, sem
+    pontuação, espaços colapsados e nome do cliente trocado por <nome>.
+    """
+    texto = remover_acentos((texto or "").lower())
+    texto = _RE_ESPACOS.sub(" ", _RE_PONTUACAO.sub(" ", texto)).strip()
+
+    if nome_cliente:
+        tokens_nome = {
+            t for t in remover_acentos(nome_cliente.lower()).split() if len(t) > 2
+        }
+        if tokens_nome:
+            texto = " ".join("<nome>" if t in tokens_nome else t for t in texto.split())
+
+    return texto
+
+def _despersonalizar(mensagem: str, nome_cliente: str) -> str:
+    """Troca o nome do cliente por marcadores para reaproveitar a mensagem"""
+    if not nome_cliente:
+        return mensagem
+    mensagem = mensagem.replace(nome_cliente, MARCADOR_NOME)
+    primeiro_nome = nome_cliente.split()[0]
+    return mensagem.replace(primeiro_nome, MARCADOR_PRIMEIRO_NOME)
+
+def _personalizar(mensagem: str, nome_cliente: str) -> str:
+    """Recoloca o nome do cliente atual nos marcadores"""
+    primeiro_nome = nome_cliente.split()[0] if nome_cliente else ""
+    return (
+        mensagem
+        .replace(MARCADOR_NOME, nome_cliente)
+        .replace(MARCADOR_PRIMEIRO_NOME, primeiro_nome)
+    )
+
+class CacheAnalises:
+    """
+    Cache LRU com TTL para análises de mensagens de cobrança.
+
+    A chave é (tipo_cobranca, texto normalizado), então "Já paguei!" e
+    "ja paguei" do João ou da Maria caem na mesma entrada. A mensagem
+    sugerida é guardada sem o nome e repersonalizada a cada acerto.
+    """
+
+    def __init__(self, max_itens: int = 10000, ttl_segundos: float = 3600.0):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._itens: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        # Contadores para medir o ganho do cache
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.descartados = 0
+        self.segundos_economizados = 0.0
+        self.tokens_economizados = 0
+
+    @staticmethod
+    def chave(texto: str, nome_cliente: str, tipo_cobranca: str) -> Tuple[str, str]:
+        return (
+            (tipo_cobranca or "").strip().lower(),
+            normalizar_texto(texto, nome_cliente)
+        )
+
+    def obter(self, texto: str, nome_cliente: str, tipo_cobranca: str) -> Optional[Dict[str, Any]]:
+        """Retorna análise personalizada para o cliente ou None se não houver entrada válida"""
+        chave = self.chave(texto, nome_cliente, tipo_cobranca)
+        item = self._itens.get(chave)
+
+        if item is None:
+            self.falhas += 1
+            return None
+
+        criado_em, entrada = item
+        if time.monotonic() - criado_em > self.ttl_segundos:
+            del self._itens[chave]
+            self.expirados += 1
+            self.falhas += 1
+            return None
+
+        self._itens.move_to_end(chave)
+        self.acertos += 1
+        self.segundos_economizados += entrada["latencia"]
+        self.tokens_economizados += entrada["tokens"]
+
+        resultado = dict(entrada["classificacao"])
+        resultado["mensagem_sugerida"] = _personalizar(entrada["mensagem"], nome_cliente)
+        return resultado
+
+    def guardar(
+        self,
+        texto: str,
+        nome_cliente: str,
+        tipo_cobranca: str,
+        resultado: Dict[str, Any],
+        latencia: float = 0.0,
+        tokens: int = 0
+    ):
+        """Guarda análise vinda da IA junto com o custo dela (latência e tokens)"""
+        chave = self.chave(texto, nome_cliente, tipo_cobranca)
+        entrada = {
+            "classificacao": {c: resultado[c] for c in CAMPOS_CLASSIFICACAO if c in resultado},
+            "mensagem": _despersonalizar(str(resultado.get("mensagem_sugerida", "")), nome_cliente),
+            "latencia": latencia,
+            "tokens": tokens
+        }
+
+        self._itens[chave] = (time.monotonic(), entrada)
+        self._itens.move_to_end(chave)
+
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self.descartados += 1
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores de acerto e economia estimada"""
+        consultas = self.acertos + self.falhas
+        return {
+            "itens": len(self._itens),
+            "consultas": consultas,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            "expirados": self.expirados,
+            "descartados": self.descartados,
+            "segundos_economizados": round(self.segundos_economizados, 3),
+            "tokens_economizados": self.tokens_economizados
+        }
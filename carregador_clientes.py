@@ -0,0 +1,209 @@
+# carregador_clientes.py
+import csv
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+@dataclass(frozen=True, slots=True)
+class Cliente:
+    """Registro compacto de devedor - também aceita cliente['campo'] como os dicts antigos"""
+
+    nome: str
+    telefone: str
+    vencimento: datetime
+    tipo_cobranca: str
+    link_boleto: str
+
+    def __getitem__(self, campo: str) -> Any:
+        try:
+            return getattr(self, campo)
+        except AttributeError:
+            raise KeyError(campo) from None
+
+    def get(self, campo: str, padrao: Any = None) -> Any:
+        return getattr(self, campo, padrao)
+
+def converter_data(valor: str) -> datetime:
+    """Aceita AAAA-MM-DD ou DD/MM/AAAA"""
+    valor = valor.strip()
+    if "/" in valor:
+        return datetime.strptime(valor, "%d/%m/%Y")
+    return datetime.strptime(valor[:10], "%Y-%m-%d")
+
+def _data_iso(valor) -> str:
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return converter_data(valor).date().isoformat()
+
+def ler_clientes_csv(caminho: str) -> Iterator[Cliente]:
+    """Lê o CSV linha a linha (cabeçalho: nome,telefone,vencimento,tipo_cobranca,link_boleto)"""
+    with open(caminho, newline="", encoding="utf-8") as arquivo:
+        for linha in csv.DictReader(arquivo):
+            yield Cliente(
+                nome=linha["nome"],
+                telefone=linha["telefone"],
+                vencimento=converter_data(linha["vencimento"]),
+                tipo_cobranca=linha["tipo_cobranca"],
+                link_boleto=linha["link_boleto"]
+            )
+
+class FonteCSV:
+    """Fonte de devedores em CSV - relê o arquivo em streaming a cada consulta"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+
+    def clientes_por_vencimento(
+        self,
+        datas: Iterable[date],
+        filtro_telefone: Optional[Callable[[str], bool]] = None
+    ) -> Iterator[Cliente]:
+        # Datas aceitas nos dois formatos do CSV, comparadas como texto
+        formatos = set()
+        for d in datas:
+            d = d.date() if isinstance(d, datetime) else d
+            formatos.add(d.isoformat())
+            formatos.add(d.strftime("%d/%m/%Y"))
+
+        with open(self.caminho, newline="", encoding="utf-8") as arquivo:
+            for linha in csv.DictReader(arquivo):
+                # Filtra pela data (e pelo shard) antes de montar o registro
+                if linha["vencimento"].strip()[:10] not in formatos:
+                    continue
+                if filtro_telefone and not filtro_telefone(linha["telefone"]):
+                    continue
+                yield Cliente(
+                    nome=linha["nome"],
+                    telefone=linha["telefone"],
+                    vencimento=converter_data(linha["vencimento"]),
+                    tipo_cobranca=linha["tipo_cobranca"],
+                    link_boleto=linha["link_boleto"]
+                )
+
+    def buscar_por_telefone(self, telefone: str) -> Optional[Cliente]:
+        for cliente in ler_clientes_csv(self.caminho):
+            if cliente.telefone == telefone:
+                return cliente
+        return None
+
+    def __iter__(self) -> Iterator[Cliente]:
+        return ler_clientes_csv(self.caminho)
+
+class RepositorioClientesSQLite:
+    """
+    Carteira de devedores num arquivo SQLite local.
+
+    Vencimento fica em texto ISO com índice, então a consulta D-1/D+1 lê
+    só as linhas das duas datas e o cursor entrega os registros aos poucos.
+    """
+
+    def __init__(self, caminho: str, tamanho_lote: int = 1000):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS clientes (
+                telefone TEXT NOT NULL,
+                nome TEXT NOT NULL,
+                vencimento TEXT NOT NULL,
+                tipo_cobranca TEXT NOT NULL,
+                link_boleto TEXT NOT NULL
+            )
+            """
+        )
+        self.conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_clientes_vencimento ON clientes (vencimento)"
+        )
+        self.conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_clientes_telefone ON clientes (telefone)"
+        )
+        self.conexao.commit()
+
+    def importar(self, clientes: Iterable[Any]) -> int:
+        """Grava registros (Cliente ou dict) em lotes; devolve quantos foram gravados"""
+        total = 0
+        lote = []
+        for cliente in clientes:
+            lote.append((
+                cliente["telefone"],
+                cliente["nome"],
+                _data_iso(cliente["vencimento"]),
+                cliente["tipo_cobranca"],
+                cliente["link_boleto"]
+            ))
+            if len(lote) >= self.tamanho_lote:
+                total += self._gravar_lote(lote)
+                lote = []
+        if lote:
+            total += self._gravar_lote(lote)
+        self.conexao.commit()
+        return total
+
+    def _gravar_lote(self, lote) -> int:
+        self.conexao.executemany(
+            "INSERT INTO clientes (telefone, nome, vencimento, tipo_cobranca, link_boleto) "
+            "VALUES (?, ?, ?, ?, ?)",
+            lote
+        )
+        return len(lote)
+
+    def importar_csv(self, caminho_csv: str) -> int:
+        return self.importar(ler_clientes_csv(caminho_csv))
+
+    @staticmethod
+    def _para_cliente(linha) -> Cliente:
+        telefone, nome, vencimento, tipo_cobranca, link_boleto = linha
+        return Cliente(
+            nome=nome,
+            telefone=telefone,
+            vencimento=datetime.strptime(vencimento, "%Y-%m-%d"),
+            tipo_cobranca=tipo_cobranca,
+            link_boleto=link_boleto
+        )
+
+    def clientes_por_vencimento(
+        self,
+        datas: Iterable[date],
+        filtro_telefone: Optional[Callable[[str], bool]] = None
+    ) -> Iterator[Cliente]:
+        datas_iso = sorted({_data_iso(d) for d in datas})
+        if not datas_iso:
+            return
+        marcadores = ", ".join("?" for _ in datas_iso)
+        cursor = self.conexao.execute(
+            "SELECT telefone, nome, vencimento, tipo_cobranca, link_boleto FROM clientes "
+            f"WHERE vencimento IN ({marcadores})",
+            datas_iso
+        )
+        while True:
+            linhas = cursor.fetchmany(self.tamanho_lote)
+            if not linhas:
+                break
+            for linha in linhas:
+                if filtro_telefone and not filtro_telefone(linha[0]):
+                    continue
+                yield self._para_cliente(linha)
+
+    def buscar_por_telefone(self, telefone: str) -> Optional[Cliente]:
+        linha = self.conexao.execute(
+            "SELECT telefone, nome, vencimento, tipo_cobranca, link_boleto FROM clientes "
+            "WHERE telefone = ? LIMIT 1",
+            (telefone,)
+        ).fetchone()
+        return self._para_cliente(linha) if linha else None
+
+    def __len__(self) -> int:
+        return self.conexao.execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
+
+    def fechar(self):
+        self.conexao.close()
+
+def abrir_fonte(caminho: str):
+    """Escolhe a fonte pela extensão: .csv em streaming, .db/.sqlite indexado"""
+    if caminho.lower().endswith(".csv"):
+        return FonteCSV(caminho)
+    return RepositorioClientesSQLite(caminho)
@@ -0,0 +1,121 @@
+# carteiras.py
+import asyncio
+import json
+import os
+import sys
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, NamedTuple, Optional
+
+# Carteira usada quando a chamada não informa nenhuma
+CARTEIRA_PADRAO = "padrao"
+
+class Carteira(NamedTuple):
+    nome: str
+    instrucoes: str = ""
+    max_concorrencia: int = 8  # 0: sem cota própria, só o semáforo global
+
+class RegistroCarteiras:
+    """
+    Configuração e uso de cada carteira (credor) atendida pelo mesmo
+    servidor MCP.
+
+    Cada carteira de MCP_CARTEIRAS tem instruções próprias somadas ao prompt
+    e uma cota de chamadas OpenAI simultâneas, aplicada antes do semáforo
+    global: uma carteira com pico de volume espera na própria fila sem
+    ocupar as vagas das outras. A padrão só tem cota quando aparece na
+    configuração; senão usa direto o limite global. Nomes não configurados são tratados como a carteira padrão
+    (ver `resolver`), então cotas e contadores não crescem com o que os
+    clientes mandarem.
+    """
+
+    def __init__(self, configuradas: Dict[str, Carteira], cota_padrao: int = 8):
+        self.configuradas = configuradas
+        self.cota_padrao = cota_padrao
+        self._semaforos: Dict[str, asyncio.Semaphore] = {}
+        self._em_andamento: Counter = Counter()
+        self._aguardando: Counter = Counter()
+        self._analises: Dict[str, Counter] = {}
+        self._tokens: Dict[str, Counter] = {}
+
+    def resolver(self, nome: Optional[str]) -> str:
+        """Nome da carteira configurada ou CARTEIRA_PADRAO"""
+        return nome if nome in self.configuradas else CARTEIRA_PADRAO
+
+    def obter(self, nome: Optional[str]) -> Carteira:
+        nome = self.resolver(nome)
+        return self.configuradas.get(nome) or Carteira(nome, "", 0)
+
+    @asynccontextmanager
+    async def cota(self, nome: str) -> AsyncIterator[None]:
+        """Ocupa uma das vagas de chamada simultânea da carteira"""
+        nome = self.resolver(nome)
+        semaforo = self._semaforos.get(nome)
+        if semaforo is None and self.obter(nome).max_concorrencia > 0:
+            semaforo = self._semaforos[nome] = asyncio.Semaphore(self.obter(nome).max_concorrencia)
+
+        if semaforo is not None:
+            self._aguardando[nome] += 1
+            try:
+                await semaforo.acquire()
+            finally:
+                self._aguardando[nome] -= 1
+        self._em_andamento[nome] += 1
+        try:
+            yield
+        finally:
+            self._em_andamento[nome] -= 1
+            if semaforo is not None:
+                semaforo.release()
+
+    def registrar_analise(self, nome: str, origem: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        nome = self.resolver(nome)
+        self._analises.setdefault(nome, Counter())[origem] += 1
+        if prompt_tokens or completion_tokens:
+            tokens = self._tokens.setdefault(nome, Counter())
+            tokens["prompt"] += prompt_tokens
+            tokens["completion"] += completion_tokens
+
+    def estatisticas(self) -> Dict[str, Dict[str, Any]]:
+        """Análises por origem, tokens gastos e ocupação da cota de cada carteira"""
+        nomes = set(self._analises) | set(self._em_andamento)
+        return {
+            nome: {
+                "analises": dict(self._analises.get(nome, {})),
+                "tokens": dict(self._tokens.get(nome, {})),
+                "cota": self.obter(nome).max_concorrencia or None,
+                "em_andamento": self._em_andamento[nome],
+                "aguardando": self._aguardando[nome]
+            }
+            for nome in sorted(nomes)
+        }
+
+def carregar_carteiras(texto: str = "", cota_padrao: int = 8) -> RegistroCarteiras:
+    """
+    Lê a configuração em JSON, por exemplo:
+    {"banco_x": {"instrucoes": "Tom formal, trate por senhor(a).", "max_concorrencia": 4}}
+    """
+    configuradas = {}
+    if texto:
+        try:
+            for nome, config in json.loads(texto).items():
+                configuradas[nome] = Carteira(
+                    nome,
+                    config.get("instrucoes", ""),
+                    int(config.get("max_concorrencia", cota_padrao))
+                )
+        except (ValueError, AttributeError, TypeError) as e:
+            print(f"⚠️ MCP_CARTEIRAS inválido, usando só a carteira padrão: {e}", file=sys.stderr)
+            configuradas = {}
+    return RegistroCarteiras(configuradas, cota_padrao)
+
+def carteiras_do_ambiente() -> RegistroCarteiras:
+    """
+    MCP_CARTEIRAS (JSON ou caminho de arquivo .json) e MCP_COTA_CARTEIRA,
+    a cota das carteiras listadas que não informam max_concorrencia
+    """
+    texto = os.getenv("MCP_CARTEIRAS", "")
+    if texto.endswith(".json") and os.path.exists(texto):
+        with open(texto, encoding="utf-8") as arquivo:
+            texto = arquivo.read()
+    return carregar_carteiras(texto, int(os.getenv("MCP_COTA_CARTEIRA", "8")))
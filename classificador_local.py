@@ -0,0 +1,176 @@
+# classificador_local.py
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_analises import normalizar_texto
+
+# Regras sobre o texto normalizado (minúsculas, sem acentos e sem pontuação).
+# Cada intenção usa os mesmos nomes e ações do SYSTEM_PROMPT do servidor.
+REGRAS = [
+    {
+        "intencao": "pagamento_realizado",
+        "acao": "agradecer_confirmar",
+        "sentimento": "positivo",
+        "urgencia": "baixa",
+        "confianca": 0.93,
+        "padrao": r"\b(ja (paguei|pago|efetuei|fiz o pagamento|quitei)|paguei|"
+                  r"pagamento (feito|realizado|efetuado)|(ta|esta|foi) pago|quitei)\b",
+        "negacao": r"\bnao (paguei|pago|foi pago|consegui pagar|quitei)\b|\bainda nao\b|"
+                   r"\bnunca (paguei|pago|quitei)\b"
+    },
+    {
+        "intencao": "solicitar_boleto",
+        "acao": "reenviar_boleto",
+        "sentimento": "neutro",
+        "urgencia": "media",
+        "confianca": 0.92,
+        "padrao": r"\b(nao (recebi|chegou|achei|encontrei) o boleto|perdi o boleto|"
+                  r"segunda via|cade o boleto|"
+                  r"(manda|mande|envia|envie|reenvia|reenvie|enviar|mandar|reenviar|"
+                  r"pode enviar|pode mandar) (o |um |novo |outro |de novo o )?(boleto|link|codigo de barras))\b",
+        "negacao": None
+    },
+    {
+        "intencao": "negociacao",
+        "acao": "enviar_opcoes_negociacao",
+        "sentimento": "neutro",
+        "urgencia": "media",
+        "confianca": 0.9,
+        "padrao": r"\b(negociar|negociacao|desconto|parcelar|parcelamento|fazer um acordo)\b",
+        "negacao": r"\bnao quero (negociar|parcelar|desconto)\b"
+    },
+    {
+        "intencao": "nao_reconhece",
+        "acao": "encaminhar_suporte",
+        "sentimento": "negativo",
+        "urgencia": "alta",
+        "confianca": 0.9,
+        "padrao": r"\b(nao reconheco|desconheco|nunca (contratei|comprei|assinei)|"
+                  r"nao (fiz|contratei) (essa|esta|isso|nenhuma)|isso nao e meu|nao devo nada)\b",
+        "negacao": None
+    },
+    {
+        "intencao": "contestacao",
+        "acao": "encaminhar_suporte",
+        "sentimento": "negativo",
+        "urgencia": "alta",
+        "confianca": 0.88,
+        "padrao": r"\b(valor (errado|incorreto|esta errado|abusivo)|"
+                  r"cobranca (indevida|errada|duplicada)|cobrado (duas vezes|em dobro|a mais)|"
+                  r"contesto|contestar)\b",
+        "negacao": None
+    },
+    {
+        "intencao": "dificuldade_financeira",
+        "acao": "oferecer_parcelamento",
+        "sentimento": "negativo",
+        "urgencia": "media",
+        "confianca": 0.88,
+        "padrao": r"\b(desempregad[oa]|sem (dinheiro|condicoes)|"
+                  r"nao tenho (dinheiro|condicoes|como pagar)|perdi (o|meu) emprego|"
+                  r"dificuldade financeira|passando (por )?dificuldade)\b",
+        "negacao": None
+    },
+    {
+        # Sem ação própria no prompt: fica abaixo do limiar e serve para
+        # marcar ambiguidade ("desempregado, podem aguardar?") e mandar à IA
+        "intencao": "prazo_adicional",
+        "acao": "oferecer_parcelamento",
+        "sentimento": "neutro",
+        "urgencia": "media",
+        "confianca": 0.7,
+        "padrao": r"\b(mais (tempo|prazo|uns dias)|prorrogar|adiar|aguardar|esperar|"
+                  r"semana que vem|proxim[oa] (semana|mes)|pago (amanha|depois))\b",
+        "negacao": None
+    },
+    {
+        "intencao": "informacao",
+        "acao": "explicar_divida",
+        "sentimento": "neutro",
+        "urgencia": "baixa",
+        "confianca": 0.87,
+        "padrao": r"\b(qual (e )?o valor|quanto (eu )?devo|qual o vencimento|"
+                  r"detalhes da (divida|cobranca)|do que se trata)\b",
+        "negacao": None
+    }
+]
+
+# Mensagens padrão por ação - {nome} é o primeiro nome do cliente
+MENSAGENS_ACAO = {
+    "agradecer_confirmar": "Olá {nome}, obrigado pelo retorno! Vamos confirmar o pagamento no sistema.",
+    "reenviar_boleto": "Olá {nome}, claro! Segue o seu boleto atualizado.",
+    "enviar_opcoes_negociacao": "Olá {nome}, podemos negociar sim! Vou te enviar as opções disponíveis.",
+    "encaminhar_suporte": "Olá {nome}, entendi. Vou encaminhar seu caso para nossa equipe analisar.",
+    "oferecer_parcelamento": "Olá {nome}, entendemos sua situação. Temos opções de parcelamento que podem ajudar.",
+    "explicar_divida": "Olá {nome}, segue o detalhamento da sua cobrança.",
+    "solicitar_comprovante": "Olá {nome}, obrigado! Pode nos enviar o comprovante de pagamento?",
+    "resposta_generica": "Olá {nome}, recebi sua mensagem e vou analisar."
+}
+
+# Palavras que indicam ressalva ("já paguei, mas..."), dúvida ("não sei se
+# paguei") ou pagamento parcial ("paguei metade") e reduzem a confiança
+_RE_RESSALVA = re.compile(r"\b(mas|porem|entretanto|so que|sei se|metade|parte|mes que vem)\b")
+
+class ClassificadorLocal:
+    """
+    Pré-classificador por regras que resolve as mensagens óbvias sem IA.
+
+    Só devolve resultado quando exatamente uma intenção casa, a mensagem é
+    curta e a confiança fica acima do limiar; o resto segue para a OpenAI.
+    """
+
+    def __init__(self, limiar_confianca: float = 0.85, max_palavras: int = 25):
+        self.limiar_confianca = limiar_confianca
+        self.max_palavras = max_palavras
+        self._regras: List[Tuple[Dict[str, Any], "re.Pattern", Optional["re.Pattern"]]] = [
+            (
+                regra,
+                re.compile(regra["padrao"]),
+                re.compile(regra["negacao"]) if regra["negacao"] else None
+            )
+            for regra in REGRAS
+        ]
+        self.consultas = 0
+        self.acertos = 0
+
+    def classificar(self, texto: str, nome_cliente: str = "") -> Optional[Dict[str, Any]]:
+        """Retorna análise completa no formato da IA ou None se a mensagem for ambígua"""
+        self.consultas += 1
+        normalizado = normalizar_texto(texto, nome_cliente)
+
+        if not normalizado or len(normalizado.split()) > self.max_palavras:
+            return None
+
+        encontradas = [
+            regra for regra, padrao, negacao in self._regras
+            if padrao.search(normalizado) and not (negacao and negacao.search(normalizado))
+        ]
+        if len(encontradas) != 1:
+            return None
+
+        regra = encontradas[0]
+        confianca = regra["confianca"]
+        if _RE_RESSALVA.search(normalizado):
+            confianca -= 0.15
+
+        if confianca < self.limiar_confianca:
+            return None
+
+        self.acertos += 1
+        primeiro_nome = nome_cliente.split()[0] if nome_cliente else ""
+        return {
+            "intencao": regra["intencao"],
+            "sentimento": regra["sentimento"],
+            "urgencia": regra["urgencia"],
+            "acao": regra["acao"],
+            "confianca": confianca,
+            "explicacao": f"Classificação local por regra: {regra['intencao']}",
+            "mensagem_sugerida": MENSAGENS_ACAO[regra["acao"]].format(nome=primeiro_nome)
+        }
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "consultas": self.consultas,
+            "acertos": self.acertos,
+            "taxa_acerto": self.acertos / self.consultas if self.consultas else 0.0
+        }
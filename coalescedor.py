@@ -0,0 +1,121 @@
+# coalescedor.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metricas import metricas
+
+# (texto, nome_cliente, tipo_cobranca, historico, carteira)
+Chave = Tuple[str, str, str, str, Optional[str]]
+Pendente = Tuple[Chave, Dict[str, Any], asyncio.Future]
+
+class CoalescedorAnalises:
+    """
+    Junta análises individuais em chamadas da ferramenta de lote.
+
+    Adaptativo: com o servidor ocioso a primeira chamada sai na hora; se
+    já há lote em andamento, as próximas esperam até `espera_maxima`
+    segundos ou `max_itens` itens e seguem juntas. Pedidos idênticos em
+    andamento (mesmo texto, cliente, tipo, histórico e carteira)
+    compartilham o mesmo resultado (single-flight).
+    """
+
+    def __init__(
+        self,
+        chamar_lote: Callable[[List[Dict[str, Any]]], Awaitable[List[Optional[Dict[str, Any]]]]],
+        max_itens: int = 20,
+        espera_maxima: float = 0.005
+    ):
+        self.chamar_lote = chamar_lote
+        self.max_itens = max(1, max_itens)
+        self.espera_maxima = espera_maxima
+        self._lote: List[Pendente] = []
+        self._em_voo: Dict[Chave, asyncio.Future] = {}
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._lotes_em_andamento = 0
+        self._tarefas: set = set()
+        self.chamadas = 0
+        self.deduplicadas = 0
+        self.lotes = 0
+
+    async def analisar(
+        self,
+        texto: str,
+        nome_cliente: str,
+        tipo_cobranca: str,
+        historico: str = "",
+        carteira: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        self.chamadas += 1
+        chave = (texto, nome_cliente, tipo_cobranca, historico, carteira)
+
+        futuro = self._em_voo.get(chave)
+        if futuro is not None:
+            self.deduplicadas += 1
+            metricas.incrementar("coalescedor_deduplicadas_total")
+        else:
+            futuro = asyncio.get_running_loop().create_future()
+            self._em_voo[chave] = futuro
+            self._lote.append((chave, {
+                "texto": texto,
+                "nome_cliente": nome_cliente,
+                "tipo_cobranca": tipo_cobranca,
+                "historico": historico,
+                "carteira": carteira
+            }, futuro))
+            self._agendar()
+
+        # shield: cancelar um chamador não cancela o resultado dos outros
+        resultado = await asyncio.shield(futuro)
+        return dict(resultado) if resultado else resultado
+
+    def _agendar(self):
+        if len(self._lote) >= self.max_itens or self._lotes_em_andamento == 0:
+            self._disparar()
+        elif self._temporizador is None:
+            self._temporizador = asyncio.get_running_loop().call_later(
+                self.espera_maxima, self._disparar
+            )
+
+    def _disparar(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        if not self._lote:
+            return
+
+        lote, self._lote = self._lote, []
+        self._lotes_em_andamento += 1
+        tarefa = asyncio.ensure_future(self._executar(lote))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _executar(self, lote: List[Pendente]):
+        self.lotes += 1
+        metricas.observar("coalescedor_itens_por_lote", len(lote), baldes=(1, 2, 4, 8, 16, 32, 64))
+        try:
+            resultados = await self.chamar_lote([item for _, item, _ in lote])
+            for (_, _, futuro), resultado in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(resultado)
+        except Exception as e:
+            for _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+        finally:
+            for chave, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_result(None)
+                if self._em_voo.get(chave) is futuro:
+                    del self._em_voo[chave]
+            self._lotes_em_andamento -= 1
+            # O que juntou enquanto este lote estava fora sai sem esperar o prazo
+            if self._lote and self._lotes_em_andamento == 0:
+                self._disparar()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "chamadas": self.chamadas,
+            "deduplicadas": self.deduplicadas,
+            "lotes": self.lotes,
+            "itens_por_lote": (self.chamadas - self.deduplicadas) / self.lotes if self.lotes else 0.0
+        }
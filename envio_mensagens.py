@@ -0,0 +1,417 @@
+# envio_mensagens.py
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from metricas import metricas
+
+# (remetente, telefone, texto)
+Mensagem = Tuple[str, str, str]
+
+class LimitadorTokenBucket:
+    """Token bucket: `taxa` envios por segundo com rajadas de até `capacidade`"""
+
+    def __init__(self, taxa: float, capacidade: Optional[float] = None):
+        self.taxa = taxa
+        self.capacidade = capacidade or taxa
+        self.tokens = self.capacidade
+        self.atualizado_em = time.monotonic()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+
+    async def aguardar(self, quantidade: float = 1):
+        """
+        Espera até haver tokens para `quantidade` envios e os consome.
+        Lotes maiores que o balde são pagos em parcelas de até `capacidade`,
+        ao longo de várias reposições.
+        """
+        restante = quantidade
+        while restante > 0:
+            parcela = min(restante, self.capacidade)
+            self._repor()
+            if self.tokens >= parcela:
+                self.tokens -= parcela
+                restante -= parcela
+                continue
+            await asyncio.sleep((parcela - self.tokens) / self.taxa)
+
+class TransporteConsole:
+    """Transporte padrão: imprime as mensagens como o bot sempre fez"""
+
+    async def enviar_lote(self, mensagens: List[Mensagem]) -> bool:
+        for _, telefone, texto in mensagens:
+            print(f"📤 ENVIADO para {telefone}:")
+            print(f"   {texto}")
+        return True
+
+    async def fechar(self):
+        pass
+
+class ErroEnvioPermanente(Exception):
+    """Recusa definitiva do provedor (ex.: 400) - não adianta tentar de novo"""
+
+class TransporteHTTP:
+    """
+    Envia lotes por POST JSON a um gateway WhatsApp.
+
+    Usa um único httpx.AsyncClient com pool de conexões keep-alive,
+    criado sob demanda no loop em execução.
+    """
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 10.0, max_conexoes: int = 20):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self.max_conexoes = max_conexoes
+        self._cliente = None
+
+    def _obter_cliente(self):
+        if self._cliente is None:
+            import httpx
+
+            cabecalhos = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+            self._cliente = httpx.AsyncClient(
+                timeout=self.timeout,
+                headers=cabecalhos,
+                limits=httpx.Limits(
+                    max_connections=self.max_conexoes,
+                    max_keepalive_connections=self.max_conexoes
+                )
+            )
+        return self._cliente
+
+    async def enviar_lote(self, mensagens: List[Mensagem]) -> bool:
+        corpo = {
+            "mensagens": [
+                {"remetente": remetente, "telefone": telefone, "texto": texto}
+                for remetente, telefone, texto in mensagens
+            ]
+        }
+        resposta = await self._obter_cliente().post(self.url, json=corpo)
+
+        if resposta.status_code < 300:
+            return True
+        if resposta.status_code == 429 or resposta.status_code >= 500:
+            return False
+        raise ErroEnvioPermanente(f"HTTP {resposta.status_code}: {resposta.text[:200]}")
+
+    async def fechar(self):
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+
+class FilaRetentativas:
+    """
+    Fila durável em SQLite das mensagens a enviar: primeiros envios
+    (tentativas = 0) e retentativas com backoff.
+
+    Sobrevive a quedas do processo: o que não foi entregue continua lá
+    até ser enviado, recusado pelo provedor ou passar do limite de
+    tentativas (status 'morta').
+    """
+
+    def __init__(self, caminho: str = "fila_envio.db"):
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pendentes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                remetente TEXT NOT NULL,
+                telefone TEXT NOT NULL,
+                texto TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                proxima_tentativa REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pendente'
+            )
+            """
+        )
+        self.conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pendentes_proxima ON pendentes (status, proxima_tentativa)"
+        )
+        self.conexao.commit()
+
+    def adicionar(self, mensagens: List[Mensagem], tentativas: int, atraso: float):
+        self.conexao.executemany(
+            "INSERT INTO pendentes (remetente, telefone, texto, tentativas, proxima_tentativa) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(r, t, m, tentativas, time.time() + atraso) for r, t, m in mensagens]
+        )
+        self.conexao.commit()
+
+    def vencidas(self, limite: int = 500) -> List[Tuple[int, str, str, str, int]]:
+        """(id, remetente, telefone, texto, tentativas) prontas para envio"""
+        return self.conexao.execute(
+            "SELECT id, remetente, telefone, texto, tentativas FROM pendentes "
+            "WHERE status = 'pendente' AND proxima_tentativa <= ? "
+            "ORDER BY proxima_tentativa LIMIT ?",
+            (time.time(), limite)
+        ).fetchall()
+
+    def concluir(self, ids: List[int]):
+        self.conexao.executemany("DELETE FROM pendentes WHERE id = ?", [(i,) for i in ids])
+        self.conexao.commit()
+
+    def reagendar(self, ids: List[int], atraso: float):
+        self.conexao.executemany(
+            "UPDATE pendentes SET tentativas = tentativas + 1, proxima_tentativa = ? WHERE id = ?",
+            [(time.time() + atraso, i) for i in ids]
+        )
+        self.conexao.commit()
+
+    def marcar_mortas(self, ids: List[int]):
+        self.conexao.executemany(
+            "UPDATE pendentes SET status = 'morta' WHERE id = ?", [(i,) for i in ids]
+        )
+        self.conexao.commit()
+
+    def pendentes(self) -> int:
+        return self.conexao.execute(
+            "SELECT COUNT(*) FROM pendentes WHERE status = 'pendente'"
+        ).fetchone()[0]
+
+    def fechar(self):
+        self.conexao.close()
+
+class DespachanteMensagens:
+    """
+    Fila de saída do bot: enfileirar() não espera o envio, e descarregar()
+    envia em lotes por remetente respeitando o token bucket de cada número.
+
+    Com fila durável configurada toda mensagem é gravada em disco ao ser
+    enfileirada e só sai de lá quando entregue; lotes que falham voltam
+    para a fila com backoff exponencial. Sem ela a fila é só em memória.
+    """
+
+    def __init__(
+        self,
+        transporte=None,
+        remetente_padrao: str = "bot",
+        taxa_por_remetente: float = 20.0,
+        tamanho_lote: int = 50,
+        fila_retentativas: Optional[FilaRetentativas] = None,
+        max_tentativas: int = 5,
+        atraso_base: float = 2.0
+    ):
+        self.transporte = transporte or TransporteConsole()
+        self.remetente_padrao = remetente_padrao
+        self.taxa_por_remetente = taxa_por_remetente
+        self.tamanho_lote = tamanho_lote
+        self.fila_retentativas = fila_retentativas
+        self.max_tentativas = max_tentativas
+        self.atraso_base = atraso_base
+        self._fila: Deque[Mensagem] = deque()
+        self._limitadores: Dict[str, LimitadorTokenBucket] = {}
+        self.enviadas = 0
+        self.reagendadas = 0
+        self.perdidas = 0
+
+    def enfileirar(self, telefone: str, texto: str, remetente: Optional[str] = None):
+        """Coloca a mensagem na fila de saída e volta sem esperar o envio"""
+        self.enfileirar_lote([(telefone, texto)], remetente)
+
+    def enfileirar_lote(self, mensagens: List[Tuple[str, str]], remetente: Optional[str] = None):
+        """Vários (telefone, texto) de uma vez - uma única transação na fila durável"""
+        remetente = remetente or self.remetente_padrao
+        lote = [(remetente, telefone, texto) for telefone, texto in mensagens]
+        if self.fila_retentativas:
+            self.fila_retentativas.adicionar(lote, tentativas=0, atraso=0)
+        else:
+            self._fila.extend(lote)
+
+    async def enviar(self, telefone: str, texto: str):
+        """Versão awaitable de enfileirar, para usar como `enviar` do bot assíncrono"""
+        self.enfileirar(telefone, texto)
+
+    def _limitador(self, remetente: str) -> LimitadorTokenBucket:
+        limitador = self._limitadores.get(remetente)
+        if limitador is None:
+            limitador = self._limitadores[remetente] = LimitadorTokenBucket(self.taxa_por_remetente)
+        return limitador
+
+    def _atraso(self, tentativas: int) -> float:
+        return self.atraso_base * (2 ** tentativas) * random.uniform(0.8, 1.2)
+
+    async def _enviar_lote(self, lote: List[Mensagem]) -> Optional[bool]:
+        """True se entregue, False se vale tentar de novo, None se recusado de vez"""
+        await self._limitador(lote[0][0]).aguardar(len(lote))
+        try:
+            with metricas.cronometrar("envio_lote_segundos"):
+                return await self.transporte.enviar_lote(lote)
+        except ErroEnvioPermanente as e:
+            print(f"❌ Envio recusado pelo provedor: {e}")
+            self.perdidas += len(lote)
+            metricas.incrementar("envio_mensagens_total", len(lote), resultado="recusada")
+            return None
+        except Exception as e:
+            print(f"⚠️ Falha no envio de lote: {e}")
+            return False
+
+    async def descarregar(self):
+        """Envia tudo que está na fila (memória e mensagens vencidas em disco), agrupado por remetente"""
+        por_remetente: Dict[str, List[Mensagem]] = defaultdict(list)
+        while self._fila:
+            mensagem = self._fila.popleft()
+            por_remetente[mensagem[0]].append(mensagem)
+
+        async def enviar_remetente(mensagens: List[Mensagem]):
+            for i in range(0, len(mensagens), self.tamanho_lote):
+                lote = mensagens[i:i + self.tamanho_lote]
+                enviado = await self._enviar_lote(lote)
+                if enviado:
+                    self.enviadas += len(lote)
+                    metricas.incrementar("envio_mensagens_total", len(lote), resultado="enviada")
+                elif enviado is False:
+                    self._guardar_para_retentativa(lote)
+
+        # Remetentes diferentes têm limites independentes e seguem em paralelo
+        await asyncio.gather(*(enviar_remetente(m) for m in por_remetente.values()))
+
+        if self.fila_retentativas:
+            await self._descarregar_duravel()
+
+    def _guardar_para_retentativa(self, lote: List[Mensagem]):
+        self.reagendadas += len(lote)
+        metricas.incrementar("envio_mensagens_total", len(lote), resultado="reagendada")
+        if self.fila_retentativas:
+            self.fila_retentativas.adicionar(lote, tentativas=1, atraso=self._atraso(0))
+        else:
+            print(f"⚠️ {len(lote)} mensagens sem fila de retentativas configurada - descartadas")
+            self.perdidas += len(lote)
+
+    async def _descarregar_duravel(self):
+        """Envia as mensagens vencidas da fila em disco até não sobrar nenhuma pronta"""
+        while True:
+            vencidas = self.fila_retentativas.vencidas()
+            if not vencidas:
+                return
+            por_remetente: Dict[str, List[Tuple[int, str, str, str, int]]] = defaultdict(list)
+            for registro in vencidas:
+                por_remetente[registro[1]].append(registro)
+            await asyncio.gather(*(self._enviar_registros(r) for r in por_remetente.values()))
+
+    async def _enviar_registros(self, registros: List[Tuple[int, str, str, str, int]]):
+        for i in range(0, len(registros), self.tamanho_lote):
+            grupo = registros[i:i + self.tamanho_lote]
+            ids = [r[0] for r in grupo]
+            enviado = await self._enviar_lote([(r[1], r[2], r[3]) for r in grupo])
+            if enviado:
+                self.fila_retentativas.concluir(ids)
+                self.enviadas += len(grupo)
+                metricas.incrementar("envio_mensagens_total", len(grupo), resultado="enviada")
+                continue
+            if enviado is None:
+                # Recusa definitiva: fica registrada como morta em vez de sumir
+                self.fila_retentativas.marcar_mortas(ids)
+                continue
+
+            esgotadas = {r[0] for r in grupo if r[4] + 1 >= self.max_tentativas}
+            if esgotadas:
+                self.fila_retentativas.marcar_mortas(list(esgotadas))
+                self.perdidas += len(esgotadas)
+            restantes = [r for r in grupo if r[0] not in esgotadas]
+            if restantes:
+                self.reagendadas += len(restantes)
+                metricas.incrementar("envio_mensagens_total", len(restantes), resultado="reagendada")
+                self.fila_retentativas.reagendar(
+                    [r[0] for r in restantes], self._atraso(restantes[0][4])
+                )
+
+    async def executar(self, intervalo: float = 0.5, parar: Optional[asyncio.Event] = None):
+        """Laço de envio contínuo para processos de longa duração"""
+        parar = parar or asyncio.Event()
+        while not parar.is_set():
+            await self.descarregar()
+            try:
+                await asyncio.wait_for(parar.wait(), intervalo)
+            except asyncio.TimeoutError:
+                pass
+        await self.descarregar()
+
+    async def _drenar(self):
+        try:
+            await self.descarregar()
+        finally:
+            await self.transporte.fechar()
+
+    def drenar_sync(self):
+        """Envia a fila de forma síncrona (bot síncrono, fim de execução)"""
+        asyncio.run(self._drenar())
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "na_fila": len(self._fila),
+            "enviadas": self.enviadas,
+            "reagendadas": self.reagendadas,
+            "perdidas": self.perdidas,
+            "pendentes_em_disco": self.fila_retentativas.pendentes() if self.fila_retentativas else 0
+        }
+
+class ServidorWhatsAppMock:
+    """Gateway HTTP local para testes: registra os lotes e falha numa taxa configurável"""
+
+    def __init__(self, taxa_falha: float = 0.0, semente: int = 3):
+        self.taxa_falha = taxa_falha
+        self.aleatorio = random.Random(semente)
+        self.recebidas: List[Dict[str, Any]] = []
+        self._trava = threading.Lock()
+        self._http = None
+
+    def iniciar(self) -> str:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with servidor._trava:
+                    falhar = servidor.aleatorio.random() < servidor.taxa_falha
+                    if not falhar:
+                        servidor.recebidas.extend(corpo.get("mensagens", []))
+                self.send_response(503 if falhar else 200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._http.server_address[1]}/mensagens"
+
+    def parar(self):
+        if self._http:
+            self._http.shutdown()
+            self._http.server_close()
+
+def criar_despachante(url: Optional[str] = None, sufixo_fila: str = "") -> Optional[DespachanteMensagens]:
+    """
+    Despachante configurado pelo ambiente, ou None se não houver gateway.
+
+    WHATSAPP_API_URL, WHATSAPP_TOKEN, WHATSAPP_REMETENTE, WHATSAPP_TAXA
+    (envios/s por remetente) e WHATSAPP_FILA_RETENTATIVAS (arquivo SQLite).
+    `sufixo_fila` dá a cada processo de disparo a sua própria fila de
+    retentativas, para que dois processos não reenviem as mesmas linhas.
+    """
+    url = url or os.getenv("WHATSAPP_API_URL")
+    if not url:
+        return None
+
+    return DespachanteMensagens(
+        transporte=TransporteHTTP(url, token=os.getenv("WHATSAPP_TOKEN")),
+        remetente_padrao=os.getenv("WHATSAPP_REMETENTE", "bot"),
+        taxa_por_remetente=float(os.getenv("WHATSAPP_TAXA", "20")),
+        fila_retentativas=FilaRetentativas(
+            os.getenv("WHATSAPP_FILA_RETENTATIVAS", "fila_envio.db") + sufixo_fila
+        )
+    )
@@ -0,0 +1,61 @@
+# esquema_resultado.py
+import json
+import sys
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:  # opcional - acelera o JSON quando instalado
+    orjson = None
+
+# Campo -> valor usado quando a IA não devolve o campo
+PADROES = {
+    "intencao": "nao_identificada",
+    "sentimento": "neutro",
+    "urgencia": "media",
+    "acao": "resposta_generica",
+    "confianca": 0.5,
+    "explicacao": "",
+}
+CAMPOS = frozenset(PADROES) | {"mensagem_sugerida"}
+
+# Ausência destes merece aviso; os demais são só descritivos
+OBRIGATORIOS = ("intencao", "acao", "confianca", "mensagem_sugerida")
+
+def normalizar_analise(analise: Dict[str, Any], nome_cliente: str = "") -> Dict[str, Any]:
+    """
+    Único caminho de validação usado por servidor e cliente: completa os
+    campos ausentes e garante confianca numérica entre 0 e 1. O resultado
+    já normalizado passa direto pelo primeiro teste.
+    """
+    if CAMPOS <= analise.keys() and type(analise["confianca"]) is float and 0.0 <= analise["confianca"] <= 1.0:
+        return analise
+
+    for campo in OBRIGATORIOS:
+        if campo not in analise:
+            print(f"⚠️ Campo ausente na resposta IA: {campo}", file=sys.stderr)
+    for campo, padrao in PADROES.items():
+        analise.setdefault(campo, padrao)
+    if not analise.get("mensagem_sugerida"):
+        analise["mensagem_sugerida"] = f"Resposta para {nome_cliente}"
+
+    try:
+        analise["confianca"] = min(1.0, max(0.0, float(analise["confianca"])))
+    except (TypeError, ValueError):
+        analise["confianca"] = PADROES["confianca"]
+    return analise
+
+if orjson is not None:
+    def dumps(valor: Any) -> str:
+        """JSON compacto (orjson)"""
+        return orjson.dumps(valor).decode()
+
+    def loads(texto: str) -> Any:
+        # orjson.JSONDecodeError herda de json.JSONDecodeError
+        return orjson.loads(texto)
+else:
+    def dumps(valor: Any) -> str:
+        """JSON compacto: sem indentação nem espaços, acentos sem escape"""
+        return json.dumps(valor, ensure_ascii=False, separators=(",", ":"))
+
+    loads = json.loads
@@ -0,0 +1,319 @@
+# gravacao_analises.py
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from esquema_resultado import dumps, loads
+
+# Análises por chamada de MotorAcoes.executar_lote no reprocessamento
+LOTE_REPRODUCAO = 1000
+
+CAMPOS_ENTRADA = ("texto", "nome_cliente", "tipo_cobranca", "historico", "carteira")
+
+# Cadastro do devedor que as ações usam para montar a mensagem final
+CAMPOS_CLIENTE = ("telefone", "vencimento", "link_boleto")
+
+_cliente_em_analise: ContextVar[Optional[Mapping[str, Any]]] = ContextVar("cliente_em_analise", default=None)
+
+def anotar_cliente(cliente: Mapping[str, Any]):
+    """Devedor das próximas análises desta tarefa - os bots chamam antes de analisar"""
+    _cliente_em_analise.set(cliente)
+
+def montar_entrada(
+    dados: Mapping[str, Any],
+    cliente: Optional[Mapping[str, Any]],
+    ocorrencias: Counter
+) -> Dict[str, Any]:
+    """
+    Entrada de uma análise: campos enviados ao servidor, cadastro do devedor
+    (do `cliente` ou do próprio item de lote) e o número da ocorrência da
+    mesma mensagem do mesmo devedor nesta execução.
+    """
+    entrada = {campo: dados.get(campo, "") for campo in CAMPOS_ENTRADA}
+    cadastro = cliente if cliente is not None else dados
+    for campo in CAMPOS_CLIENTE:
+        valor = cadastro.get(campo)
+        if valor is not None:
+            entrada[campo] = valor.isoformat() if isinstance(valor, date) else valor
+
+    ocorrencia = (entrada.get("telefone") or entrada["nome_cliente"], entrada["texto"])
+    entrada["n"] = ocorrencias[ocorrencia]
+    ocorrencias[ocorrencia] += 1
+    return entrada
+
+def chave_entrada(entrada: Mapping[str, Any]) -> str:
+    """
+    Identificador curto e estável: devedor, texto recebido e ocorrência.
+    O histórico fica de fora - ele muda com o texto do bot, não com o cliente.
+    """
+    bruto = "\x1f".join((entrada.get("telefone") or entrada["nome_cliente"], entrada["texto"], str(entrada["n"])))
+    return hashlib.blake2b(bruto.encode(), digest_size=8).hexdigest()
+
+class GravadorAnalises:
+    """
+    Log só de inclusão com entrada e resultado de cada análise, em JSON
+    lines compacto: {"k": chave, "ts": ..., "e": entrada, "r": resultado}.
+
+    O índice chave -> deslocamento em bytes fica em `<caminho>.idx` e é
+    atualizado de forma incremental: ao abrir, só o trecho do log depois
+    do último deslocamento indexado é lido. Cada registro é descarregado
+    no arquivo ao ser gravado, então uma queda perde no máximo o índice,
+    que é refeito a partir do log na próxima abertura.
+
+    Gravar de novo no mesmo log sobrepõe, no índice, as chaves da execução
+    anterior: o replay segue a gravação mais recente.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.caminho_indice = f"{caminho}.idx"
+        self.indice: Dict[str, int] = {}
+        self._tamanho_indexado = 0
+        self._carregar_indice()
+        self._arquivo = None
+        self.ocorrencias: Counter = Counter()
+
+    def _carregar_indice(self):
+        try:
+            with open(self.caminho_indice, encoding="utf-8") as arquivo:
+                salvo = json.load(arquivo)
+            if salvo.get("tamanho", 0) <= os.path.getsize(self.caminho):
+                self.indice = salvo["deslocamentos"]
+                self._tamanho_indexado = salvo["tamanho"]
+        except (OSError, ValueError, KeyError):
+            self.indice, self._tamanho_indexado = {}, 0
+
+        if os.path.exists(self.caminho):
+            self._indexar_a_partir(self._tamanho_indexado)
+
+    def _indexar_a_partir(self, deslocamento: int):
+        with open(self.caminho, "rb") as arquivo:
+            arquivo.seek(deslocamento)
+            while True:
+                linha = arquivo.readline()
+                if not linha.endswith(b"\n"):
+                    break  # fim do arquivo ou linha truncada por queda
+                try:
+                    self.indice[loads(linha)["k"]] = deslocamento
+                except (ValueError, KeyError):
+                    pass
+                deslocamento += len(linha)
+        self._tamanho_indexado = deslocamento
+
+    def gravar(
+        self,
+        dados: Mapping[str, Any],
+        resultado: Optional[Dict[str, Any]],
+        cliente: Optional[Mapping[str, Any]] = None
+    ):
+        # Conta a ocorrência mesmo sem resultado, como o replay faz
+        entrada = montar_entrada(dados, cliente, self.ocorrencias)
+        if resultado is None:
+            return
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, "ab")
+            self._arquivo.seek(0, os.SEEK_END)
+            self._tamanho_indexado = self._arquivo.tell()
+
+        chave = chave_entrada(entrada)
+        linha = (dumps({"k": chave, "ts": round(time.time(), 3), "e": entrada, "r": resultado}) + "\n").encode()
+
+        self.indice[chave] = self._tamanho_indexado
+        self._arquivo.write(linha)
+        self._arquivo.flush()
+        self._tamanho_indexado += len(linha)
+
+    def fechar(self):
+        """Descarrega o log e grava o índice ao lado"""
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+        temporario = f"{self.caminho_indice}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump({"tamanho": self._tamanho_indexado, "deslocamentos": self.indice}, arquivo)
+        os.replace(temporario, self.caminho_indice)
+
+def ler_gravacao(caminho: str) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """(entrada, resultado) de cada registro, na ordem gravada"""
+    with open(caminho, "rb") as arquivo:
+        for linha in arquivo:
+            if not linha.endswith(b"\n"):
+                break
+            registro = loads(linha)
+            yield registro["e"], registro["r"]
+
+class ClienteGravador:
+    """Envolve um cliente MCP e grava cada análise devolvida por ele"""
+
+    def __init__(self, cliente, gravador: GravadorAnalises):
+        self.cliente = cliente
+        self.gravador = gravador
+
+    def __getattr__(self, nome):
+        return getattr(self.cliente, nome)
+
+    async def conectar(self, *args, **kwargs):
+        return await self.cliente.conectar(*args, **kwargs)
+
+    async def analisar_mensagem(
+        self,
+        texto: str,
+        nome_cliente: str,
+        tipo_cobranca: str,
+        historico: str = "",
+        carteira: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        resultado = await self.cliente.analisar_mensagem(texto, nome_cliente, tipo_cobranca, historico, carteira)
+        self.gravador.gravar({
+            "texto": texto, "nome_cliente": nome_cliente,
+            "tipo_cobranca": tipo_cobranca, "historico": historico, "carteira": carteira or ""
+        }, resultado, _cliente_em_analise.get())
+        return resultado
+
+    async def analisar_mensagens_lote(self, itens: List[Dict[str, Any]], *args, **kwargs) -> List[Dict[str, Any]]:
+        resultados = await self.cliente.analisar_mensagens_lote(itens, *args, **kwargs)
+        for item, resultado in zip(itens, resultados):
+            self.gravador.gravar(item, resultado)
+        return resultados
+
+    async def desconectar(self):
+        self.gravador.fechar()
+        await self.cliente.desconectar()
+
+class ClienteReplay:
+    """
+    Substitui o cliente MCP devolvendo as análises gravadas - sem servidor,
+    sem OpenAI. Entradas que não estão na gravação devolvem None (o bot
+    cai no fallback de sempre).
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.connected = False
+        self.encontradas = 0
+        self.ausentes = 0
+        self._indice: Dict[str, int] = {}
+        self._arquivo = None
+        self._ocorrencias: Counter = Counter()
+
+    async def conectar(self, *args, **kwargs) -> bool:
+        if not os.path.exists(self.caminho):
+            print(f"❌ Gravação não encontrada: {self.caminho}")
+            return False
+        gravador = GravadorAnalises(self.caminho)
+        self._indice = gravador.indice
+        self._arquivo = open(self.caminho, "rb")
+        self.connected = True
+        print(f"📼 Reproduzindo {len(self._indice)} análises gravadas de {self.caminho}")
+        return True
+
+    def buscar(
+        self,
+        dados: Mapping[str, Any],
+        cliente: Optional[Mapping[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        entrada = montar_entrada(dados, cliente, self._ocorrencias)
+        deslocamento = self._indice.get(chave_entrada(entrada))
+        if deslocamento is None:
+            self.ausentes += 1
+            return None
+        self._arquivo.seek(deslocamento)
+        self.encontradas += 1
+        return loads(self._arquivo.readline())["r"]
+
+    async def analisar_mensagem(
+        self,
+        texto: str,
+        nome_cliente: str,
+        tipo_cobranca: str,
+        historico: str = "",
+        carteira: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        return self.buscar({
+            "texto": texto, "nome_cliente": nome_cliente,
+            "tipo_cobranca": tipo_cobranca, "historico": historico, "carteira": carteira or ""
+        }, _cliente_em_analise.get())
+
+    async def analisar_mensagens_lote(self, itens: List[Dict[str, Any]], *args, **kwargs) -> List[Optional[Dict[str, Any]]]:
+        return [self.buscar(item) for item in itens]
+
+    async def desconectar(self):
+        if self._arquivo:
+            self._arquivo.close()
+            self._arquivo = None
+        self.connected = False
+        print(f"📼 Replay: {self.encontradas} encontradas, {self.ausentes} ausentes")
+
+def envolver_cliente(cliente, gravar: Optional[str] = None, reproduzir: Optional[str] = None):
+    """Troca o cliente pelo replay ou o envolve no gravador, conforme os caminhos"""
+    if reproduzir:
+        return ClienteReplay(reproduzir)
+    if gravar:
+        return ClienteGravador(cliente, GravadorAnalises(gravar))
+    return cliente
+
+def reproduzir_acoes(caminho: str, mostrar: bool = False) -> Dict[str, Any]:
+    """
+    Passa todas as análises gravadas pelo motor de ações do bot, sem IA.
+    Útil para testar mudanças de mapeamento ou templates em tráfego real.
+    """
+    from motor_acoes import MotorAcoes
+
+    motor = MotorAcoes()
+    inicio = time.perf_counter()
+    total = 0
+    sem_cadastro = 0
+    lote: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]] = []
+
+    def executar_lote():
+        respostas = motor.executar_lote((resultado, cliente) for _, resultado, cliente in lote)
+        if mostrar:
+            for (entrada, resultado, _), (mensagem, _) in zip(lote, respostas):
+                print(f"💬 '{entrada['texto']}' -> {resultado.get('acao')}: {mensagem}")
+        lote.clear()
+
+    for entrada, resultado in ler_gravacao(caminho):
+        # Análises gravadas fora do bot (benchmark, lotes sem cadastro) não têm devedor
+        if not all(campo in entrada for campo in CAMPOS_CLIENTE):
+            sem_cadastro += 1
+            continue
+        cliente = {
+            "nome": entrada["nome_cliente"],
+            "telefone": entrada["telefone"],
+            "tipo_cobranca": entrada["tipo_cobranca"],
+            "link_boleto": entrada["link_boleto"],
+            "vencimento": datetime.fromisoformat(entrada["vencimento"])
+        }
+        lote.append((entrada, resultado, cliente))
+        total += 1
+        if len(lote) >= LOTE_REPRODUCAO:
+            executar_lote()
+    executar_lote()
+
+    duracao = time.perf_counter() - inicio
+    return {
+        "analises": total,
+        "sem_cadastro": sem_cadastro,
+        "segundos": round(duracao, 3),
+        "analises_por_segundo": round(total / duracao) if duracao else 0,
+        "acoes": dict(Counter(motor.estatisticas()).most_common())
+    }
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Reprocessa análises gravadas pelo motor de ações, sem OpenAI")
+    parser.add_argument("gravacao", help="Arquivo JSON lines gravado com MCP_GRAVAR_ANALISES")
+    parser.add_argument("--mostrar", action="store_true", help="Imprime a mensagem final de cada análise")
+    return parser
+
+if __name__ == "__main__":
+    args = criar_parser().parse_args()
+    print("📼 REPROCESSAMENTO DE ANÁLISES GRAVADAS")
+    print("=" * 50)
+    for chave, valor in reproduzir_acoes(args.gravacao, args.mostrar).items():
+        print(f"   {chave}: {valor}")
@@ -0,0 +1,130 @@
+# historico_conversas.py
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Como cada lado aparece no resumo enviado à IA
+ROTULOS_ORIGEM = {"cliente": "Cliente", "bot": "Bot"}
+
+Mensagem = Tuple[float, str, str]  # (timestamp, origem, texto)
+
+class HistoricoConversas:
+    """
+    Histórico recente por telefone com memória limitada.
+
+    Cada telefone guarda só as últimas `max_mensagens` num ring buffer, e
+    só os `max_telefones` mais recentes ficam em memória (LRU). Com
+    `caminho`, cada mensagem também vai para um log append-only em JSON
+    lines, relido na inicialização. O log é compactado sozinho (na carga
+    e durante o uso) quando passa do dobro do que está em memória e de
+    `compactar_apos` linhas, então disco e tempo de partida ficam limitados.
+    """
+
+    def __init__(
+        self,
+        max_mensagens: int = 20,
+        max_telefones: int = 50000,
+        caminho: Optional[str] = None,
+        compactar_apos: int = 10000
+    ):
+        self.max_mensagens = max_mensagens
+        self.max_telefones = max_telefones
+        self.caminho = caminho
+        self.compactar_apos = compactar_apos
+        self._conversas: "OrderedDict[str, Deque[Mensagem]]" = OrderedDict()
+        self._linhas_log = 0
+        self._proxima_compactacao = compactar_apos
+
+        if caminho and os.path.exists(caminho):
+            self._carregar(caminho)
+            self._compactar_se_preciso()
+
+    def _carregar(self, caminho: str):
+        with open(caminho, encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                self._linhas_log += 1
+                try:
+                    registro = json.loads(linha)
+                    self._adicionar(registro["tel"], (registro["ts"], registro["o"], registro["m"]))
+                except (ValueError, KeyError):
+                    continue  # linha truncada por queda no meio da escrita
+
+    def _adicionar(self, telefone: str, mensagem: Mensagem):
+        conversa = self._conversas.get(telefone)
+        if conversa is None:
+            conversa = self._conversas[telefone] = deque(maxlen=self.max_mensagens)
+        else:
+            self._conversas.move_to_end(telefone)
+        conversa.append(mensagem)
+
+        while len(self._conversas) > self.max_telefones:
+            self._conversas.popitem(last=False)
+
+    def registrar(self, telefone: str, origem: str, texto: str):
+        """Guarda mensagem recebida (origem='cliente') ou enviada (origem='bot')"""
+        mensagem = (time.time(), origem, texto)
+        self._adicionar(telefone, mensagem)
+
+        if self.caminho:
+            with open(self.caminho, "a", encoding="utf-8") as arquivo:
+                arquivo.write(json.dumps(
+                    {"tel": telefone, "ts": mensagem[0], "o": origem, "m": texto},
+                    ensure_ascii=False
+                ) + "\n")
+            self._linhas_log += 1
+            self._compactar_se_preciso()
+
+    def _compactar_se_preciso(self):
+        if self._linhas_log >= self._proxima_compactacao:
+            self.compactar()
+
+    def mensagens(self, telefone: str) -> List[Mensagem]:
+        return list(self._conversas.get(telefone, ()))
+
+    def resumo(self, telefone: str, max_tokens: int = 150, max_caracteres_mensagem: int = 160) -> str:
+        """
+        Histórico compacto para o argumento `historico` da análise.
+
+        Vai da mensagem mais nova para a mais antiga até estourar o
+        orçamento (estimado em ~4 caracteres por token) e devolve em
+        ordem cronológica, uma mensagem por linha.
+        """
+        orcamento = max_tokens * 4
+        linhas: List[str] = []
+
+        for _, origem, texto in reversed(self._conversas.get(telefone, ())):
+            texto = " ".join(texto.split())
+            if len(texto) > max_caracteres_mensagem:
+                texto = texto[:max_caracteres_mensagem - 1] + "…"
+            linha = f"{ROTULOS_ORIGEM.get(origem, origem)}: {texto}"
+
+            if len(linha) + 1 > orcamento:
+                break
+            orcamento -= len(linha) + 1
+            linhas.append(linha)
+
+        return "\n".join(reversed(linhas))
+
+    def compactar(self):
+        """Reescreve o log só com o que está em memória, limitando o tamanho em disco"""
+        if not self.caminho:
+            return
+        temporario = f"{self.caminho}.tmp"
+        linhas = 0
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            for telefone, conversa in self._conversas.items():
+                for ts, origem, texto in conversa:
+                    arquivo.write(json.dumps(
+                        {"tel": telefone, "ts": ts, "o": origem, "m": texto},
+                        ensure_ascii=False
+                    ) + "\n")
+                    linhas += 1
+        os.replace(temporario, self.caminho)
+        # Próxima compactação quando o log dobrar: custo amortizado constante por mensagem
+        self._linhas_log = linhas
+        self._proxima_compactacao = max(self.compactar_apos, 2 * linhas)
+
+    def __len__(self) -> int:
+        return len(self._conversas)
@@ -0,0 +1,131 @@
+# ledger_disparos.py
+import sqlite3
+import time
+from typing import List, Set, Tuple
+
+from motor_disparos import Disparo, _data
+
+# (telefone, vencimento ISO, rótulo D-1/D+1, tipo_cobranca)
+ChaveDisparo = Tuple[str, str, str, str]
+
+def chave_disparo(rotulo: str, cliente) -> ChaveDisparo:
+    return (cliente["telefone"], _data(cliente["vencimento"]).isoformat(), rotulo, cliente["tipo_cobranca"])
+
+class LedgerDisparos:
+    """
+    Registro dos disparos já feitos, para que rodar o cron duas vezes (ou
+    retomar depois de uma queda) não reenvie para ninguém.
+
+    A chave do disparo é a chave primária; um disparo é reservado com
+    INSERT OR IGNORE (status 'reservado') antes de ir para a fila de envio,
+    então processos em paralelo sobre o mesmo arquivo nunca reservam a
+    mesma chave duas vezes. Só depois do envio, ou da gravação na fila
+    durável, ele passa a 'enviado' (confirmar).
+
+    Reservas que ficam mais de `prazo_reserva` segundos sem confirmação
+    são de uma execução que caiu no meio: a próxima execução as retoma e
+    reenvia. As chaves de cada vencimento consultado ficam num set em
+    memória para checagem O(1).
+    """
+
+    def __init__(self, caminho: str = "disparos.db", prazo_reserva: float = 900.0):
+        self.caminho = caminho
+        self.prazo_reserva = prazo_reserva
+        self.conexao = sqlite3.connect(caminho, timeout=30)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS disparos (
+                telefone TEXT NOT NULL,
+                vencimento TEXT NOT NULL,
+                rotulo TEXT NOT NULL,
+                tipo_cobranca TEXT NOT NULL,
+                enviado_em REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'reservado',
+                PRIMARY KEY (vencimento, telefone, rotulo, tipo_cobranca)
+            ) WITHOUT ROWID
+            """
+        )
+        colunas = {linha[1] for linha in self.conexao.execute("PRAGMA table_info(disparos)")}
+        if "status" not in colunas:
+            # Arquivos antigos só tinham disparos já feitos
+            self.conexao.execute("ALTER TABLE disparos ADD COLUMN status TEXT NOT NULL DEFAULT 'enviado'")
+        self.conexao.commit()
+        self._enviados: Set[ChaveDisparo] = set()
+        self._datas_carregadas: Set[str] = set()
+        self.reservados = 0
+        self.ignorados = 0
+        self.retomados = 0
+
+    def _carregar_data(self, vencimento: str):
+        """Traz para memória as chaves do vencimento pedido, menos as reservas abandonadas"""
+        for telefone, rotulo, tipo in self.conexao.execute(
+            "SELECT telefone, rotulo, tipo_cobranca FROM disparos "
+            "WHERE vencimento = ? AND (status = 'enviado' OR enviado_em >= ?)",
+            (vencimento, time.time() - self.prazo_reserva)
+        ):
+            self._enviados.add((telefone, vencimento, rotulo, tipo))
+        self._datas_carregadas.add(vencimento)
+
+    def ja_enviado(self, chave: ChaveDisparo) -> bool:
+        if chave[1] not in self._datas_carregadas:
+            self._carregar_data(chave[1])
+        return chave in self._enviados
+
+    def reservar(self, lote: List[Disparo]) -> List[Disparo]:
+        """
+        Registra os disparos do lote e devolve só os que ainda não tinham
+        sido feitos - esses são os que devem ser enviados.
+        """
+        candidatos = []
+        for disparo in lote:
+            chave = chave_disparo(disparo[0], disparo[1])
+            if self.ja_enviado(chave):
+                self.ignorados += 1
+            else:
+                candidatos.append((chave, disparo))
+
+        novos = []
+        agora = time.time()
+        with self.conexao:
+            for chave, disparo in candidatos:
+                cursor = self.conexao.execute(
+                    "INSERT OR IGNORE INTO disparos "
+                    "(telefone, vencimento, rotulo, tipo_cobranca, enviado_em, status) "
+                    "VALUES (?, ?, ?, ?, ?, 'reservado')",
+                    (*chave, agora)
+                )
+                if not cursor.rowcount:
+                    # Reserva abandonada por uma execução que caiu: assume para si
+                    cursor = self.conexao.execute(
+                        "UPDATE disparos SET enviado_em = ? "
+                        "WHERE telefone = ? AND vencimento = ? AND rotulo = ? AND tipo_cobranca = ? "
+                        "AND status = 'reservado' AND enviado_em < ?",
+                        (agora, *chave, agora - self.prazo_reserva)
+                    )
+                    self.retomados += cursor.rowcount
+                self._enviados.add(chave)
+                if cursor.rowcount:
+                    novos.append(disparo)
+                else:
+                    # Outro processo reservou entre a leitura e a escrita
+                    self.ignorados += 1
+
+        self.reservados += len(novos)
+        return novos
+
+    def confirmar(self, lote: List[Disparo]):
+        """Marca como enviados disparos já entregues ou gravados na fila durável"""
+        agora = time.time()
+        with self.conexao:
+            self.conexao.executemany(
+                "UPDATE disparos SET status = 'enviado', enviado_em = ? "
+                "WHERE telefone = ? AND vencimento = ? AND rotulo = ? AND tipo_cobranca = ?",
+                [(agora, *chave_disparo(disparo[0], disparo[1])) for disparo in lote]
+            )
+
+    def estatisticas(self):
+        return {"reservados": self.reservados, "ignorados": self.ignorados, "retomados": self.retomados}
+
+    def fechar(self):
+        self.conexao.close()
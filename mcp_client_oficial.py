@@ -5,18 +5,185 @@ import subprocess
 import sys
 import os
 from contextlib import AsyncExitStack
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 
 from mcp.client.session import ClientSession
 from mcp.client.stdio import stdio_client, StdioServerParameters
 
+from esquema_resultado import loads, normalizar_analise
+from metricas import metricas
+from resiliencia import (
+    CircuitBreaker, analise_sem_servidor, com_prazo_e_retentativas, resposta_de_fallback
+)
+
+# Prazo por chamada de análise e novas tentativas para erros transitórios
+PRAZO_ANALISE = float(os.getenv("MCP_PRAZO_ANALISE", "30"))
+MAX_RETENTATIVAS = int(os.getenv("MCP_RETENTATIVAS", "1"))
+
+# Janela do coalescedor de análises em ms (0 desliga) e tamanho máximo do lote
+COALESCER_MS = float(os.getenv("MCP_COALESCER_MS", "0"))
+COALESCER_MAX_ITENS = int(os.getenv("MCP_COALESCER_MAX_ITENS", "20"))
+
+# MCP_MENSAGEM_IA=0: a IA só classifica e o servidor preenche mensagem_sugerida pelo template da ação
+INCLUIR_MENSAGEM_SUGERIDA = os.getenv("MCP_MENSAGEM_IA", "1") not in ("0", "false", "nao")
+
+# Carteira (credor) padrão deste cliente; cada chamada ou item de lote pode informar a sua
+CARTEIRA = os.getenv("MCP_CARTEIRA")
+
+# Gravação das análises para reprocessar sem OpenAI (ver gravacao_analises.py)
+GRAVAR_ANALISES = os.getenv("MCP_GRAVAR_ANALISES")
+REPRODUZIR_ANALISES = os.getenv("MCP_REPRODUZIR_ANALISES")
+
+# Cache da lista de ferramentas entre execuções do bot (evita list_tools no início)
+CACHE_FERRAMENTAS = os.getenv("MCP_CACHE_FERRAMENTAS", ".mcp_tools_cache.json")
+
+def ler_cache_ferramentas(chave: str) -> Optional[List[Dict[str, Any]]]:
+    """Lista de ferramentas salva para esta versão do servidor, se houver"""
+    try:
+        with open(CACHE_FERRAMENTAS, encoding="utf-8") as arquivo:
+            cache = json.load(arquivo)
+        return cache.get(chave)
+    except (OSError, ValueError):
+        return None
+
+def salvar_cache_ferramentas(chave: str, ferramentas: List[Dict[str, Any]]):
+    """Guarda só a versão atual - servidores antigos não interessam"""
+    try:
+        with open(CACHE_FERRAMENTAS, "w", encoding="utf-8") as arquivo:
+            json.dump({chave: ferramentas}, arquivo, ensure_ascii=False)
+    except OSError as e:
+        print(f"⚠️ Não foi possível salvar cache de ferramentas: {e}")
+
+def criar_resposta_fallback(nome_cliente: str, motivo: str) -> Dict[str, Any]:
+    """Cria resposta de fallback quando IA falha"""
+    fallbacks = {
+        "cliente_desconectado": {
+            "intencao": "nao_identificada",
+            "sentimento": "neutro",
+            "urgencia": "alta",
+            "acao": "encaminhar_suporte",
+            "confianca": 0.1,
+            "explicacao": "Cliente MCP desconectado",
+            "mensagem_sugerida": f"Olá {nome_cliente}, nossa equipe entrará em contato em breve."
+        },
+        "resposta_vazia": {
+            "intencao": "nao_identificada", 
+            "sentimento": "neutro",
+            "urgencia": "media",
+            "acao": "resposta_generica",
+            "confianca": 0.2,
+            "explicacao": "IA retornou resposta vazia",
+            "mensagem_sugerida": f"Olá {nome_cliente}, recebi sua mensagem e vou analisar."
+        },
+        "erro_analise": {
+            "intencao": "nao_identificada",
+            "sentimento": "neutro", 
+            "urgencia": "alta",
+            "acao": "encaminhar_suporte",
+            "confianca": 0.1,
+            "explicacao": "Erro durante análise da IA",
+            "mensagem_sugerida": f"Olá {nome_cliente}, vou encaminhar sua solicitação para nossa equipe."
+        },
+        "circuito_aberto": {
+            "intencao": "nao_identificada",
+            "sentimento": "neutro",
+            "urgencia": "alta",
+            "acao": "encaminhar_suporte",
+            "confianca": 0.1,
+            "explicacao": "Análise por IA suspensa - muitas falhas recentes",
+            "mensagem_sugerida": f"Olá {nome_cliente}, vou encaminhar sua solicitação para nossa equipe."
+        }
+    }
+    
+    metricas.incrementar("mcp_fallbacks_total", motivo=motivo)
+    return fallbacks.get(motivo, fallbacks["erro_analise"])
+
+def validar_analise(analise: Dict[str, Any], nome_cliente: str) -> Dict[str, Any]:
+    """Completa campos obrigatórios ausentes na resposta da IA (esquema compartilhado com o servidor)"""
+    return normalizar_analise(analise, nome_cliente)
+
+async def analisar_em_paralelo(
+    chamar_analise: Callable[..., Awaitable[Optional[Dict[str, Any]]]],
+    itens: List[Dict[str, Any]],
+    max_concorrencia: int = 10
+) -> List[Dict[str, Any]]:
+    """Dispara `chamar_analise` para cada item com limite de chamadas simultâneas"""
+    
+    semaforo = asyncio.Semaphore(max(1, max_concorrencia))
+    
+    async def analisar_item(item: Dict[str, Any]) -> Dict[str, Any]:
+        nome_cliente = item.get("nome_cliente", "")
+        async with semaforo:
+            try:
+                resultado = await chamar_analise(
+                    item.get("texto", ""),
+                    nome_cliente,
+                    item.get("tipo_cobranca", ""),
+                    item.get("historico", ""),
+                    item.get("carteira")
+                )
+            except Exception as e:
+                print(f"❌ Erro na análise MCP (lote): {e}")
+                return criar_resposta_fallback(nome_cliente, "erro_analise")
+        
+        if resultado:
+            return resultado
+        return criar_resposta_fallback(nome_cliente, "resposta_vazia")
+    
+    # gather preserva a ordem de entrada
+    return list(await asyncio.gather(*(analisar_item(item) for item in itens)))
+
+async def analisar_em_grupos(
+    chamar_analise_lote: Callable[[List[Dict[str, Any]]], Awaitable[List[Optional[Dict[str, Any]]]]],
+    itens: List[Dict[str, Any]],
+    tamanho_lote: int,
+    max_concorrencia: int = 10
+) -> List[Dict[str, Any]]:
+    """Envia os itens em grupos de `tamanho_lote` pela ferramenta de lote do servidor"""
+    
+    semaforo = asyncio.Semaphore(max(1, max_concorrencia))
+    grupos = [itens[i:i + tamanho_lote] for i in range(0, len(itens), max(1, tamanho_lote))]
+    
+    async def analisar_grupo(grupo: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        async with semaforo:
+            try:
+                resultados = await chamar_analise_lote(grupo)
+            except Exception as e:
+                print(f"❌ Erro na análise MCP (grupo): {e}")
+                return [
+                    criar_resposta_fallback(item.get("nome_cliente", ""), "erro_analise")
+                    for item in grupo
+                ]
+        
+        return [
+            resultado or criar_resposta_fallback(item.get("nome_cliente", ""), "resposta_vazia")
+            for item, resultado in zip(grupo, resultados)
+        ]
+    
+    respostas = await asyncio.gather(*(analisar_grupo(grupo) for grupo in grupos))
+    return [resultado for resultados in respostas for resultado in resultados]
+
 class MCPClientCobranca:
     """Cliente MCP oficial seguindo documentação Anthropic"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        prazo: Optional[float] = PRAZO_ANALISE,
+        max_retentativas: int = MAX_RETENTATIVAS,
+        disjuntor: Optional[CircuitBreaker] = None,
+        incluir_mensagem_sugerida: bool = INCLUIR_MENSAGEM_SUGERIDA,
+        carteira: Optional[str] = CARTEIRA
+    ):
         self.session = None
         self.exit_stack = None
         self.connected = False
+        self.ferramentas = []
+        self.prazo = prazo
+        self.max_retentativas = max_retentativas
+        self.disjuntor = disjuntor or CircuitBreaker()
+        self.incluir_mensagem_sugerida = incluir_mensagem_sugerida
+        self.carteira = carteira
+        self.coalescedor = None
     
     async def conectar(self, server_path: str = "mcp_server_openai.py"):
         """Conecta com o MCP Server seguindo padrão oficial"""
@@ -33,14 +200,17 @@ class MCPClientCobranca:
             
             # Conectar usando stdio_client com StdioServerParameters
             # CORREÇÃO: command deve ser uma lista, não string
+            # Sem METRICAS_PAPEL o servidor grava métricas num arquivo próprio (script + pid)
+            ambiente = {chave: valor for chave, valor in os.environ.items() if chave != "METRICAS_PAPEL"}
             server_params = StdioServerParameters(
                 command=[sys.executable, server_path],  # LISTA ao invés de STRING
-                env=os.environ.copy()
+                env=ambiente
             )
             
-            transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
+            with metricas.cronometrar("mcp_conexao_segundos", etapa="spawn", transporte="stdio"):
+                transport = await self.exit_stack.enter_async_context(
+                    stdio_client(server_params)
+                )
             
             # Criar sessão usando transporte
             read_stream, write_stream = transport
@@ -49,19 +219,13 @@ class MCPClientCobranca:
             )
             
             # Inicializar sessão
-            await self.session.initialize()
-            
-            # Listar ferramentas disponíveis
-            tools_response = await self.session.list_tools()
-            tools = tools_response.tools
-            
-            self.connected = True
-            print(f"✅ Conectado com MCP Server!")
-            print(f"🛠️  Ferramentas disponíveis: {len(tools)}")
-            
-            for tool in tools:
-                print(f"   - {tool.name}: {tool.description}")
+            with metricas.cronometrar("mcp_conexao_segundos", etapa="initialize", transporte="stdio"):
+                await self.session.initialize()
             
+            # Listar ferramentas (cache em disco invalidado pela data do servidor)
+            chave_cache = f"{os.path.abspath(server_path)}:{os.path.getmtime(server_path)}"
+            with metricas.cronometrar("mcp_conexao_segundos", etapa="list_tools", transporte="stdio"):
+                await self._carregar_ferramentas(chave_cache)
             return True
             
         except Exception as e:
@@ -71,68 +235,275 @@ class MCPClientCobranca:
             self.connected = False
             return False
     
+    async def conectar_daemon(self, url: str) -> bool:
+        """Conecta a um servidor já rodando em modo daemon (streamable HTTP)"""
+        try:
+            from mcp.client.streamable_http import streamablehttp_client
+            
+            print(f"🔄 Conectando com MCP daemon: {url}")
+            
+            self.exit_stack = AsyncExitStack()
+            read_stream, write_stream, _ = await self.exit_stack.enter_async_context(
+                streamablehttp_client(url)
+            )
+            self.session = await self.exit_stack.enter_async_context(
+                ClientSession(read_stream, write_stream)
+            )
+            
+            with metricas.cronometrar("mcp_conexao_segundos", etapa="initialize", transporte="daemon"):
+                resultado_init = await self.session.initialize()
+            info = resultado_init.serverInfo
+            with metricas.cronometrar("mcp_conexao_segundos", etapa="list_tools", transporte="daemon"):
+                await self._carregar_ferramentas(f"{url}:{info.name}:{info.version}")
+            return True
+            
+        except Exception as e:
+            print(f"⚠️ MCP daemon indisponível em {url}: {e}")
+            await self.desconectar()
+            self.connected = False
+            return False
+    
+    async def _carregar_ferramentas(self, chave_cache: str):
+        """Usa a lista de ferramentas do cache em disco ou pergunta ao servidor"""
+        tools = ler_cache_ferramentas(chave_cache)
+        
+        if tools is None:
+            tools_response = await self.session.list_tools()
+            tools = [
+                {"name": tool.name, "description": tool.description}
+                for tool in tools_response.tools
+            ]
+            salvar_cache_ferramentas(chave_cache, tools)
+        
+        self.ferramentas = tools
+        self.connected = True
+        if COALESCER_MS > 0 and self.suporta_lote():
+            # Rajadas de analisar_mensagem viram chamadas da ferramenta de lote
+            from coalescedor import CoalescedorAnalises
+            self.coalescedor = CoalescedorAnalises(
+                self._chamar_analise_lote_resiliente, COALESCER_MAX_ITENS, COALESCER_MS / 1000
+            )
+        print(f"✅ Conectado com MCP Server!")
+        print(f"🛠️  Ferramentas disponíveis: {len(tools)}")
+        
+        for tool in tools:
+            print(f"   - {tool['name']}: {tool['description']}")
+    
     async def analisar_mensagem(
         self, 
         texto: str, 
         nome_cliente: str, 
         tipo_cobranca: str, 
-        historico: str = ""
+        historico: str = "",
+        carteira: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
-        """Analisa mensagem usando MCP Server"""
+        """Analisa mensagem usando MCP Server (`carteira` sobrepõe a do cliente)"""
         
         if not self.connected or not self.session:
             print("❌ MCP Server não conectado")
             return None
         
         try:
-            # Chamar ferramenta específica do MCP Server
-            resultado = await self.session.call_tool(
-                "analisar_mensagem_cobranca",
-                {
-                    "texto": texto,
-                    "nome_cliente": nome_cliente,
-                    "tipo_cobranca": tipo_cobranca,
-                    "historico": historico
-                }
+            if self.coalescedor:
+                return await self.coalescedor.analisar(
+                    texto, nome_cliente, tipo_cobranca, historico, carteira
+                )
+            return await self._chamar_analise_resiliente(
+                texto, nome_cliente, tipo_cobranca, historico, carteira
             )
             
-            # Extrair conteúdo da resposta
-            if resultado and resultado.content:
-                # Pegar o primeiro conteúdo de texto
-                for content in resultado.content:
-                    if hasattr(content, 'text'):
-                        resposta_texto = content.text
-                        
-                        try:
-                            analise = json.loads(resposta_texto)
-                            
-                            # Validar campos obrigatórios
-                            campos_obrigatorios = ["intencao", "acao", "confianca", "mensagem_sugerida"]
-                            for campo in campos_obrigatorios:
-                                if campo not in analise:
-                                    print(f"⚠️ Campo ausente na resposta IA: {campo}")
-                                    if campo in ["intencao", "acao"]:
-                                        analise[campo] = "nao_identificada"
-                                    elif campo == "confianca":
-                                        analise[campo] = 0.5
-                                    else:
-                                        analise[campo] = f"Resposta para {nome_cliente}"
-                            
-                            return analise
-                            
-                        except json.JSONDecodeError as je:
-                            print(f"❌ Erro ao parsear JSON da IA: {je}")
-                            print(f"   Resposta bruta: {resposta_texto[:200]}...")
-                            return None
-            
-            print("⚠️ Resposta vazia do MCP Server")
-            return None
-            
         except Exception as e:
             print(f"❌ Erro na análise MCP: {e}")
             print(f"   Tipo: {type(e).__name__}")
             return None
     
+    async def _chamar_analise_resiliente(
+        self,
+        texto: str,
+        nome_cliente: str,
+        tipo_cobranca: str,
+        historico: str = "",
+        carteira: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        _chamar_analise com prazo, novas tentativas e disjuntor - com o
+        circuito aberto responde na hora pelo caminho local. Fallbacks do
+        servidor (OpenAI fora) contam como falha no disjuntor
+        """
+        if not self.disjuntor.permitir():
+            return analise_sem_servidor(texto, nome_cliente)
+        
+        return await self.disjuntor.executar(
+            lambda: com_prazo_e_retentativas(
+                lambda: self._chamar_analise(texto, nome_cliente, tipo_cobranca, historico, carteira),
+                self.prazo,
+                self.max_retentativas
+            ),
+            falhou=resposta_de_fallback
+        )
+    
+    async def _chamar_analise(
+        self, 
+        texto: str, 
+        nome_cliente: str, 
+        tipo_cobranca: str, 
+        historico: str = "",
+        carteira: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Chama a ferramenta de análise - exceções de transporte sobem para quem chamou"""
+        
+        argumentos = {
+            "texto": texto,
+            "nome_cliente": nome_cliente,
+            "tipo_cobranca": tipo_cobranca,
+            "historico": historico,
+            "incluir_mensagem_sugerida": self.incluir_mensagem_sugerida
+        }
+        carteira = carteira or self.carteira
+        if carteira:
+            argumentos["carteira"] = carteira
+        
+        # Chamar ferramenta específica do MCP Server
+        with metricas.cronometrar("mcp_call_tool_segundos", ferramenta="analisar_mensagem_cobranca"):
+            resultado = await self.session.call_tool("analisar_mensagem_cobranca", argumentos)
+        
+        # Extrair conteúdo da resposta
+        if resultado and resultado.content:
+            # Pegar o primeiro conteúdo de texto
+            for content in resultado.content:
+                if hasattr(content, 'text'):
+                    resposta_texto = content.text
+                    
+                    try:
+                        with metricas.cronometrar("mcp_json_parse_segundos", lado="cliente"):
+                            analise = loads(resposta_texto)
+                        
+                        return validar_analise(analise, nome_cliente)
+                        
+                    except json.JSONDecodeError as je:
+                        print(f"❌ Erro ao parsear JSON da IA: {je}")
+                        print(f"   Resposta bruta: {resposta_texto[:200]}...")
+                        return None
+        
+        print("⚠️ Resposta vazia do MCP Server")
+        return None
+    
+    async def _chamar_analise_lote(
+        self,
+        itens: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Chama a ferramenta de lote do servidor - um resultado (ou None) por item"""
+        
+        argumentos = [
+            {
+                "texto": item.get("texto", ""),
+                "nome_cliente": item.get("nome_cliente", ""),
+                "tipo_cobranca": item.get("tipo_cobranca", ""),
+                "historico": item.get("historico", "")
+            }
+            for item in itens
+        ]
+        # Itens de outra carteira levam a própria; o servidor agrupa por carteira
+        for argumento, item in zip(argumentos, itens):
+            if item.get("carteira"):
+                argumento["carteira"] = item["carteira"]
+        
+        parametros = {"itens": argumentos, "incluir_mensagem_sugerida": self.incluir_mensagem_sugerida}
+        if self.carteira:
+            parametros["carteira"] = self.carteira
+        
+        with metricas.cronometrar("mcp_call_tool_segundos", ferramenta="analisar_mensagens_cobranca_lote"):
+            resultado = await self.session.call_tool("analisar_mensagens_cobranca_lote", parametros)
+        
+        for content in (resultado.content if resultado else []):
+            if hasattr(content, 'text'):
+                try:
+                    with metricas.cronometrar("mcp_json_parse_segundos", lado="cliente"):
+                        analises = loads(content.text).get("resultados", [])
+                except (json.JSONDecodeError, AttributeError) as je:
+                    print(f"❌ Erro ao parsear JSON do lote: {je}")
+                    return [None] * len(itens)
+                
+                analises = (analises + [None] * len(itens))[:len(itens)]
+                return [
+                    validar_analise(analise, item.get("nome_cliente", "")) if isinstance(analise, dict) else None
+                    for item, analise in zip(itens, analises)
+                ]
+        
+        print("⚠️ Resposta vazia do MCP Server (lote)")
+        return [None] * len(itens)
+    
+    async def _chamar_analise_lote_resiliente(
+        self,
+        itens: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Versão de lote de _chamar_analise_resiliente (prazo proporcional ao grupo)"""
+        if not self.disjuntor.permitir():
+            return [analise_sem_servidor(item.get("texto", ""), item.get("nome_cliente", "")) for item in itens]
+        
+        return await self.disjuntor.executar(
+            lambda: com_prazo_e_retentativas(
+                lambda: self._chamar_analise_lote(itens),
+                self.prazo * max(1, len(itens) / 5) if self.prazo else None,
+                self.max_retentativas
+            ),
+            falhou=resposta_de_fallback
+        )
+    
+    def suporta_lote(self) -> bool:
+        """O servidor conectado oferece a ferramenta de lote?"""
+        return any(
+            tool["name"] == "analisar_mensagens_cobranca_lote" for tool in self.ferramentas
+        )
+    
+    async def analisar_mensagens_lote(
+        self,
+        itens: List[Dict[str, Any]],
+        max_concorrencia: int = 10,
+        tamanho_lote: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Analisa várias mensagens em paralelo na mesma sessão MCP.
+        
+        Cada item tem as chaves texto, nome_cliente, tipo_cobranca e
+        historico e carteira (opcionais). No máximo `max_concorrencia` chamadas ficam
+        em andamento ao mesmo tempo; os resultados voltam na ordem de
+        entrada, com fallback individual para itens que falharem.
+        Com `tamanho_lote` > 0 os itens vão em grupos pela ferramenta de
+        lote do servidor (uma completion por grupo).
+        """
+        
+        if not self.connected or not self.session:
+            print("❌ MCP Server não conectado")
+            return [
+                criar_resposta_fallback(item.get("nome_cliente", ""), "cliente_desconectado")
+                for item in itens
+            ]
+        
+        if tamanho_lote > 0 and self.suporta_lote():
+            return await analisar_em_grupos(
+                self._chamar_analise_lote_resiliente, itens, tamanho_lote, max_concorrencia
+            )
+        return await analisar_em_paralelo(self._chamar_analise_resiliente, itens, max_concorrencia)
+
+    async def obter_estatisticas(self) -> Optional[Dict[str, Any]]:
+        """Consulta os contadores do servidor (ex.: taxa de acerto do cache)"""
+
+        if not self.connected or not self.session:
+            print("❌ MCP Server não conectado")
+            return None
+
+        try:
+            resultado = await self.session.call_tool("estatisticas_servidor", {})
+            for content in resultado.content:
+                if hasattr(content, 'text'):
+                    return loads(content.text)
+            return None
+
+        except Exception as e:
+            print(f"❌ Erro ao obter estatísticas MCP: {e}")
+            return None
+
     async def desconectar(self):
         """Desconecta do MCP Server"""
         try:
@@ -149,10 +520,28 @@ class MCPClientCobranca:
 
 # Wrapper síncrono para usar no bot
 class MCPClientSync:
-    """Wrapper síncrono seguindo padrão oficial - MELHORADO"""
+    """
+    Wrapper síncrono para scripts - cada chamada bloqueia até terminar.
+    Para processar muitas respostas em paralelo use bot_async.BotCobrancaAsync.
+    """
     
-    def __init__(self, server_path: str = "mcp_server_openai.py"):
-        self.client = MCPClientCobranca()
+    def __init__(
+        self,
+        server_path: str = "mcp_server_openai.py",
+        num_servidores: int = 1,
+        url_daemon: Optional[str] = None
+    ):
+        # Daemon já rodando (ex.: MCP_SERVER_URL=http://127.0.0.1:8765/mcp/)
+        self.url_daemon = url_daemon or os.getenv("MCP_SERVER_URL")
+        if num_servidores > 1:
+            # Pool de servidores com balanceamento - mesma interface do cliente
+            from mcp_pool import MCPServerPool
+            self.client = MCPServerPool(num_servidores)
+        else:
+            self.client = MCPClientCobranca()
+        if GRAVAR_ANALISES or REPRODUZIR_ANALISES:
+            from gravacao_analises import envolver_cliente
+            self.client = envolver_cliente(self.client, GRAVAR_ANALISES, REPRODUZIR_ANALISES)
         self.server_path = server_path
         self.loop = None
         self.connected = False
@@ -160,22 +549,27 @@ class MCPClientSync:
     def conectar(self) -> bool:
         """Conecta de forma síncrona com melhor tratamento de erro"""
         try:
+            # Loop próprio do wrapper - get_event_loop() sem loop ativo está obsoleto
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            
+            # Replay: análises vêm da gravação, nenhum servidor é iniciado
+            if REPRODUZIR_ANALISES:
+                self.connected = self.loop.run_until_complete(self.client.conectar())
+                return self.connected
+
+            # Preferir o daemon: sem spawn de processo nem import de openai
+            if self.url_daemon and hasattr(self.client, "conectar_daemon"):
+                if self.loop.run_until_complete(self.client.conectar_daemon(self.url_daemon)):
+                    self.connected = True
+                    return True
+                print("🔄 Iniciando servidor MCP local via stdio")
+            
             # Verificar se arquivo existe antes de tentar conectar
             if not os.path.exists(self.server_path):
                 print(f"❌ Arquivo do servidor não encontrado: {self.server_path}")
                 return False
             
-            # Criar novo loop de eventos
-            try:
-                # Tentar pegar loop existente
-                self.loop = asyncio.get_event_loop()
-                if self.loop.is_closed():
-                    raise RuntimeError("Loop fechado")
-            except RuntimeError:
-                # Criar novo loop se necessário
-                self.loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(self.loop)
-            
             # Conectar usando método oficial
             resultado = self.loop.run_until_complete(
                 self.client.conectar(self.server_path)
@@ -194,7 +588,8 @@ class MCPClientSync:
         texto: str, 
         nome_cliente: str, 
         tipo_cobranca: str, 
-        historico: str = ""
+        historico: str = "",
+        carteira: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """Analisa mensagem de forma síncrona com fallbacks"""
         
@@ -205,7 +600,7 @@ class MCPClientSync:
         try:
             resultado = self.loop.run_until_complete(
                 self.client.analisar_mensagem(
-                    texto, nome_cliente, tipo_cobranca, historico
+                    texto, nome_cliente, tipo_cobranca, historico, carteira
                 )
             )
             
@@ -218,43 +613,41 @@ class MCPClientSync:
         except Exception as e:
             print(f"❌ Erro análise síncrona: {e}")
             return self._criar_resposta_fallback(nome_cliente, "erro_analise")
-    
+
+    def analisar_mensagens_lote(
+        self,
+        itens: List[Dict[str, Any]],
+        max_concorrencia: int = 10,
+        tamanho_lote: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Analisa um lote de mensagens em paralelo, uma única espera para o lote todo"""
+
+        if not self.connected or not self.loop:
+            print("❌ Cliente MCP não conectado")
+            return [
+                self._criar_resposta_fallback(item.get("nome_cliente", ""), "cliente_desconectado")
+                for item in itens
+            ]
+
+        try:
+            return self.loop.run_until_complete(
+                self.client.analisar_mensagens_lote(itens, max_concorrencia, tamanho_lote)
+            )
+
+        except Exception as e:
+            print(f"❌ Erro análise síncrona em lote: {e}")
+            return [
+                self._criar_resposta_fallback(item.get("nome_cliente", ""), "erro_analise")
+                for item in itens
+            ]
+
     def _criar_resposta_fallback(self, nome_cliente: str, motivo: str) -> Dict[str, Any]:
         """Cria resposta de fallback quando IA falha"""
-        fallbacks = {
-            "cliente_desconectado": {
-                "intencao": "nao_identificada",
-                "sentimento": "neutro",
-                "urgencia": "alta",
-                "acao": "encaminhar_suporte",
-                "confianca": 0.1,
-                "explicacao": "Cliente MCP desconectado",
-                "mensagem_sugerida": f"Olá {nome_cliente}, nossa equipe entrará em contato em breve."
-            },
-            "resposta_vazia": {
-                "intencao": "nao_identificada", 
-                "sentimento": "neutro",
-                "urgencia": "media",
-                "acao": "resposta_generica",
-                "confianca": 0.2,
-                "explicacao": "IA retornou resposta vazia",
-                "mensagem_sugerida": f"Olá {nome_cliente}, recebi sua mensagem e vou analisar."
-            },
-            "erro_analise": {
-                "intencao": "nao_identificada",
-                "sentimento": "neutro", 
-                "urgencia": "alta",
-                "acao": "encaminhar_suporte",
-                "confianca": 0.1,
-                "explicacao": "Erro durante análise da IA",
-                "mensagem_sugerida": f"Olá {nome_cliente}, vou encaminhar sua solicitação para nossa equipe."
-            }
-        }
-        
-        return fallbacks.get(motivo, fallbacks["erro_analise"])
+        return criar_resposta_fallback(nome_cliente, motivo)
     
     def desconectar(self):
         """Desconecta de forma síncrona"""
+        metricas.descarregar()
         try:
             if self.loop and self.client and self.connected:
                 self.loop.run_until_complete(
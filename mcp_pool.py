@@ -0,0 +1,281 @@
+# mcp_pool.py
+import asyncio
+import functools
+import os
+from typing import Optional, Dict, Any, List, Set
+
+from mcp_client_oficial import (
+    COALESCER_MAX_ITENS, COALESCER_MS, PRAZO_ANALISE, MCPClientCobranca,
+    analisar_em_grupos, analisar_em_paralelo
+)
+from resiliencia import (
+    CircuitBreaker, CircuitoAberto, analise_sem_servidor, com_hedge, resposta_de_fallback
+)
+
+# Segundos sem resposta até repetir a chamada em outro servidor (0 desliga)
+ATRASO_HEDGE = float(os.getenv("MCP_HEDGE_APOS", "0"))
+
+class _ServidorTrabalhador:
+    """Um processo mcp_server_openai.py com sua sessão e contagem de carga"""
+
+    def __init__(self, indice: int):
+        self.indice = indice
+        self.cliente: Optional[MCPClientCobranca] = None
+        self.em_andamento = 0
+        self.reinicios = 0
+        self.pronto = asyncio.Event()
+        self.reiniciar = asyncio.Event()
+        self.tarefa: Optional[asyncio.Task] = None
+
+    @property
+    def disponivel(self) -> bool:
+        return self.cliente is not None and self.cliente.connected
+
+class MCPServerPool:
+    """
+    Pool de processos MCP Server com balanceamento por menor carga.
+
+    Expõe a mesma interface do MCPClientCobranca (conectar, analisar_mensagem,
+    analisar_mensagens_lote, desconectar), então pode substituí-lo direto.
+    Cada servidor roda numa tarefa própria que abre e fecha a sessão stdio,
+    e servidores que caem são reiniciados em segundo plano. Com
+    `atraso_hedge`, uma chamada que demora mais que isso é repetida no
+    próximo servidor menos carregado e vale a primeira resposta.
+    """
+
+    def __init__(
+        self,
+        num_servidores: Optional[int] = None,
+        max_retentativas: int = 1,
+        intervalo_reconexao: float = 2.0,
+        prazo: Optional[float] = PRAZO_ANALISE,
+        atraso_hedge: Optional[float] = ATRASO_HEDGE,
+        disjuntor: Optional[CircuitBreaker] = None
+    ):
+        self.num_servidores = max(1, num_servidores or os.cpu_count() or 1)
+        self.max_retentativas = max_retentativas
+        self.intervalo_reconexao = intervalo_reconexao
+        self.prazo = prazo
+        self.atraso_hedge = atraso_hedge
+        self.disjuntor = disjuntor or CircuitBreaker("pool")
+        self.server_path = "mcp_server_openai.py"
+        self.trabalhadores: List[_ServidorTrabalhador] = []
+        self.connected = False
+        self.coalescedor = None
+        self._encerrando = False
+
+    async def conectar(self, server_path: str = "mcp_server_openai.py") -> bool:
+        """Sobe os N servidores e espera a primeira tentativa de conexão de cada um"""
+        self.server_path = server_path
+        self._encerrando = False
+
+        print(f"🔄 Iniciando pool com {self.num_servidores} servidores MCP...")
+
+        self.trabalhadores = [_ServidorTrabalhador(i) for i in range(self.num_servidores)]
+        for trabalhador in self.trabalhadores:
+            trabalhador.tarefa = asyncio.create_task(self._manter_servidor(trabalhador))
+
+        await asyncio.gather(*(t.pronto.wait() for t in self.trabalhadores))
+
+        ativos = sum(1 for t in self.trabalhadores if t.disponivel)
+        self.connected = ativos > 0
+        if self.connected and COALESCER_MS > 0 and self.suporta_lote():
+            from coalescedor import CoalescedorAnalises
+            self.coalescedor = CoalescedorAnalises(
+                self._chamar_analise_lote, COALESCER_MAX_ITENS, COALESCER_MS / 1000
+            )
+
+        if self.connected:
+            print(f"✅ Pool MCP pronto: {ativos}/{self.num_servidores} servidores ativos")
+        else:
+            print("❌ Nenhum servidor do pool conseguiu conectar")
+
+        return self.connected
+
+    async def _manter_servidor(self, trabalhador: _ServidorTrabalhador):
+        """Mantém um servidor vivo - conexão e desconexão acontecem nesta mesma tarefa"""
+        while not self._encerrando:
+            cliente = MCPClientCobranca()
+            conectado = await cliente.conectar(self.server_path)
+            trabalhador.cliente = cliente if conectado else None
+            trabalhador.pronto.set()
+
+            if conectado:
+                await trabalhador.reiniciar.wait()
+            else:
+                # Servidor não subiu: espera um pouco antes de tentar de novo
+                try:
+                    await asyncio.wait_for(
+                        trabalhador.reiniciar.wait(), self.intervalo_reconexao
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+            trabalhador.reiniciar.clear()
+            trabalhador.cliente = None
+            await cliente.desconectar()
+
+            if not self._encerrando:
+                trabalhador.reinicios += 1
+                print(f"♻️  Reiniciando servidor MCP #{trabalhador.indice}")
+
+    def _reiniciar(self, trabalhador: _ServidorTrabalhador):
+        """Tira o servidor de circulação e pede reinício à tarefa dele"""
+        trabalhador.cliente = None
+        trabalhador.reiniciar.set()
+
+    def _escolher_servidor(self, excluidos: Set[int]) -> Optional[_ServidorTrabalhador]:
+        """Servidor disponível com menos chamadas em andamento"""
+        candidatos = [
+            t for t in self.trabalhadores
+            if t.disponivel and t.indice not in excluidos
+        ]
+        if not candidatos:
+            return None
+        return min(candidatos, key=lambda t: t.em_andamento)
+
+    async def _executar_em(self, trabalhador: _ServidorTrabalhador, metodo: str, *args):
+        """Uma tentativa num servidor, com prazo; servidor que dá erro é reiniciado"""
+        cliente = trabalhador.cliente
+        if cliente is None:
+            raise RuntimeError(f"Servidor MCP #{trabalhador.indice} indisponível")
+
+        trabalhador.em_andamento += 1
+        try:
+            chamada = getattr(cliente, metodo)(*args)
+            if self.prazo:
+                return await asyncio.wait_for(chamada, self.prazo)
+            return await chamada
+        except asyncio.TimeoutError:
+            # Lentidão costuma ser da OpenAI, não do processo - não reinicia
+            print(f"⏱️ Servidor MCP #{trabalhador.indice} estourou o prazo de {self.prazo}s")
+            raise
+        except Exception as e:
+            print(f"⚠️ Servidor MCP #{trabalhador.indice} falhou: {e}")
+            if trabalhador.cliente is cliente:
+                self._reiniciar(trabalhador)
+            raise
+        finally:
+            trabalhador.em_andamento -= 1
+
+    async def _executar(self, metodo: str, *args):
+        """Executa o método no servidor menos carregado, trocando de servidor se ele falhar"""
+        if self.atraso_hedge:
+            candidatos = sorted(
+                (t for t in self.trabalhadores if t.disponivel), key=lambda t: t.em_andamento
+            )[:self.max_retentativas + 1]
+            if not candidatos:
+                raise RuntimeError("Nenhum servidor MCP disponível no pool")
+            return await com_hedge(
+                [functools.partial(self._executar_em, t, metodo, *args) for t in candidatos],
+                self.atraso_hedge
+            )
+
+        excluidos: Set[int] = set()
+        while True:
+            trabalhador = self._escolher_servidor(excluidos)
+            if trabalhador is None:
+                raise RuntimeError("Nenhum servidor MCP disponível no pool")
+
+            try:
+                return await self._executar_em(trabalhador, metodo, *args)
+            except Exception:
+                excluidos.add(trabalhador.indice)
+                if len(excluidos) > self.max_retentativas:
+                    raise
+
+    async def _executar_protegido(self, metodo: str, *args):
+        """_executar atrás do disjuntor do pool - fallbacks do servidor contam como falha"""
+        if not self.disjuntor.permitir():
+            raise CircuitoAberto(self.disjuntor.nome)
+        return await self.disjuntor.executar(
+            lambda: self._executar(metodo, *args), falhou=resposta_de_fallback
+        )
+
+    async def _chamar_analise(
+        self,
+        texto: str,
+        nome_cliente: str,
+        tipo_cobranca: str,
+        historico: str = "",
+        carteira: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            return await self._executar_protegido(
+                "_chamar_analise", texto, nome_cliente, tipo_cobranca, historico, carteira
+            )
+        except CircuitoAberto:
+            return analise_sem_servidor(texto, nome_cliente)
+
+    async def _chamar_analise_lote(self, itens: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        try:
+            return await self._executar_protegido("_chamar_analise_lote", itens)
+        except CircuitoAberto:
+            return [analise_sem_servidor(item.get("texto", ""), item.get("nome_cliente", "")) for item in itens]
+
+    def suporta_lote(self) -> bool:
+        return any(t.disponivel and t.cliente.suporta_lote() for t in self.trabalhadores)
+
+    async def analisar_mensagem(
+        self,
+        texto: str,
+        nome_cliente: str,
+        tipo_cobranca: str,
+        historico: str = "",
+        carteira: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Analisa mensagem usando o servidor menos carregado do pool"""
+
+        if not self.connected:
+            print("❌ Pool MCP não conectado")
+            return None
+
+        try:
+            if self.coalescedor:
+                return await self.coalescedor.analisar(
+                    texto, nome_cliente, tipo_cobranca, historico, carteira
+                )
+            return await self._chamar_analise(
+                texto, nome_cliente, tipo_cobranca, historico, carteira
+            )
+        except Exception as e:
+            print(f"❌ Erro na análise MCP (pool): {e}")
+            return None
+
+    async def analisar_mensagens_lote(
+        self,
+        itens: List[Dict[str, Any]],
+        max_concorrencia: int = 10,
+        tamanho_lote: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Distribui um lote de análises (ou grupos de análises) entre os servidores do pool"""
+        if tamanho_lote > 0 and self.suporta_lote():
+            return await analisar_em_grupos(
+                self._chamar_analise_lote, itens, tamanho_lote, max_concorrencia
+            )
+        return await analisar_em_paralelo(self._chamar_analise, itens, max_concorrencia)
+
+    def estatisticas(self) -> List[Dict[str, Any]]:
+        """Carga e reinícios de cada servidor"""
+        return [
+            {
+                "servidor": t.indice,
+                "ativo": t.disponivel,
+                "em_andamento": t.em_andamento,
+                "reinicios": t.reinicios
+            }
+            for t in self.trabalhadores
+        ]
+
+    async def desconectar(self):
+        """Encerra todos os servidores do pool"""
+        self._encerrando = True
+        for trabalhador in self.trabalhadores:
+            trabalhador.reiniciar.set()
+
+        tarefas = [t.tarefa for t in self.trabalhadores if t.tarefa]
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+        self.trabalhadores = []
+        self.connected = False
+        print("🔌 Pool MCP encerrado")
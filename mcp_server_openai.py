@@ -1,28 +1,68 @@
 # mcp_server_openai.py
+import argparse
 import asyncio
+import contextlib
 import json
 import os
-from typing import Any, Sequence
+import time
+from functools import lru_cache
+from typing import Any, NamedTuple, Sequence
 from mcp.server import Server
 from mcp.types import Tool, TextContent
-from openai import OpenAI
+
+from cache_analises import CacheAnalises
+from carteiras import CARTEIRA_PADRAO, carteiras_do_ambiente
+from classificador_local import MENSAGENS_ACAO, ClassificadorLocal
+from esquema_resultado import dumps, loads, normalizar_analise
+from metricas import BALDES_TOKENS, metricas
 
 # Criar servidor MCP
-app = Server("bot-cobranca-ia")
+# A versão acompanha a data do arquivo: clientes invalidam o cache de ferramentas
+VERSAO_SERVIDOR = str(int(os.path.getmtime(__file__)))
+app = Server("bot-cobranca-ia", version=VERSAO_SERVIDOR)
+
+# Máximo de chamadas OpenAI simultâneas por processo servidor
+MAX_CONCORRENCIA_OPENAI = int(os.getenv("MCP_MAX_CONCORRENCIA_OPENAI", "32"))
+
+# Cache de análises por texto normalizado (MCP_CACHE_DESABILITADO=1 desliga)
+CACHE_HABILITADO = os.getenv("MCP_CACHE_DESABILITADO", "") not in ("1", "true", "sim")
+cache_analises = CacheAnalises(
+    max_itens=int(os.getenv("MCP_CACHE_MAX_ITENS", "10000")),
+    ttl_segundos=float(os.getenv("MCP_CACHE_TTL", "3600"))
+)
+
+# Pré-classificador local por regras (MCP_CLASSIFICADOR_LOCAL=0 desliga)
+CLASSIFICADOR_HABILITADO = os.getenv("MCP_CLASSIFICADOR_LOCAL", "1") not in ("0", "false", "nao")
+classificador_local = ClassificadorLocal(
+    limiar_confianca=float(os.getenv("MCP_LIMIAR_CLASSIFICADOR", "0.85"))
+)
+
+# Carteiras (credores) atendidas por este servidor: prompt e cota de cada uma (MCP_CARTEIRAS)
+carteiras = carteiras_do_ambiente()
 
 # Cliente OpenAI será inicializado quando necessário
 client = None
+semaforo_openai = None
 
 def get_openai_client():
-    """Inicializa cliente OpenAI apenas quando necessário"""
+    """Inicializa cliente OpenAI assíncrono apenas quando necessário"""
     global client
     if client is None:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise Exception("OPENAI_API_KEY não configurada")
-        client = OpenAI(api_key=api_key)
+        # Import adiado: list_tools, cache e classificador local não precisam do SDK
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=api_key)
     return client
 
+def get_semaforo_openai():
+    """Semáforo criado no loop do servidor para limitar chamadas em andamento"""
+    global semaforo_openai
+    if semaforo_openai is None:
+        semaforo_openai = asyncio.Semaphore(max(1, MAX_CONCORRENCIA_OPENAI))
+    return semaforo_openai
+
 # Prompt sistema para análise de cobrança
 SYSTEM_PROMPT = """
 Você é um assistente especializado em análise de mensagens de cobrança.
@@ -66,6 +106,141 @@ Retorne SEMPRE um JSON válido com:
 }
 """
 
+# Variante para várias mensagens numa só completion (ferramenta de lote)
+SYSTEM_PROMPT_LOTE = SYSTEM_PROMPT + """
+Você receberá VÁRIAS mensagens numeradas como [0], [1], ...
+Analise cada uma de forma independente e retorne SEMPRE um JSON no formato:
+{"resultados": [{"indice": 0, ...campos acima...}, {"indice": 1, ...}]}
+com exatamente um resultado por mensagem.
+"""
+
+# Máximo de mensagens por completion na ferramenta de lote
+MAX_ITENS_POR_CHAMADA = max(1, int(os.getenv("MCP_MAX_ITENS_POR_CHAMADA", "20")))
+
+# Prompt compacto com saída estruturada (MCP_PROMPT_COMPACTO=0 volta ao prompt completo)
+PROMPT_COMPACTO = os.getenv("MCP_PROMPT_COMPACTO", "1") not in ("0", "false", "nao")
+
+INTENCOES = [
+    "pagamento_realizado", "negociacao", "solicitar_boleto", "nao_reconhece",
+    "dificuldade_financeira", "contestacao", "prazo_adicional", "informacao", "nao_identificada"
+]
+ACOES = [
+    "agradecer_confirmar", "enviar_opcoes_negociacao", "reenviar_boleto", "encaminhar_suporte",
+    "oferecer_parcelamento", "solicitar_comprovante", "explicar_divida", "resposta_generica"
+]
+
+# Os valores possíveis já vão no schema; o prompt só explica o que não é óbvio pelo nome
+SYSTEM_PROMPT_COMPACTO = """Classifique a mensagem de um cliente em cobrança.
+Intenções: pagamento_realizado=diz que pagou; negociacao=negociar/parcelar/desconto; solicitar_boleto=não recebeu ou perdeu; nao_reconhece=não reconhece a dívida; dificuldade_financeira=problemas para pagar; contestacao=contesta valor; prazo_adicional=pede mais tempo; informacao=quer detalhes.
+Ações: agradecer_confirmar; enviar_opcoes_negociacao; reenviar_boleto; encaminhar_suporte=humano; oferecer_parcelamento; solicitar_comprovante; explicar_divida; resposta_generica=padrão + humano.
+explicacao: até 10 palavras."""
+
+SYSTEM_PROMPT_COMPACTO_LOTE = SYSTEM_PROMPT_COMPACTO + """
+Mensagens numeradas [0], [1], ...: um resultado por mensagem com seu indice."""
+
+INSTRUCAO_MENSAGEM = "\nmensagem_sugerida: resposta curta e cordial ao cliente, pelo primeiro nome."
+
+class PromptCompilado(NamedTuple):
+    variante: str
+    system_prompt: str
+    opcoes: dict[str, Any]
+    max_tokens_base: int
+    max_tokens_por_item: int
+
+def _esquema_analise(incluir_mensagem: bool) -> dict[str, Any]:
+    propriedades: dict[str, Any] = {
+        "intencao": {"type": "string", "enum": INTENCOES},
+        "sentimento": {"type": "string", "enum": ["positivo", "neutro", "negativo"]},
+        "urgencia": {"type": "string", "enum": ["baixa", "media", "alta"]},
+        "acao": {"type": "string", "enum": ACOES},
+        "confianca": {"type": "number"},
+        "explicacao": {"type": "string"}
+    }
+    if incluir_mensagem:
+        propriedades["mensagem_sugerida"] = {"type": "string"}
+    return {
+        "type": "object",
+        "properties": propriedades,
+        "required": list(propriedades),
+        "additionalProperties": False
+    }
+
+@lru_cache(maxsize=None)
+def compilar_prompt(lote: bool, incluir_mensagem: bool, carteira: str = CARTEIRA_PADRAO) -> PromptCompilado:
+    """
+    Prompt de sistema, formato de saída e orçamento de tokens de cada
+    combinação - montados uma vez por processo. As instruções da carteira
+    vão no fim do prompt de sistema.
+    """
+    prompt = _compilar_prompt_base(lote, incluir_mensagem)
+    instrucoes = carteiras.obter(carteira).instrucoes
+    if instrucoes:
+        prompt = prompt._replace(system_prompt=f"{prompt.system_prompt}\nInstruções da carteira: {instrucoes}")
+    return prompt
+
+def _compilar_prompt_base(lote: bool, incluir_mensagem: bool) -> PromptCompilado:
+    if not PROMPT_COMPACTO:
+        system_prompt = SYSTEM_PROMPT_LOTE if lote else SYSTEM_PROMPT
+        if not incluir_mensagem:
+            system_prompt += "\nOmita o campo mensagem_sugerida."
+        opcoes = {"response_format": {"type": "json_object"}} if lote else {}
+        return PromptCompilado("completo", system_prompt, opcoes, 150 if lote else 500, 250)
+
+    esquema = _esquema_analise(incluir_mensagem)
+    if lote:
+        item = dict(esquema, properties={"indice": {"type": "integer"}, **esquema["properties"]})
+        item["required"] = list(item["properties"])
+        esquema = {
+            "type": "object",
+            "properties": {"resultados": {"type": "array", "items": item}},
+            "required": ["resultados"],
+            "additionalProperties": False
+        }
+
+    system_prompt = SYSTEM_PROMPT_COMPACTO_LOTE if lote else SYSTEM_PROMPT_COMPACTO
+    if incluir_mensagem:
+        system_prompt += INSTRUCAO_MENSAGEM
+
+    return PromptCompilado(
+        "compacto" if incluir_mensagem else "compacto_sem_mensagem",
+        system_prompt,
+        {"response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "analise_cobranca_lote" if lote else "analise_cobranca",
+                "strict": True,
+                "schema": esquema
+            }
+        }},
+        20 if lote else 0,
+        130 if incluir_mensagem else 70
+    )
+
+def _montar_user_prompt(texto: str, nome_cliente: str, tipo_cobranca: str, historico: str) -> str:
+    """Mensagem do usuário sem indentação nem linhas vazias - cada espaço é token"""
+    if not PROMPT_COMPACTO:
+        return f"""
+    CLIENTE: {nome_cliente}
+    TIPO COBRANÇA: {tipo_cobranca}
+    HISTÓRICO: {historico}
+    
+    MENSAGEM DO CLIENTE:
+    "{texto}"
+    
+    Analise esta mensagem e retorne o JSON com sua análise:
+    """
+    if historico:
+        return f"Cliente: {nome_cliente}\nCobrança: {tipo_cobranca}\nHistórico:\n{historico}\nMensagem: {texto}"
+    return f"Cliente: {nome_cliente}\nCobrança: {tipo_cobranca}\nMensagem: {texto}"
+
+def _completar_mensagem(resultado: dict[str, Any], nome_cliente: str) -> dict[str, Any]:
+    """Sem mensagem_sugerida da IA, usa o template local da ação"""
+    if not resultado.get("mensagem_sugerida"):
+        primeiro_nome = nome_cliente.split()[0] if nome_cliente else ""
+        template = MENSAGENS_ACAO.get(resultado.get("acao"), MENSAGENS_ACAO["resposta_generica"])
+        resultado["mensagem_sugerida"] = template.format(nome=primeiro_nome)
+    return resultado
+
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """Lista as ferramentas disponíveis no MCP Server"""
@@ -92,100 +267,395 @@ async def list_tools() -> list[Tool]:
                         "type": "string",
                         "description": "Histórico recente do cliente (opcional)",
                         "default": ""
+                    },
+                    "incluir_mensagem_sugerida": {
+                        "type": "boolean",
+                        "description": "false: a IA não redige a resposta e o servidor usa o template local da ação",
+                        "default": True
+                    },
+                    "carteira": {
+                        "type": "string",
+                        "description": "Carteira (credor) da cobrança - define prompt e cota de uso; nomes não configurados usam a padrão",
+                        "default": CARTEIRA_PADRAO
                     }
                 },
                 "required": ["texto", "nome_cliente", "tipo_cobranca"]
             }
+        ),
+        Tool(
+            name="analisar_mensagens_cobranca_lote",
+            description="Analisa várias mensagens de cobrança de uma vez, com resultado por item na mesma ordem",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "itens": {
+                        "type": "array",
+                        "description": "Mensagens a analisar",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "texto": {"type": "string"},
+                                "nome_cliente": {"type": "string"},
+                                "tipo_cobranca": {"type": "string"},
+                                "historico": {"type": "string", "default": ""},
+                                "carteira": {"type": "string", "description": "Carteira do item (senão a do lote)"}
+                            },
+                            "required": ["texto", "nome_cliente", "tipo_cobranca"]
+                        }
+                    },
+                    "incluir_mensagem_sugerida": {
+                        "type": "boolean",
+                        "description": "false: a IA não redige as respostas e o servidor usa os templates locais",
+                        "default": True
+                    },
+                    "carteira": {
+                        "type": "string",
+                        "description": "Carteira (credor) das mensagens do lote que não informam a própria",
+                        "default": CARTEIRA_PADRAO
+                    }
+                },
+                "required": ["itens"]
+            }
+        ),
+        Tool(
+            name="estatisticas_servidor",
+            description="Retorna contadores do servidor (cache, classificador local, uso por carteira e métricas de latência)",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
         )
     ]
 
-@app.call_tool()
-async def call_tool(name: str, arguments: dict[str, Any]) -> Sequence[TextContent]:
-    """Executa a ferramenta solicitada"""
+def _como_texto(resultado: Any) -> list[TextContent]:
+    """Serializa o resultado da ferramenta como conteúdo de texto MCP"""
+    return [TextContent(
+        type="text",
+        text=dumps(resultado)
+    )]
+
+def _cache_aplicavel(historico: str) -> bool:
+    """
+    A chave do cache é só (tipo, texto): uma análise feita com histórico
+    depende daquele contexto e não pode ser lida nem gravada por ela
+    """
+    return CACHE_HABILITADO and not historico
+
+def _tipo_no_cache(tipo_cobranca: str, carteira: str) -> str:
+    """Cada carteira tem seu prompt: análises de uma não servem de cache para outra"""
+    return tipo_cobranca if carteira == CARTEIRA_PADRAO else f"{carteira}/{tipo_cobranca}"
+
+def _resolver_sem_ia(
+    texto: str,
+    nome_cliente: str,
+    tipo_cobranca: str,
+    historico: str = "",
+    carteira: str = CARTEIRA_PADRAO
+) -> dict[str, Any] | None:
+    """Classificador local e cache - devolve None quando a mensagem precisa da OpenAI"""
     
-    if name == "analisar_mensagem_cobranca":
-        # Extrair parâmetros
-        texto = arguments.get("texto", "")
-        nome_cliente = arguments.get("nome_cliente", "")
-        tipo_cobranca = arguments.get("tipo_cobranca", "")
-        historico = arguments.get("historico", "")
+    # Mensagens óbvias ("já paguei") são resolvidas localmente em microssegundos,
+    # exceto nas carteiras com instruções próprias, que o classificador não segue
+    if CLASSIFICADOR_HABILITADO and not carteiras.obter(carteira).instrucoes:
+        resultado_local = classificador_local.classificar(texto, nome_cliente)
+        if resultado_local:
+            metricas.incrementar("analises_total", origem="classificador_local", intencao=resultado_local["intencao"])
+            carteiras.registrar_analise(carteira, "classificador_local")
+            return resultado_local
+    
+    # Mensagens quase idênticas já analisadas não vão para a OpenAI
+    if _cache_aplicavel(historico):
+        resultado_cache = cache_analises.obter(texto, nome_cliente, _tipo_no_cache(tipo_cobranca, carteira))
+        if resultado_cache:
+            metricas.incrementar("analises_total", origem="cache", intencao=resultado_cache.get("intencao"))
+            carteiras.registrar_analise(carteira, "cache")
+            return resultado_cache
+    
+    return None
+
+def _registrar_resultado_ia(
+    argumentos: dict[str, Any],
+    resultado: dict[str, Any],
+    latencia: float,
+    prompt_tokens: int,
+    completion_tokens: int,
+    carteira: str = CARTEIRA_PADRAO
+):
+    """Métricas de gasto por intenção e carteira e gravação no cache"""
+    intencao = resultado.get("intencao")
+    metricas.incrementar("analises_total", origem="openai", intencao=intencao)
+    metricas.incrementar("openai_tokens_total", prompt_tokens, tipo="prompt", intencao=intencao)
+    metricas.incrementar("openai_tokens_total", completion_tokens, tipo="completion", intencao=intencao)
+    carteiras.registrar_analise(carteira, "openai", prompt_tokens, completion_tokens)
+    
+    if _cache_aplicavel(argumentos.get("historico", "")):
+        cache_analises.guardar(
+            argumentos.get("texto", ""),
+            argumentos.get("nome_cliente", ""),
+            _tipo_no_cache(argumentos.get("tipo_cobranca", ""), carteira),
+            resultado,
+            latencia=latencia,
+            tokens=prompt_tokens + completion_tokens
+        )
+
+# Fallbacks levam origem "fallback": o disjuntor do cliente conta como falha da OpenAI
+
+def _fallback_json_invalido(nome_cliente: str) -> dict[str, Any]:
+    """Fallback se JSON inválido"""
+    metricas.incrementar("analises_total", origem="fallback", motivo="json_invalido")
+    return {
+        "intencao": "nao_identificada",
+        "sentimento": "neutro",
+        "urgencia": "media", 
+        "acao": "resposta_generica",
+        "confianca": 0.3,
+        "explicacao": "Erro ao processar resposta da IA",
+        "mensagem_sugerida": f"Olá {nome_cliente}, vou encaminhar sua mensagem para nossa equipe.",
+        "origem": "fallback"
+    }
+
+def _fallback_erro(nome_cliente: str, erro: Exception) -> dict[str, Any]:
+    """Fallback em caso de erro"""
+    metricas.incrementar("analises_total", origem="fallback", motivo=type(erro).__name__)
+    return {
+        "intencao": "nao_identificada",
+        "sentimento": "neutro",
+        "urgencia": "alta",
+        "acao": "encaminhar_suporte", 
+        "confianca": 0.1,
+        "explicacao": f"Erro na API OpenAI: {str(erro)}",
+        "mensagem_sugerida": f"Olá {nome_cliente}, nossa equipe entrará em contato em breve.",
+        "origem": "fallback"
+    }
+
+async def _chamar_openai(
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    variante: str = "completo",
+    carteira: str = CARTEIRA_PADRAO,
+    **opcoes
+):
+    """
+    Chamada OpenAI sem bloquear o loop - devolve (resposta, latência).
+    A cota da carteira é ocupada antes da vaga global.
+    """
+    openai_client = get_openai_client()
+    inicio = time.perf_counter()
+    async with carteiras.cota(carteira), get_semaforo_openai():
+        response = await openai_client.chat.completions.create(
+            model="gpt-4o-mini",  # Modelo econômico e rápido
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.3,  # Consistência nas respostas
+            max_tokens=max_tokens,
+            **opcoes
+        )
+    latencia = time.perf_counter() - inicio
+    metricas.observar("openai_requisicao_segundos", latencia, modelo="gpt-4o-mini", variante=variante, carteira=carteira)
+    
+    uso = response.usage
+    if uso:
+        metricas.observar("openai_tokens_por_requisicao", uso.prompt_tokens, baldes=BALDES_TOKENS, tipo="prompt", variante=variante)
+        metricas.observar("openai_tokens_por_requisicao", uso.completion_tokens, baldes=BALDES_TOKENS, tipo="completion", variante=variante)
+    return response, latencia
+
+async def analisar_mensagem(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Analisa uma mensagem: classificador local, cache e por fim a OpenAI"""
+    
+    # Extrair parâmetros
+    texto = arguments.get("texto", "")
+    nome_cliente = arguments.get("nome_cliente", "")
+    tipo_cobranca = arguments.get("tipo_cobranca", "")
+    historico = arguments.get("historico", "")
+    carteira = carteiras.resolver(arguments.get("carteira"))
+    
+    resultado_sem_ia = _resolver_sem_ia(texto, nome_cliente, tipo_cobranca, historico, carteira)
+    if resultado_sem_ia:
+        return resultado_sem_ia
+    
+    # Criar prompt contextualizado
+    prompt = compilar_prompt(False, arguments.get("incluir_mensagem_sugerida", True) is not False, carteira)
+    user_prompt = _montar_user_prompt(texto, nome_cliente, tipo_cobranca, historico)
+    
+    try:
+        response, latencia = await _chamar_openai(
+            prompt.system_prompt,
+            user_prompt,
+            max_tokens=prompt.max_tokens_base + prompt.max_tokens_por_item,
+            variante=prompt.variante,
+            carteira=carteira,
+            **prompt.opcoes
+        )
         
-        # Criar prompt contextualizado
-        user_prompt = f"""
-        CLIENTE: {nome_cliente}
-        TIPO COBRANÇA: {tipo_cobranca}
-        HISTÓRICO: {historico}
+        # Extrair resposta
+        resposta = response.choices[0].message.content.strip()
         
-        MENSAGEM DO CLIENTE:
-        "{texto}"
+        # Tentar parsear JSON
+        try:
+            with metricas.cronometrar("mcp_json_parse_segundos", lado="servidor"):
+                resultado = normalizar_analise(_completar_mensagem(loads(resposta), nome_cliente), nome_cliente)
+        except json.JSONDecodeError:
+            carteiras.registrar_analise(carteira, "fallback")
+            return _fallback_json_invalido(nome_cliente)
         
-        Analise esta mensagem e retorne o JSON com sua análise:
-        """
+        uso = response.usage
+        _registrar_resultado_ia(
+            arguments, resultado, latencia,
+            uso.prompt_tokens if uso else 0,
+            uso.completion_tokens if uso else 0,
+            carteira
+        )
+        return resultado
+            
+    except Exception as e:
+        carteiras.registrar_analise(carteira, "fallback")
+        return _fallback_erro(nome_cliente, e)
+
+async def _analisar_grupo_com_ia(
+    itens: list[dict[str, Any]],
+    incluir_mensagem: bool = True,
+    carteira: str = CARTEIRA_PADRAO
+) -> list[dict[str, Any]]:
+    """Uma única completion para várias mensagens; falhas viram fallback por item"""
+    
+    prompt = compilar_prompt(True, incluir_mensagem, carteira)
+    blocos = []
+    for indice, item in enumerate(itens):
+        if PROMPT_COMPACTO:
+            historico = item.get('historico', '')
+            blocos.append(
+                f"[{indice}] Cliente: {item.get('nome_cliente', '')} | "
+                f"Cobrança: {item.get('tipo_cobranca', '')}"
+                + (f" | Histórico: {' / '.join(historico.splitlines())}" if historico else "")
+                + f"\nMensagem: {item.get('texto', '')}"
+            )
+        else:
+            blocos.append(
+                f"[{indice}] CLIENTE: {item.get('nome_cliente', '')} | "
+                f"TIPO COBRANÇA: {item.get('tipo_cobranca', '')} | "
+                f"HISTÓRICO: {item.get('historico', '')}\n"
+                f"MENSAGEM: \"{item.get('texto', '')}\""
+            )
+    user_prompt = "\n\n".join(blocos)
+    if not PROMPT_COMPACTO:
+        user_prompt += "\n\nAnalise cada mensagem e retorne o JSON com os resultados:"
+    
+    try:
+        response, latencia = await _chamar_openai(
+            prompt.system_prompt,
+            user_prompt,
+            max_tokens=prompt.max_tokens_base + prompt.max_tokens_por_item * len(itens),
+            variante=prompt.variante,
+            carteira=carteira,
+            **prompt.opcoes
+        )
+        resposta = response.choices[0].message.content.strip()
         
         try:
-            # Chamar OpenAI
-            openai_client = get_openai_client()
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",  # Modelo econômico e rápido
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,  # Consistência nas respostas
-                max_tokens=500
-            )
-            
-            # Extrair resposta
-            resposta = response.choices[0].message.content.strip()
-            
-            # Tentar parsear JSON
-            try:
-                resultado = json.loads(resposta)
-                
-                # Validar campos obrigatórios
-                campos_obrigatorios = ["intencao", "acao", "confianca", "mensagem_sugerida"]
-                for campo in campos_obrigatorios:
-                    if campo not in resultado:
-                        resultado[campo] = "nao_identificada" if campo in ["intencao", "acao"] else 0.5
-                
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(resultado, ensure_ascii=False, indent=2)
-                )]
-                
-            except json.JSONDecodeError:
-                # Fallback se JSON inválido
-                resultado_fallback = {
-                    "intencao": "nao_identificada",
-                    "sentimento": "neutro",
-                    "urgencia": "media", 
-                    "acao": "resposta_generica",
-                    "confianca": 0.3,
-                    "explicacao": "Erro ao processar resposta da IA",
-                    "mensagem_sugerida": f"Olá {nome_cliente}, vou encaminhar sua mensagem para nossa equipe."
-                }
-                
-                return [TextContent(
-                    type="text", 
-                    text=json.dumps(resultado_fallback, ensure_ascii=False, indent=2)
-                )]
-                
-        except Exception as e:
-            # Fallback em caso de erro
-            resultado_erro = {
-                "intencao": "nao_identificada",
-                "sentimento": "neutro",
-                "urgencia": "alta",
-                "acao": "encaminhar_suporte", 
-                "confianca": 0.1,
-                "explicacao": f"Erro na API OpenAI: {str(e)}",
-                "mensagem_sugerida": f"Olá {nome_cliente}, nossa equipe entrará em contato em breve."
-            }
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps(resultado_erro, ensure_ascii=False, indent=2)
-            )]
+            with metricas.cronometrar("mcp_json_parse_segundos", lado="servidor"):
+                brutos = loads(resposta).get("resultados", [])
+        except (json.JSONDecodeError, AttributeError):
+            for _ in itens:
+                carteiras.registrar_analise(carteira, "fallback")
+            return [_fallback_json_invalido(item.get("nome_cliente", "")) for item in itens]
+        
+        por_indice = {
+            r.get("indice"): r for r in brutos
+            if isinstance(r, dict) and isinstance(r.get("indice"), int)
+        }
+        
+        # Custo da chamada rateado entre os itens do grupo
+        uso = response.usage
+        prompt_tokens = (uso.prompt_tokens if uso else 0) // len(itens)
+        completion_tokens = (uso.completion_tokens if uso else 0) // len(itens)
+        
+        resultados = []
+        for indice, item in enumerate(itens):
+            bruto = por_indice.get(indice)
+            if bruto is None:
+                carteiras.registrar_analise(carteira, "fallback")
+                resultados.append(_fallback_json_invalido(item.get("nome_cliente", "")))
+                continue
+            bruto.pop("indice", None)
+            nome_cliente = item.get("nome_cliente", "")
+            resultado = normalizar_analise(_completar_mensagem(bruto, nome_cliente), nome_cliente)
+            _registrar_resultado_ia(item, resultado, latencia, prompt_tokens, completion_tokens, carteira)
+            resultados.append(resultado)
+        return resultados
+        
+    except Exception as e:
+        for _ in itens:
+            carteiras.registrar_analise(carteira, "fallback")
+        return [_fallback_erro(item.get("nome_cliente", ""), e) for item in itens]
+
+async def analisar_mensagens_lote(
+    itens: list[dict[str, Any]],
+    incluir_mensagem: bool = True,
+    carteira: str = CARTEIRA_PADRAO
+) -> list[dict[str, Any]]:
+    """
+    Analisa várias mensagens: as resolvidas localmente não vão à IA e as
+    restantes seguem em grupos de até MAX_ITENS_POR_CHAMADA por completion.
+    Cada item pode trazer a própria carteira (senão vale a do lote); os
+    grupos nunca misturam carteiras, já que o prompt é de uma só.
+    """
+    carteiras_itens = [carteiras.resolver(item.get("carteira") or carteira) for item in itens]
+    resultados: list[dict[str, Any] | None] = [
+        _resolver_sem_ia(
+            item.get("texto", ""),
+            item.get("nome_cliente", ""),
+            item.get("tipo_cobranca", ""),
+            item.get("historico", ""),
+            carteira_item
+        )
+        for item, carteira_item in zip(itens, carteiras_itens)
+    ]
+    
+    pendentes_por_carteira: dict[str, list[int]] = {}
+    for indice, resultado in enumerate(resultados):
+        if resultado is None:
+            pendentes_por_carteira.setdefault(carteiras_itens[indice], []).append(indice)
+    grupos = [
+        (carteira_grupo, pendentes[i:i + MAX_ITENS_POR_CHAMADA])
+        for carteira_grupo, pendentes in pendentes_por_carteira.items()
+        for i in range(0, len(pendentes), MAX_ITENS_POR_CHAMADA)
+    ]
+    
+    respostas = await asyncio.gather(*(
+        _analisar_grupo_com_ia([itens[indice] for indice in grupo], incluir_mensagem, carteira_grupo)
+        for carteira_grupo, grupo in grupos
+    ))
+    for (_, grupo), resultados_grupo in zip(grupos, respostas):
+        for indice, resultado in zip(grupo, resultados_grupo):
+            resultados[indice] = resultado
+    
+    return resultados
+
+@app.call_tool()
+async def call_tool(name: str, arguments: dict[str, Any]) -> Sequence[TextContent]:
+    """Executa a ferramenta solicitada"""
+    
+    if name == "analisar_mensagem_cobranca":
+        return _como_texto(await analisar_mensagem(arguments))
+    
+    if name == "analisar_mensagens_cobranca_lote":
+        itens = arguments.get("itens") or []
+        incluir_mensagem = arguments.get("incluir_mensagem_sugerida", True) is not False
+        carteira = carteiras.resolver(arguments.get("carteira"))
+        return _como_texto({"resultados": await analisar_mensagens_lote(itens, incluir_mensagem, carteira)})
+    
+    if name == "estatisticas_servidor":
+        estatisticas = {
+            "cache": cache_analises.estatisticas(),
+            "classificador_local": classificador_local.estatisticas(),
+            "carteiras": carteiras.estatisticas(),
+            "metricas": metricas.resumo()
+        }
+        metricas.descarregar()
+        return _como_texto(estatisticas)
     
     return [TextContent(type="text", text="Ferramenta não encontrada")]
 
@@ -204,8 +674,61 @@ async def main():
     # Importar e executar servidor via stdio
     from mcp.server.stdio import stdio_server
     
-    async with stdio_server() as streams:
-        await app.run(*streams)
+    try:
+        async with stdio_server() as streams:
+            await app.run(*streams)
+    finally:
+        # Sem isso o buffer JSONL do servidor se perde ao fim da sessão
+        metricas.descarregar()
+
+# Executar servidor como daemon de longa duração (streamable HTTP)
+async def main_daemon(host: str, porta: int):
+    """
+    Mantém o servidor vivo entre execuções do bot: imports, cliente OpenAI,
+    cache de análises e classificador ficam quentes, e o cliente só paga
+    o initialize HTTP local (MCP_SERVER_URL=http://host:porta/mcp/).
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        print("❌ ERRO: Defina a variável OPENAI_API_KEY")
+        return
+    
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    
+    gerenciador = StreamableHTTPSessionManager(app=app, json_response=True)
+    
+    async def tratar_requisicao_mcp(scope, receive, send):
+        await gerenciador.handle_request(scope, receive, send)
+    
+    @contextlib.asynccontextmanager
+    async def ciclo_de_vida(_aplicacao):
+        async with gerenciador.run():
+            yield
+    
+    aplicacao = Starlette(
+        routes=[Mount("/mcp", app=tratar_requisicao_mcp)],
+        lifespan=ciclo_de_vida
+    )
+    
+    print(f"🤖 MCP Server em modo daemon: http://{host}:{porta}/mcp/")
+    config = uvicorn.Config(aplicacao, host=host, port=porta, log_level="warning")
+    try:
+        await uvicorn.Server(config).serve()
+    finally:
+        metricas.descarregar()
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="MCP Server de análise de cobrança")
+    parser.add_argument("--daemon", action="store_true", help="Roda como serviço HTTP local de longa duração")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    return parser
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    args = criar_parser().parse_args()
+    if args.daemon:
+        asyncio.run(main_daemon(args.host, args.porta))
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,236 @@
+# metricas.py
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Limites dos baldes em segundos (de 0,5 ms até 1 minuto)
+BALDES_PADRAO = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+# Baldes para contagens de tokens por requisição
+BALDES_TOKENS = (25, 50, 100, 150, 200, 300, 400, 600, 800, 1200, 1600, 2400, 4000)
+
+Rotulos = Tuple[Tuple[str, str], ...]
+
+def _rotulos(rotulos: Dict[str, Any]) -> Rotulos:
+    return tuple(sorted((chave, str(valor)) for chave, valor in rotulos.items()))
+
+class Histograma:
+    """Baldes cumulativos para o Prometheus e amostras recentes para percentis exatos"""
+
+    def __init__(self, baldes: Tuple[float, ...] = BALDES_PADRAO, max_amostras: int = 4096):
+        self.baldes = baldes
+        self.contagens = [0] * (len(baldes) + 1)
+        self.soma = 0.0
+        self.total = 0
+        self.amostras: deque = deque(maxlen=max_amostras)
+
+    def observar(self, valor: float):
+        self.contagens[bisect.bisect_left(self.baldes, valor)] += 1
+        self.soma += valor
+        self.total += 1
+        self.amostras.append(valor)
+
+    def percentil(self, p: float) -> float:
+        if not self.amostras:
+            return 0.0
+        ordenadas = sorted(self.amostras)
+        indice = min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))
+        return ordenadas[indice]
+
+    def resumo(self) -> Dict[str, float]:
+        return {
+            "total": self.total,
+            "soma": round(self.soma, 6),
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "p99": self.percentil(99)
+        }
+
+class SinkMemoria:
+    """Guarda os últimos eventos em memória (útil em testes e benchmarks)"""
+
+    def __init__(self, max_eventos: int = 10000):
+        self.eventos: deque = deque(maxlen=max_eventos)
+
+    def registrar(self, evento: Dict[str, Any]):
+        self.eventos.append(evento)
+
+    def descarregar(self, registro: "RegistroMetricas"):
+        pass
+
+class SinkJsonl:
+    """Um evento por linha em arquivo JSON lines, gravado em blocos"""
+
+    def __init__(self, caminho: str, tamanho_buffer: int = 200):
+        self.caminho = caminho
+        self.tamanho_buffer = tamanho_buffer
+        self._buffer: List[str] = []
+
+    def registrar(self, evento: Dict[str, Any]):
+        self._buffer.append(json.dumps(evento, ensure_ascii=False, separators=(",", ":")))
+        if len(self._buffer) >= self.tamanho_buffer:
+            self.descarregar(None)
+
+    def descarregar(self, registro: Optional["RegistroMetricas"]):
+        if not self._buffer:
+            return
+        with open(self.caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write("\n".join(self._buffer) + "\n")
+        self._buffer = []
+
+class SinkPrometheus:
+    """Escreve o formato texto do Prometheus (textfile collector) ao descarregar"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+
+    def registrar(self, evento: Dict[str, Any]):
+        pass
+
+    def descarregar(self, registro: Optional["RegistroMetricas"]):
+        if registro is None:
+            return
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            arquivo.write(registro.exportar_prometheus())
+        os.replace(temporario, self.caminho)
+
+class RegistroMetricas:
+    """
+    Contadores e histogramas com rótulos, repassados a sinks plugáveis.
+
+    Uso: metricas.incrementar("mcp_fallbacks_total", motivo="erro_analise")
+    ou   with metricas.cronometrar("mcp_call_tool_segundos"): ...
+    """
+
+    def __init__(self, sinks: Optional[List[Any]] = None):
+        self.sinks = list(sinks or [])
+        self.contadores: Dict[Tuple[str, Rotulos], float] = {}
+        self.histogramas: Dict[Tuple[str, Rotulos], Histograma] = {}
+        self._trava = threading.Lock()
+
+    def adicionar_sink(self, sink):
+        self.sinks.append(sink)
+
+    def _emitir(self, tipo: str, nome: str, valor: float, rotulos: Dict[str, Any]):
+        if not self.sinks:
+            return
+        evento = {"ts": time.time(), "tipo": tipo, "nome": nome, "valor": valor, "rotulos": rotulos}
+        for sink in self.sinks:
+            sink.registrar(evento)
+
+    def incrementar(self, nome: str, valor: float = 1, **rotulos):
+        chave = (nome, _rotulos(rotulos))
+        with self._trava:
+            self.contadores[chave] = self.contadores.get(chave, 0) + valor
+        self._emitir("contador", nome, valor, rotulos)
+
+    def observar(self, nome: str, valor: float, baldes: Optional[Tuple[float, ...]] = None, **rotulos):
+        chave = (nome, _rotulos(rotulos))
+        with self._trava:
+            histograma = self.histogramas.get(chave)
+            if histograma is None:
+                histograma = self.histogramas[chave] = Histograma(baldes or BALDES_PADRAO)
+            histograma.observar(valor)
+        self._emitir("histograma", nome, valor, rotulos)
+
+    @contextmanager
+    def cronometrar(self, nome: str, **rotulos) -> Iterator[None]:
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def descarregar(self):
+        for sink in self.sinks:
+            sink.descarregar(self)
+
+    def resumo(self) -> Dict[str, Any]:
+        """Contadores e percentis p50/p95/p99 num dicionário serializável"""
+        with self._trava:
+            return {
+                "contadores": [
+                    {"nome": nome, "rotulos": dict(rotulos), "valor": valor}
+                    for (nome, rotulos), valor in sorted(self.contadores.items())
+                ],
+                "histogramas": [
+                    {"nome": nome, "rotulos": dict(rotulos), **histograma.resumo()}
+                    for (nome, rotulos), histograma in sorted(self.histogramas.items(), key=lambda i: i[0])
+                ]
+            }
+
+    def exportar_prometheus(self) -> str:
+        """Formato texto de exposição do Prometheus"""
+
+        def formatar(rotulos: Rotulos, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            todos = rotulos + extra
+            if not todos:
+                return ""
+            return "{" + ",".join(f'{chave}="{valor}"' for chave, valor in todos) + "}"
+
+        linhas = []
+        with self._trava:
+            for nome in sorted({nome for nome, _ in self.contadores}):
+                linhas.append(f"# TYPE {nome} counter")
+                for (n, rotulos), valor in sorted(self.contadores.items()):
+                    if n == nome:
+                        linhas.append(f"{nome}{formatar(rotulos)} {valor}")
+
+            for nome in sorted({nome for nome, _ in self.histogramas}):
+                linhas.append(f"# TYPE {nome} histogram")
+                for (n, rotulos), histograma in sorted(self.histogramas.items(), key=lambda i: i[0]):
+                    if n != nome:
+                        continue
+                    acumulado = 0
+                    for limite, contagem in zip(histograma.baldes, histograma.contagens):
+                        acumulado += contagem
+                        linhas.append(f"{nome}_bucket{formatar(rotulos, (('le', str(limite)),))} {acumulado}")
+                    linhas.append(f"{nome}_bucket{formatar(rotulos, (('le', '+Inf'),))} {histograma.total}")
+                    linhas.append(f"{nome}_sum{formatar(rotulos)} {histograma.soma}")
+                    linhas.append(f"{nome}_count{formatar(rotulos)} {histograma.total}")
+
+        return "\n".join(linhas) + "\n"
+
+def caminho_do_processo(caminho: str) -> str:
+    """
+    Cliente e servidor herdam o mesmo METRICAS_SINK: cada processo grava no
+    próprio arquivo (m.jsonl -> m.<papel>.jsonl). O papel vem de
+    METRICAS_PAPEL ou, sem ele, do script e do pid.
+    """
+    papel = os.getenv("METRICAS_PAPEL")
+    if not papel:
+        script = os.path.splitext(os.path.basename(sys.argv[0] or ""))[0] or "python"
+        papel = f"{script}.{os.getpid()}"
+    base, extensao = os.path.splitext(caminho)
+    return f"{base}.{papel}{extensao}"
+
+def criar_sinks(configuracao: str) -> List[Any]:
+    """
+    Monta sinks a partir de texto como "memoria,jsonl:/tmp/m.jsonl,prometheus:/tmp/m.prom"
+    """
+    sinks = []
+    for item in filter(None, (parte.strip() for parte in configuracao.split(","))):
+        tipo, _, caminho = item.partition(":")
+        if tipo == "memoria":
+            sinks.append(SinkMemoria())
+        elif tipo == "jsonl" and caminho:
+            sinks.append(SinkJsonl(caminho_do_processo(caminho)))
+        elif tipo == "prometheus" and caminho:
+            sinks.append(SinkPrometheus(caminho_do_processo(caminho)))
+        else:
+            # stderr: no servidor stdio o stdout é o canal JSON-RPC
+            print(f"⚠️ Sink de métricas desconhecido: {item}", file=sys.stderr)
+    return sinks
+
+# Registro global do processo, configurado por METRICAS_SINK
+metricas = RegistroMetricas(criar_sinks(os.getenv("METRICAS_SINK", "")))
@@ -0,0 +1,88 @@
+# motor_acoes.py
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Tuple
+
+# Ação usada quando a IA devolve algo fora do registro
+ACAO_PADRAO = "resposta_generica"
+
+Handler = Callable[[str, Mapping[str, Any]], str]
+
+class AcaoRegistrada(NamedTuple):
+    handler: Handler
+    log: str
+
+ACOES: Dict[str, AcaoRegistrada] = {}
+
+def registrar_acao(nome: str, log: str):
+    """
+    Registra o handler da ação `nome`.
+
+    O handler recebe (mensagem_sugerida, cliente) e devolve a mensagem
+    final; `log` é a linha impressa depois do envio.
+    """
+    def decorar(handler: Handler) -> Handler:
+        ACOES[nome] = AcaoRegistrada(handler, log)
+        return handler
+    return decorar
+
+@lru_cache(maxsize=4096)
+def formatar_vencimento(vencimento: datetime) -> str:
+    """Poucas datas distintas por carteira - formata cada uma só uma vez"""
+    return vencimento.strftime('%d/%m/%Y')
+
+# Templates compilados uma vez na importação
+_TEMPLATE_BOLETO = "{}\n\nSeu boleto: {}".format
+_TEMPLATE_DIVIDA = "{}\n\nDetalhes: {} - Venc: {}".format
+
+def _repassar(mensagem_sugerida: str, cliente: Mapping[str, Any]) -> str:
+    return mensagem_sugerida
+
+registrar_acao("agradecer_confirmar", "✅ Agradecimento enviado - aguardando confirmação de pagamento")(_repassar)
+registrar_acao("enviar_opcoes_negociacao", "💰 Opções de negociação enviadas")(_repassar)
+registrar_acao("encaminhar_suporte", "👤 Caso encaminhado para suporte humano")(_repassar)
+registrar_acao("oferecer_parcelamento", "💳 Opções de parcelamento oferecidas")(_repassar)
+registrar_acao("solicitar_comprovante", "📋 Comprovante de pagamento solicitado")(_repassar)
+registrar_acao(ACAO_PADRAO, "🤖 Resposta genérica enviada - pode precisar de humano")(_repassar)
+
+@registrar_acao("reenviar_boleto", "📄 Boleto reenviado")
+def _reenviar_boleto(mensagem_sugerida: str, cliente: Mapping[str, Any]) -> str:
+    return _TEMPLATE_BOLETO(mensagem_sugerida, cliente['link_boleto'])
+
+@registrar_acao("explicar_divida", "📝 Explicação da dívida enviada")
+def _explicar_divida(mensagem_sugerida: str, cliente: Mapping[str, Any]) -> str:
+    return _TEMPLATE_DIVIDA(
+        mensagem_sugerida, cliente['tipo_cobranca'], formatar_vencimento(cliente['vencimento'])
+    )
+
+class MotorAcoes:
+    """
+    Resolve a ação da IA por lookup no registro (custo constante, qualquer
+    que seja o número de ações) e conta quantas vezes cada uma foi executada.
+    """
+
+    def __init__(self, acoes: Dict[str, AcaoRegistrada] = ACOES):
+        self.acoes = acoes
+        self.padrao = acoes[ACAO_PADRAO]
+        self.contadores: Counter = Counter()
+
+    def executar(self, analise: Mapping[str, Any], cliente: Mapping[str, Any]) -> Tuple[str, str]:
+        """Mensagem final e log da ação, sem enviar nada"""
+        acao = analise.get('acao')
+        registrada = self.acoes.get(acao)
+        if registrada is None:
+            registrada, acao = self.padrao, ACAO_PADRAO
+        self.contadores[acao] += 1
+        return registrada.handler(analise.get('mensagem_sugerida', ''), cliente), registrada.log
+
+    def executar_lote(
+        self,
+        pares: Iterable[Tuple[Mapping[str, Any], Mapping[str, Any]]]
+    ) -> List[Tuple[str, str]]:
+        """Executa vários (analise, cliente) de uma vez, na ordem recebida"""
+        executar = self.executar
+        return [executar(analise, cliente) for analise, cliente in pares]
+
+    def estatisticas(self) -> Dict[str, int]:
+        return dict(self.contadores)
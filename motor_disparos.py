@@ -0,0 +1,117 @@
+# motor_disparos.py
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from string import Formatter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+# Rótulo do disparo -> deslocamento do vencimento em relação a hoje
+JANELAS_DISPARO = {
+    "D-1": timedelta(days=1),   # vence amanhã
+    "D+1": timedelta(days=-1),  # venceu ontem
+}
+
+Disparo = Tuple[str, Mapping[str, Any], str]
+
+# (índice do shard, total de shards)
+Shard = Tuple[int, int]
+
+def shard_do_telefone(telefone: str, total_shards: int) -> int:
+    """Partição estável entre processos e execuções (hash() do Python varia por processo)"""
+    return zlib.crc32(telefone.encode()) % total_shards
+
+def _data(valor) -> date:
+    """Aceita datetime ou date e devolve só a data"""
+    return valor.date() if isinstance(valor, datetime) else valor
+
+class IndiceVencimentos:
+    """Índice em memória de devedores agrupados pela data de vencimento"""
+
+    def __init__(self, clientes: Iterable[Mapping[str, Any]] = ()):
+        self._por_data: Dict[date, List[Mapping[str, Any]]] = defaultdict(list)
+        self._por_telefone: Dict[str, Mapping[str, Any]] = {}
+        self._total = 0
+        for cliente in clientes:
+            self.adicionar(cliente)
+
+    def adicionar(self, cliente: Mapping[str, Any]):
+        self._por_data[_data(cliente["vencimento"])].append(cliente)
+        self._por_telefone[cliente["telefone"]] = cliente
+        self._total += 1
+
+    def clientes_por_vencimento(
+        self,
+        datas: Iterable[date],
+        filtro_telefone: Optional[Callable[[str], bool]] = None
+    ) -> Iterator[Mapping[str, Any]]:
+        """Só percorre os baldes das datas pedidas"""
+        for data in datas:
+            for cliente in self._por_data.get(data, ()):
+                if filtro_telefone is None or filtro_telefone(cliente["telefone"]):
+                    yield cliente
+
+    def buscar_por_telefone(self, telefone: str) -> Optional[Mapping[str, Any]]:
+        return self._por_telefone.get(telefone)
+
+    def __len__(self) -> int:
+        return self._total
+
+def compilar_templates(
+    mensagens: Dict[str, Dict[str, str]]
+) -> Dict[Tuple[str, str], Callable[[Mapping[str, Any]], str]]:
+    """
+    Pré-compila os templates de `mensagens` em funções de renderização.
+
+    Os campos de cada template são validados uma vez aqui, e a renderização
+    usa format_map direto sobre o registro do cliente, sem montar kwargs.
+    """
+    compilados = {}
+    for tipo, por_rotulo in mensagens.items():
+        for rotulo, template in por_rotulo.items():
+            campos = {campo for _, campo, _, _ in Formatter().parse(template) if campo}
+            if not campos <= {"nome", "link_boleto", "telefone", "tipo_cobranca", "vencimento"}:
+                raise ValueError(f"Template {tipo}/{rotulo} usa campos desconhecidos: {campos}")
+            compilados[(tipo, rotulo)] = template.format_map
+    return compilados
+
+class MotorDisparos:
+    """
+    Gera os disparos D-1/D+1 consultando só os baldes de vencimento do dia.
+
+    A fonte precisa oferecer clientes_por_vencimento(datas, filtro_telefone),
+    aplicando o filtro antes de montar cada registro; o índice em memória
+    acima serve para listas pequenas e testes.
+    """
+
+    def __init__(self, fonte, mensagens: Dict[str, Dict[str, str]]):
+        self.fonte = fonte
+        self.templates = compilar_templates(mensagens)
+
+    def gerar_disparos(self, hoje: date, shard: Optional[Shard] = None) -> Iterator[Disparo]:
+        """Produz (rotulo, cliente, mensagem) de forma preguiçosa, só do shard pedido"""
+        filtro = None
+        if shard:
+            indice, total = shard
+            filtro = lambda telefone: shard_do_telefone(telefone, total) == indice
+        for rotulo, deslocamento in JANELAS_DISPARO.items():
+            for cliente in self.fonte.clientes_por_vencimento([hoje + deslocamento], filtro):
+                renderizar = self.templates.get((cliente["tipo_cobranca"], rotulo))
+                if renderizar is None:
+                    continue
+                yield rotulo, cliente, renderizar(cliente)
+
+    def disparos_em_lotes(
+        self,
+        hoje: date,
+        tamanho_lote: int = 500,
+        shard: Optional[Shard] = None
+    ) -> Iterator[List[Disparo]]:
+        """Agrupa os disparos em lotes para quem envia em bloco"""
+        lote: List[Disparo] = []
+        for disparo in self.gerar_disparos(hoje, shard):
+            lote.append(disparo)
+            if len(lote) >= tamanho_lote:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
@@ -0,0 +1,243 @@
+# resiliencia.py
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from metricas import metricas
+
+T = TypeVar("T")
+
+class CircuitoAberto(Exception):
+    """Disjuntor aberto - a chamada nem foi tentada"""
+
+class CircuitBreaker:
+    """
+    Disjuntor por taxa de erro numa janela das últimas chamadas.
+
+    Fechado: tudo passa. Quando a taxa de falhas da janela passa do limiar
+    ele abre e recusa na hora por `tempo_aberto` segundos; depois deixa uma
+    única chamada de teste passar (meio aberto) e fecha se ela der certo.
+
+    Cada mudança de estado abre uma nova geração: o resultado de uma chamada
+    que começou numa geração anterior (ex.: sucesso atrasado de antes da
+    abertura) é ignorado.
+    """
+
+    def __init__(
+        self,
+        nome: str = "mcp",
+        limiar_falhas: float = 0.5,
+        janela: int = 20,
+        min_chamadas: int = 5,
+        tempo_aberto: float = 30.0
+    ):
+        self.nome = nome
+        self.limiar_falhas = limiar_falhas
+        self.min_chamadas = min_chamadas
+        self.tempo_aberto = tempo_aberto
+        self._resultados: Deque[bool] = deque(maxlen=janela)
+        self._aberto_ate = 0.0
+        self._teste_em_andamento = False
+        self.geracao = 0
+        self.estado = "fechado"
+        self.aberturas = 0
+        self.recusadas = 0
+
+    def permitir(self) -> bool:
+        if self.estado == "fechado":
+            return True
+        if self.estado == "aberto" and time.monotonic() >= self._aberto_ate:
+            self._mudar_estado("meio_aberto")
+        if self.estado == "meio_aberto" and not self._teste_em_andamento:
+            self._teste_em_andamento = True
+            return True
+        self.recusadas += 1
+        metricas.incrementar("circuito_recusas_total", circuito=self.nome)
+        return False
+
+    async def executar(
+        self,
+        chamada: Callable[[], Awaitable[T]],
+        falhou: Optional[Callable[[T], bool]] = None
+    ) -> T:
+        """
+        Roda uma `chamada` já permitida e registra o resultado na geração em
+        que ela começou. `falhou` marca como falha respostas que chegaram mas
+        indicam erro do outro lado (ex.: fallback do servidor).
+        """
+        geracao = self.geracao
+        try:
+            resultado = await chamada()
+        except Exception:
+            self.registrar_falha(geracao)
+            raise
+        except BaseException:
+            # Cancelada (perdeu o hedge, prazo de quem chamou): não conta, mas libera o teste
+            self.liberar_teste(geracao)
+            raise
+        if falhou is not None and falhou(resultado):
+            self.registrar_falha(geracao)
+        else:
+            self.registrar_sucesso(geracao)
+        return resultado
+
+    def _obsoleta(self, geracao: Optional[int]) -> bool:
+        return geracao is not None and geracao != self.geracao
+
+    def liberar_teste(self, geracao: Optional[int] = None):
+        if not self._obsoleta(geracao):
+            self._teste_em_andamento = False
+
+    def registrar_sucesso(self, geracao: Optional[int] = None):
+        if self._obsoleta(geracao):
+            return
+        self._teste_em_andamento = False
+        if self.estado != "fechado":
+            self._resultados.clear()
+            self._mudar_estado("fechado")
+        self._resultados.append(True)
+
+    def registrar_falha(self, geracao: Optional[int] = None):
+        if self._obsoleta(geracao):
+            return
+        self._teste_em_andamento = False
+        self._resultados.append(False)
+        if self.estado == "meio_aberto":
+            self._abrir()
+            return
+
+        falhas = self._resultados.count(False)
+        if (
+            self.estado == "fechado"
+            and len(self._resultados) >= self.min_chamadas
+            and falhas / len(self._resultados) >= self.limiar_falhas
+        ):
+            self._abrir()
+
+    def _abrir(self):
+        self._aberto_ate = time.monotonic() + self.tempo_aberto
+        self.aberturas += 1
+        self._mudar_estado("aberto")
+
+    def _mudar_estado(self, estado: str):
+        if estado != self.estado:
+            print(f"⚡ Circuito {self.nome}: {self.estado} -> {estado}")
+            metricas.incrementar("circuito_transicoes_total", circuito=self.nome, estado=estado)
+            self.geracao += 1
+        self.estado = estado
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "estado": self.estado,
+            "aberturas": self.aberturas,
+            "recusadas": self.recusadas,
+            "falhas_na_janela": self._resultados.count(False),
+            "chamadas_na_janela": len(self._resultados)
+        }
+
+def resposta_de_fallback(resultado: Any) -> bool:
+    """
+    O servidor respondeu com o fallback de erro da OpenAI (origem
+    "fallback"); num lote, só quando todos os itens respondidos são fallback
+    """
+    if isinstance(resultado, dict):
+        return resultado.get("origem") == "fallback"
+    if isinstance(resultado, list):
+        analises = [analise for analise in resultado if analise is not None]
+        return bool(analises) and all(resposta_de_fallback(analise) for analise in analises)
+    return False
+
+def eh_transitorio(erro: BaseException) -> bool:
+    """Falhas que valem nova tentativa: prazo estourado e erros de conexão"""
+    return isinstance(erro, (asyncio.TimeoutError, TimeoutError, ConnectionError))
+
+async def com_prazo_e_retentativas(
+    chamada: Callable[[], Awaitable[T]],
+    prazo: Optional[float] = None,
+    max_retentativas: int = 1,
+    atraso_base: float = 0.2,
+    atraso_maximo: float = 2.0
+) -> T:
+    """
+    Executa `chamada` com prazo por tentativa e até `max_retentativas`
+    novas tentativas para erros transitórios, com backoff exponencial e
+    jitter completo (evita que os clientes voltem todos juntos).
+    """
+    tentativa = 0
+    while True:
+        try:
+            if prazo:
+                return await asyncio.wait_for(chamada(), prazo)
+            return await chamada()
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                metricas.incrementar("mcp_prazo_estourado_total")
+            if tentativa >= max_retentativas or not eh_transitorio(e):
+                raise
+            tentativa += 1
+            metricas.incrementar("mcp_retentativas_total")
+            await asyncio.sleep(random.uniform(0, min(atraso_maximo, atraso_base * 2 ** tentativa)))
+
+async def com_hedge(chamadas: List[Callable[[], Awaitable[T]]], atraso_hedge: float) -> T:
+    """
+    Começa pela primeira chamada e, se ela não responder em `atraso_hedge`
+    segundos, dispara a próxima em paralelo; vale a primeira que der certo
+    e as demais são canceladas. Só falha se todas falharem.
+    """
+    pendentes = set()
+    ultimo_erro: Optional[BaseException] = None
+    proximas = iter(chamadas)
+
+    def disparar_proxima() -> bool:
+        chamada = next(proximas, None)
+        if chamada is None:
+            return False
+        pendentes.add(asyncio.ensure_future(chamada()))
+        return True
+
+    disparar_proxima()
+    try:
+        while pendentes:
+            prontas, _ = await asyncio.wait(
+                pendentes, timeout=atraso_hedge, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not prontas:
+                if disparar_proxima():
+                    metricas.incrementar("mcp_hedges_total")
+                continue
+
+            for tarefa in prontas:
+                pendentes.discard(tarefa)
+                if tarefa.exception() is None:
+                    return tarefa.result()
+                ultimo_erro = tarefa.exception()
+
+            # A que respondeu falhou: não espera o prazo do hedge para tentar outra
+            if not pendentes:
+                disparar_proxima()
+        raise ultimo_erro
+    finally:
+        for tarefa in pendentes:
+            tarefa.cancel()
+
+_classificador = None
+
+def analise_sem_servidor(texto: str, nome_cliente: str) -> Dict[str, Any]:
+    """
+    Caminho local com o circuito aberto: classificador por regras quando a
+    mensagem é óbvia, senão o fallback de encaminhar para humano.
+    """
+    global _classificador
+    from mcp_client_oficial import criar_resposta_fallback
+
+    if _classificador is None:
+        from classificador_local import ClassificadorLocal
+        _classificador = ClassificadorLocal()
+
+    resultado = _classificador.classificar(texto, nome_cliente)
+    if resultado:
+        metricas.incrementar("mcp_fallbacks_total", motivo="classificador_local")
+        return resultado
+    return criar_resposta_fallback(nome_cliente, "circuito_aberto")
@@ -0,0 +1,48 @@
+import asyncio
+
+from carteiras import CARTEIRA_PADRAO, carregar_carteiras
+
+def test_carteira_desconhecida_usa_a_padrao():
+    registro = carregar_carteiras('{"banco_x": {"instrucoes": "Tom formal.", "max_concorrencia": 2}}', cota_padrao=3)
+
+    assert registro.resolver("banco_x") == "banco_x"
+    assert registro.resolver("nao_existe") == CARTEIRA_PADRAO
+    assert registro.resolver(None) == CARTEIRA_PADRAO
+    assert registro.obter("nao_existe") == (CARTEIRA_PADRAO, "", 0)
+
+def test_nomes_arbitrarios_nao_criam_cotas_nem_contadores():
+    registro = carregar_carteiras('{"banco_x": {}}')
+
+    async def usar():
+        for indice in range(50):
+            async with registro.cota(f"carteira_{indice}"):
+                registro.registrar_analise(f"carteira_{indice}", "openai", 10, 5)
+
+    asyncio.run(usar())
+    estatisticas = registro.estatisticas()
+    assert list(estatisticas) == [CARTEIRA_PADRAO]
+    assert estatisticas[CARTEIRA_PADRAO]["analises"] == {"openai": 50}
+
+def _pico_em_andamento(registro, nome, chamadas, limite_global):
+    global_ = asyncio.Semaphore(limite_global)
+    em_andamento = pico = 0
+
+    async def chamar():
+        nonlocal em_andamento, pico
+        async with registro.cota(nome), global_:
+            em_andamento += 1
+            pico = max(pico, em_andamento)
+            await asyncio.sleep(0.01)
+            em_andamento -= 1
+
+    async def rodar():
+        await asyncio.gather(*(chamar() for _ in range(chamadas)))
+
+    asyncio.run(rodar())
+    return pico
+
+def test_carteira_padrao_nao_configurada_usa_o_limite_global():
+    registro = carregar_carteiras('{"banco_x": {}}', cota_padrao=8)
+
+    assert _pico_em_andamento(registro, CARTEIRA_PADRAO, 30, limite_global=32) == 30
+    assert _pico_em_andamento(registro, "banco_x", 30, limite_global=32) == 8
@@ -0,0 +1,26 @@
+import pytest
+
+from classificador_local import ClassificadorLocal
+
+@pytest.fixture
+def classificador():
+    return ClassificadorLocal()
+
+@pytest.mark.parametrize("texto", [
+    "Oi, já paguei ontem via PIX",
+    "Pagamento realizado hoje cedo",
+])
+def test_pagamento_obvio_resolvido_localmente(classificador, texto):
+    resultado = classificador.classificar(texto, "João Silva")
+    assert resultado is not None
+    assert resultado["intencao"] == "pagamento_realizado"
+
+@pytest.mark.parametrize("texto", [
+    "Eu nunca paguei isso",
+    "Não sei se paguei",
+    "paguei metade, o resto mês que vem",
+    "Paguei só uma parte",
+])
+def test_negacao_duvida_e_pagamento_parcial_vao_para_ia(classificador, texto):
+    resultado = classificador.classificar(texto, "João Silva")
+    assert resultado is None or resultado["intencao"] != "pagamento_realizado"
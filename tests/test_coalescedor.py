@@ -0,0 +1,69 @@
+import asyncio
+
+from coalescedor import CoalescedorAnalises
+
+def _analise(item):
+    return {"acao": "resposta_generica", "texto": item["texto"]}
+
+def test_pedidos_identicos_compartilham_a_mesma_chamada():
+    lotes = []
+
+    async def chamar_lote(itens):
+        lotes.append(len(itens))
+        await asyncio.sleep(0.01)
+        return [_analise(item) for item in itens]
+
+    async def cenario():
+        coalescedor = CoalescedorAnalises(chamar_lote, max_itens=10)
+        resultados = await asyncio.gather(*(
+            coalescedor.analisar("já paguei", "Maria", "mensalidade") for _ in range(5)
+        ))
+        return coalescedor, resultados
+
+    coalescedor, resultados = asyncio.run(cenario())
+    assert lotes == [1]
+    assert coalescedor.deduplicadas == 4
+    assert all(resultado == {"acao": "resposta_generica", "texto": "já paguei"} for resultado in resultados)
+    # Cada chamador recebe a própria cópia
+    assert len({id(resultado) for resultado in resultados}) == 5
+
+def test_lote_cheio_sai_sem_esperar_o_prazo():
+    lotes = []
+
+    async def cenario():
+        liberar = asyncio.Event()
+
+        async def chamar_lote(itens):
+            lotes.append([item["texto"] for item in itens])
+            if len(lotes) == 1:
+                await liberar.wait()
+            return [_analise(item) for item in itens]
+
+        # Prazo longo: só max_itens pode disparar o segundo lote
+        coalescedor = CoalescedorAnalises(chamar_lote, max_itens=3, espera_maxima=10)
+        primeiro = asyncio.ensure_future(coalescedor.analisar("m0", "A", "t"))
+        await asyncio.sleep(0)
+        seguintes = [asyncio.ensure_future(coalescedor.analisar(f"m{i}", "A", "t")) for i in range(1, 4)]
+        await asyncio.wait_for(asyncio.gather(*seguintes), 1)
+        liberar.set()
+        await primeiro
+
+    asyncio.run(cenario())
+    assert lotes == [["m0"], ["m1", "m2", "m3"]]
+
+def test_erro_do_lote_chega_a_todos_os_chamadores():
+    async def chamar_lote(itens):
+        await asyncio.sleep(0)
+        raise ConnectionError("servidor caiu")
+
+    async def cenario():
+        coalescedor = CoalescedorAnalises(chamar_lote, max_itens=10)
+        return await asyncio.gather(
+            coalescedor.analisar("a", "A", "t"),
+            coalescedor.analisar("a", "A", "t"),
+            coalescedor.analisar("b", "B", "t"),
+            return_exceptions=True
+        )
+
+    # Os dois "a" dividem o primeiro lote; "b" vai no seguinte, que também falha
+    assert all(isinstance(resultado, ConnectionError) for resultado in asyncio.run(cenario()))
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+from envio_mensagens import DespachanteMensagens, FilaRetentativas, LimitadorTokenBucket
+
+def test_lote_maior_que_o_balde_respeita_a_taxa():
+    limitador = LimitadorTokenBucket(taxa=100, capacidade=20)
+
+    async def enviar_lotes():
+        inicio = time.monotonic()
+        for _ in range(3):
+            await limitador.aguardar(50)
+        return time.monotonic() - inicio
+
+    # 20 tokens de rajada; os outros 130 saem a 100/s
+    assert asyncio.run(enviar_lotes()) >= 1.25
+
+class TransporteMemoria:
+    def __init__(self):
+        self.recebidas = []
+
+    async def enviar_lote(self, mensagens):
+        self.recebidas.extend(mensagens)
+        return True
+
+    async def fechar(self):
+        pass
+
+def test_fila_duravel_guarda_mensagem_ate_o_envio(tmp_path):
+    caminho = str(tmp_path / "fila.db")
+    despachante = DespachanteMensagens(transporte=TransporteMemoria(), fila_retentativas=FilaRetentativas(caminho))
+    despachante.enfileirar_lote([("5511", "oi"), ("5512", "olá")])
+
+    # Gravado em disco antes de qualquer envio: uma queda aqui não perde nada
+    assert FilaRetentativas(caminho).pendentes() == 2
+
+    asyncio.run(despachante.descarregar())
+    assert len(despachante.transporte.recebidas) == 2
+    assert despachante.fila_retentativas.pendentes() == 0
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime
+
+from gravacao_analises import (
+    ClienteGravador, ClienteReplay, GravadorAnalises, anotar_cliente, reproduzir_acoes
+)
+
+CLIENTE = {
+    "nome": "Maria",
+    "telefone": "5511999990000",
+    "tipo_cobranca": "mensalidade",
+    "link_boleto": "https://boletos/1",
+    "vencimento": datetime(2024, 3, 10)
+}
+
+class ClienteRoteiro:
+    """Devolve as análises na ordem dada, como um servidor que mudou de ideia"""
+
+    def __init__(self, analises):
+        self.analises = list(analises)
+
+    async def analisar_mensagem(self, texto, nome_cliente, tipo_cobranca, historico="", carteira=None):
+        return self.analises.pop(0)
+
+    async def desconectar(self):
+        pass
+
+def _analisar_duas_vezes(cliente, historicos):
+    async def rodar():
+        anotar_cliente(CLIENTE)
+        return [
+            await cliente.analisar_mensagem("ok", CLIENTE["nome"], CLIENTE["tipo_cobranca"], historico)
+            for historico in historicos
+        ]
+    return asyncio.run(rodar())
+
+def test_replay_segue_a_ordem_das_mensagens_repetidas(tmp_path):
+    caminho = str(tmp_path / "analises.jsonl")
+    primeira = {"acao": "explicar_divida", "mensagem_sugerida": "Segue o detalhe"}
+    segunda = {"acao": "reenviar_boleto", "mensagem_sugerida": "Segue o boleto"}
+
+    gravador = ClienteGravador(ClienteRoteiro([primeira, segunda]), GravadorAnalises(caminho))
+    _analisar_duas_vezes(gravador, ["", "bot: ..."])
+    asyncio.run(gravador.desconectar())
+
+    replay = ClienteReplay(caminho)
+    asyncio.run(replay.conectar())
+    # Histórico diferente do gravado não muda a chave
+    assert _analisar_duas_vezes(replay, ["outro", "resumo"]) == [primeira, segunda]
+
+    relatorio = reproduzir_acoes(caminho)
+    assert relatorio["acoes"] == {"explicar_divida": 1, "reenviar_boleto": 1}
+    assert relatorio["sem_cadastro"] == 0
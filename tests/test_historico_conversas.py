@@ -0,0 +1,27 @@
+from historico_conversas import HistoricoConversas
+
+def _linhas(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return sum(1 for _ in arquivo)
+
+def test_log_e_compactado_sozinho(tmp_path):
+    caminho = str(tmp_path / "historico.jsonl")
+    historico = HistoricoConversas(max_mensagens=2, caminho=caminho, compactar_apos=10)
+    for indice in range(100):
+        historico.registrar("5511999990000", "cliente", f"mensagem {indice}")
+
+    # Só 2 mensagens em memória: o log nunca passa do limite de compactação
+    assert _linhas(caminho) < 10
+
+    recarregado = HistoricoConversas(max_mensagens=2, caminho=caminho, compactar_apos=10)
+    assert [texto for _, _, texto in recarregado.mensagens("5511999990000")] == ["mensagem 98", "mensagem 99"]
+
+def test_carga_compacta_log_antigo(tmp_path):
+    caminho = str(tmp_path / "historico.jsonl")
+    HistoricoConversas(max_mensagens=50, caminho=caminho, compactar_apos=1000).registrar("1", "bot", "oi")
+    grande = HistoricoConversas(max_mensagens=50, caminho=caminho, compactar_apos=1000)
+    for indice in range(500):
+        grande.registrar("1", "cliente", f"mensagem {indice}")
+
+    HistoricoConversas(max_mensagens=5, caminho=caminho, compactar_apos=100)
+    assert _linhas(caminho) == 5
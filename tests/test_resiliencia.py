@@ -0,0 +1,68 @@
+import asyncio
+
+from resiliencia import CircuitBreaker, resposta_de_fallback
+
+def _abrir(disjuntor):
+    for _ in range(disjuntor.min_chamadas):
+        assert disjuntor.permitir()
+        disjuntor.registrar_falha()
+    assert disjuntor.estado == "aberto"
+
+def test_teste_cancelado_libera_o_meio_aberto():
+    disjuntor = CircuitBreaker(tempo_aberto=0)
+    _abrir(disjuntor)
+
+    async def teste_cancelado():
+        assert disjuntor.permitir()
+        tarefa = asyncio.ensure_future(disjuntor.executar(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        tarefa.cancel()
+        try:
+            await tarefa
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(teste_cancelado())
+    assert disjuntor.estado == "meio_aberto"
+    assert disjuntor.permitir()
+
+def test_sucesso_atrasado_de_antes_da_abertura_nao_fecha():
+    disjuntor = CircuitBreaker()
+
+    async def cenario():
+        liberar = asyncio.Event()
+
+        async def lenta():
+            await liberar.wait()
+            return "ok"
+
+        assert disjuntor.permitir()
+        tarefa = asyncio.ensure_future(disjuntor.executar(lenta))
+        await asyncio.sleep(0)
+        _abrir(disjuntor)
+        liberar.set()
+        return await tarefa
+
+    assert asyncio.run(cenario()) == "ok"
+    assert disjuntor.estado == "aberto"
+
+def test_fallback_do_servidor_conta_como_falha():
+    disjuntor = CircuitBreaker()
+    fallback = {"acao": "encaminhar_suporte", "explicacao": "Erro na API OpenAI: 503", "origem": "fallback"}
+
+    async def responder():
+        return fallback
+
+    async def cenario():
+        for _ in range(disjuntor.min_chamadas):
+            assert disjuntor.permitir()
+            assert await disjuntor.executar(responder, falhou=resposta_de_fallback) is fallback
+
+    asyncio.run(cenario())
+    assert disjuntor.estado == "aberto"
+
+def test_lote_so_e_fallback_quando_todos_os_itens_sao():
+    fallback = {"origem": "fallback"}
+    assert resposta_de_fallback([fallback, None, fallback])
+    assert not resposta_de_fallback([fallback, {"acao": "reenviar_boleto"}])
+    assert not resposta_de_fallback([None, None])